@@ -1,7 +1,21 @@
+import os
+import sys
+import bisect
+import difflib
+import unicodedata
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+# As-of lookups reuse the talent store API from the model folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "features", "darkolite"))
+from darkolite_talent_store import index_talent_store, talent_asof
+
+PLAYER_DIM_PATH = "app/data/player_dim.csv"
+TALENT_STORE_PATH = "app/data/darkolite_talent_store.parquet"
+
+
 # -----------------------------------------------------
 # LOAD DATA
 # -----------------------------------------------------
@@ -10,7 +24,84 @@ def load_darkolite():
     return pd.read_csv("app/data/darkolite_player_season_final.csv")
 
 
+@st.cache_data
+def load_player_dim():
+    """Player dimension from ingestion; derived from the final table if absent."""
+    if os.path.exists(PLAYER_DIM_PATH):
+        return pd.read_csv(PLAYER_DIM_PATH, keep_default_na=False)
+
+    seasons = load_darkolite().sort_values("season")
+    dim = seasons.groupby("player_id").agg(
+        player_name=("player_name", "last"),
+        aliases=("player_name", lambda s: "|".join(s.dropna().astype(str).unique())),
+        first_season=("season", "first"),
+        last_season=("season", "last"),
+    )
+    return dim.reset_index()
+
+
+@st.cache_resource
+def load_talent_index():
+    """Per-game talent store, indexed once per session (None if not shipped)."""
+    if not os.path.exists(TALENT_STORE_PATH):
+        return None
+    return index_talent_store(pd.read_parquet(TALENT_STORE_PATH))
+
+
+# -----------------------------------------------------
+# PLAYER SEARCH INDEX
+# -----------------------------------------------------
+def normalize(text: str) -> str:
+    """Lowercase, accent-free, so "Jokic" finds "Jokić"."""
+    text = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in text if not unicodedata.combining(c)).lower().strip()
+
+
+@st.cache_data
+def build_search_index(dim: pd.DataFrame):
+    """
+    Sorted (key, player_id) pairs over every alias and every word start in
+    it, so a prefix lookup is one bisect ("cur" → Stephen Curry).
+    """
+    entries = set()
+    for pid, aliases in zip(dim["player_id"], dim["aliases"]):
+        for alias in str(aliases).split("|"):
+            words = normalize(alias).split()
+            for i in range(len(words)):
+                entries.add((" ".join(words[i:]), pid))
+    entries = sorted(entries)
+    return [k for k, _ in entries], [p for _, p in entries]
+
+
+def search_players(query: str, keys, ids, limit: int = 50) -> list:
+    """Prefix matches first; fuzzy matches if nothing starts with the query."""
+    q = normalize(query)
+    found = []
+    i = bisect.bisect_left(keys, q)
+    while i < len(keys) and keys[i].startswith(q) and len(found) < limit:
+        if ids[i] not in found:
+            found.append(ids[i])
+        i += 1
+    if found:
+        return found
+
+    for key in difflib.get_close_matches(q, sorted(set(keys)), n=limit, cutoff=0.6):
+        j = bisect.bisect_left(keys, key)
+        while j < len(keys) and keys[j] == key:
+            if ids[j] not in found:
+                found.append(ids[j])
+            j += 1
+    return found
+
+
 df = load_darkolite()
+dim = load_player_dim()
+keys, ids = build_search_index(dim)
+names = dim.set_index("player_id")["player_name"]
+labels = {
+    pid: f"{name} ({first} – {last})"
+    for pid, name, first, last in zip(dim["player_id"], dim["player_name"], dim["first_season"], dim["last_season"])
+}
 
 st.title("🏀 DARKO-Lite Player Impact Explorer")
 st.write("Explore player impact ratings from 1996–2024 using a DARKO-inspired blended DPM metric.")
@@ -18,14 +109,28 @@ st.write("Explore player impact ratings from 1996–2024 using a DARKO-inspired
 # -----------------------------------------------------
 # PLAYER SELECTION
 # -----------------------------------------------------
-players = sorted(df["player_name"].unique())
-player = st.selectbox(
+query = st.text_input("Search players", placeholder="Type a name, e.g. Curry")
+
+rated = set(df["player_id"])
+if query:
+    player_ids = [pid for pid in search_players(query, keys, ids) if pid in rated]
+else:
+    player_ids = sorted(rated & set(names.index), key=lambda pid: names[pid])
+
+if not player_ids:
+    st.warning(f"No players match “{query}”.")
+    st.stop()
+
+default = [pid for pid in player_ids if names.get(pid) == "Stephen Curry"]
+player_id = st.selectbox(
     "Select a player",
-    players,
-    index=players.index("Stephen Curry") if "Stephen Curry" in players else 0
+    player_ids,
+    index=player_ids.index(default[0]) if default else 0,
+    format_func=lambda pid: labels.get(pid, str(pid)),
 )
+player = names.get(player_id, str(player_id))
 
-pdf = df[df["player_name"] == player].sort_values("season")
+pdf = df[df["player_id"] == player_id].sort_values("season")
 pdf["season"] = pdf["season"].astype(str)  # ensure categorical-like string
 
 # -----------------------------------------------------
@@ -85,6 +190,25 @@ fig2.update_xaxes(type="category")
 
 st.plotly_chart(fig2, use_container_width=True)
 
+# -----------------------------------------------------
+# TALENT ON A DATE
+# -----------------------------------------------------
+talent_idx = load_talent_index()
+if talent_idx is not None:
+    st.subheader("Talent on a Date")
+    asof_date = st.date_input("As of", value=pd.Timestamp(f"{latest['season'][:4]}-12-31").date())
+    snap = talent_asof(talent_idx, player_id, asof_date)
+    if snap is None:
+        st.info(f"{player} had not played a game by {asof_date}.")
+    else:
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Box Total", f"{snap['darkolite_box_total']:.2f}")
+        c2.metric("Box Offense", f"{snap['darkolite_box_offense']:.2f}")
+        c3.metric("Box Defense", f"{snap['darkolite_box_defense']:.2f}")
+        st.caption(f"After the last game on or before {asof_date}: "
+                   f"{pd.Timestamp(snap['last_game_date']):%Y-%m-%d} ({snap['season']})")
+        st.dataframe(pd.Series({k: v for k, v in snap.items() if k.endswith("_talent")}, name="talent"))
+
 # -----------------------------------------------------
 # FULL TABLE
 # -----------------------------------------------------
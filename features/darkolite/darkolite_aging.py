@@ -0,0 +1,224 @@
+import time
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------
+# CONFIG
+# --------------------------------------------------------
+FINAL_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_player_season_final.csv"
+OUTPUT_CURVES = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_aging_curves.csv"
+OUTPUT_PROJECTIONS = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_projections.csv"
+
+PROJECT_STATS = [
+    "darkolite_dpm",
+    "darkolite_box_offense",
+    "darkolite_box_defense",
+    "darkolite_box_total",
+]
+
+HORIZON = 5            # seasons projected forward
+N_DRAWS = 2000         # Monte Carlo paths per player
+SEED = 0
+
+# Survivorship: a player who does not come back is given a phantom next
+# season at no better than replacement level (this season's
+# REPLACEMENT_PCTL quantile). Convention: phantoms only feed the per-bucket
+# survival rate, which the projections apply once through p_active; the
+# deltas and residuals are fit on real consecutive seasons. Putting them in
+# the deltas as well would count attrition twice.
+SURVIVOR_CORRECTION = True
+REPLACEMENT_PCTL = 0.10
+
+# Experience buckets with fewer pairs than this borrow the last well
+# populated bucket (the sample thins out fast after ~15 seasons).
+MIN_PAIRS = 30
+CURVE_DEGREE = 3       # polynomial used to smooth the per-bucket deltas
+
+
+# --------------------------------------------------------
+# HELPERS
+# --------------------------------------------------------
+def season_year(season: pd.Series) -> pd.Series:
+    """'2015-16' → 2015."""
+    return season.astype(str).str[:4].astype(int)
+
+
+def add_experience(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Experience = seasons since the player's first season in the table. The
+    data has no birth dates, so experience stands in for age; players whose
+    careers began before the first scraped season are counted from there.
+    """
+    df = df.copy()
+    df["player_id"] = df["player_id"].astype(int)
+    df["season"] = df["season"].astype(str)
+    df["year"] = season_year(df["season"])
+    df = df.sort_values(["player_id", "year"]).reset_index(drop=True)
+    df["experience"] = df["year"] - df.groupby("player_id")["year"].transform("min")
+    return df
+
+
+def season_pairs(df: pd.DataFrame, stats: list) -> pd.DataFrame:
+    """
+    Consecutive player-seasons (year → year + 1) as one row each with the
+    change in every stat. Non-returning players get phantom rows when
+    SURVIVOR_CORRECTION is on (flagged in "phantom").
+    """
+    nxt = df.groupby("player_id")[["year"] + stats].shift(-1)
+    consecutive = (nxt["year"] - df["year"]) == 1
+
+    pairs = pd.DataFrame({"experience": df["experience"], "phantom": False})
+    for s in stats:
+        pairs[s] = nxt[s] - df[s]
+    pairs = pairs[consecutive]
+
+    if SURVIVOR_CORRECTION:
+        # Gone the next season while the league kept playing
+        last_year = df["year"].max()
+        gone = nxt["year"].isna() & (df["year"] < last_year)
+        repl = df.groupby("year")[stats].transform(lambda s: s.quantile(REPLACEMENT_PCTL))
+        phantom = pd.DataFrame({"experience": df["experience"], "phantom": True})
+        for s in stats:
+            phantom[s] = np.minimum(df[s], repl[s]) - df[s]
+        pairs = pd.concat([pairs, phantom[gone]], ignore_index=True)
+
+    return pairs.dropna(subset=stats).reset_index(drop=True)
+
+
+def fit_aging_curves(df: pd.DataFrame, stats: list = PROJECT_STATS) -> tuple:
+    """
+    Delta method: mean change from experience e to e + 1, per stat, from
+    one bincount per stat. Returns (curves, residuals):
+    curves has one row per experience bucket with n_pairs (real pairs),
+    survival rate (real / real + phantom), raw and polynomial-smoothed
+    deltas and residual sds; residuals holds every real pair's deviation
+    from its bucket's smoothed delta, sorted by bucket, for the Monte Carlo
+    draws. Phantom pairs only enter the survival rate.
+    """
+    all_pairs = season_pairs(df, stats)
+
+    real = ~all_pairs["phantom"].to_numpy()
+    n_real = np.bincount(all_pairs["experience"].to_numpy(int)[real])
+    ok = np.nonzero(n_real >= MIN_PAIRS)[0]
+    cap = int(ok.max()) if len(ok) else len(n_real) - 1
+    all_bucket = np.minimum(all_pairs["experience"].to_numpy(int), cap)
+
+    total = np.bincount(all_bucket, minlength=cap + 1).astype(float)
+    n = np.bincount(all_bucket[real], minlength=cap + 1).astype(float)
+    exp = np.arange(cap + 1)
+
+    curves = pd.DataFrame({
+        "experience": exp,
+        "n_pairs": n.astype(int),
+        "survival": np.divide(n, total, out=np.ones_like(n), where=total > 0),
+    })
+
+    pairs = all_pairs[real].reset_index(drop=True)
+    bucket = all_bucket[real]
+
+    residuals = np.empty((len(pairs), len(stats)))
+    for j, s in enumerate(stats):
+        d = pairs[s].to_numpy(float)
+        raw = np.divide(np.bincount(bucket, weights=d, minlength=cap + 1), n,
+                        out=np.zeros_like(n), where=n > 0)
+        deg = min(CURVE_DEGREE, max(int((n > 0).sum()) - 1, 0))
+        coef = np.polyfit(exp[n > 0], raw[n > 0], deg, w=np.sqrt(n[n > 0]))
+        smooth = np.polyval(coef, exp)
+
+        residuals[:, j] = d - smooth[bucket]
+        var = np.divide(np.bincount(bucket, weights=residuals[:, j] ** 2, minlength=cap + 1), n,
+                        out=np.zeros_like(n), where=n > 0)
+
+        curves[f"{s}_delta"] = raw
+        curves[f"{s}_delta_smooth"] = smooth
+        curves[f"{s}_sd"] = np.sqrt(var)
+
+    order = np.argsort(bucket, kind="stable")
+    residuals = {
+        "values": residuals[order],
+        "start": np.concatenate([[0], np.cumsum(n.astype(int))[:-1]]),
+        "count": n.astype(int),
+    }
+    return curves, residuals
+
+
+def project_players(df: pd.DataFrame, curves: pd.DataFrame, residuals: dict,
+                    stats: list = PROJECT_STATS, base_season: str | None = None,
+                    horizon: int = HORIZON, n_draws: int = N_DRAWS,
+                    seed: int = SEED) -> pd.DataFrame:
+    """
+    Every player active in base_season (default: the latest) projected
+    1..horizon seasons ahead. The mean path adds the smoothed deltas; the
+    bands come from n_draws paths that add, at every step, a whole residual
+    row drawn from that step's experience bucket (so offense/defense/DPM
+    noise stays jointly consistent). All players, draws and steps are one
+    array: (players, draws, horizon).
+    """
+    base_season = base_season or df.loc[df["year"].idxmax(), "season"]
+    base = df[df["season"] == base_season].reset_index(drop=True)
+
+    cap = len(curves) - 1
+    steps = np.arange(horizon)
+    # Step k (0-based) moves the player from experience e0 + k to e0 + k + 1
+    bucket = np.minimum(base["experience"].to_numpy(int)[:, None] + steps[None, :], cap)
+
+    rng = np.random.default_rng(seed)
+    count = residuals["count"][bucket]                      # (players, horizon)
+    u = rng.random((len(base), n_draws, horizon))
+    idx = residuals["start"][bucket][:, None, :] + (u * count[:, None, :]).astype(int)
+
+    survival = curves["survival"].to_numpy()[bucket]
+    p_active = np.cumprod(survival, axis=1)
+
+    out = pd.DataFrame({
+        "player_id": np.repeat(base["player_id"].to_numpy(), horizon),
+        "base_season": base_season,
+        "horizon": np.tile(steps + 1, len(base)),
+        "experience": (base["experience"].to_numpy()[:, None] + steps[None, :] + 1).ravel(),
+        "p_active": p_active.ravel(),
+    })
+    if "player_name" in base.columns:
+        out.insert(1, "player_name", np.repeat(base["player_name"].to_numpy(), horizon))
+    out.insert(out.columns.get_loc("horizon") + 1, "target_season",
+               [f"{y}-{str(y + 1)[-2:]}" for y in
+                (int(base_season[:4]) + out["horizon"]).to_numpy()])
+
+    for j, s in enumerate(stats):
+        v0 = base[s].to_numpy(float)
+        mean_path = v0[:, None] + np.cumsum(curves[f"{s}_delta_smooth"].to_numpy()[bucket], axis=1)
+        noise = np.cumsum(residuals["values"][idx, j], axis=2)      # (players, draws, horizon)
+        draws = mean_path[:, None, :] + noise
+        if s == "darkolite_dpm":
+            mean_path = mean_path.clip(-10, 10)
+            draws = draws.clip(-10, 10)
+        lo, mid, hi = np.quantile(draws, [0.10, 0.50, 0.90], axis=1)
+
+        out[f"{s}_proj"] = mean_path.ravel()
+        out[f"{s}_p10"] = lo.ravel()
+        out[f"{s}_p50"] = mid.ravel()
+        out[f"{s}_p90"] = hi.ravel()
+
+    return out
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    t0 = time.time()
+    print("Loading:", FINAL_CSV)
+    df = add_experience(pd.read_csv(FINAL_CSV))
+    stats = [s for s in PROJECT_STATS if s in df.columns]
+
+    curves, residuals = fit_aging_curves(df, stats)
+    print(f"Aging curves: {len(curves)} experience buckets from {curves['n_pairs'].sum():,} season pairs")
+
+    proj = project_players(df, curves, residuals, stats)
+    print(f"Projected {proj['player_id'].nunique():,} players x {HORIZON} seasons "
+          f"({N_DRAWS} draws) in {time.time() - t0:.1f}s")
+
+    print("Saving aging curves →", OUTPUT_CURVES)
+    curves.to_csv(OUTPUT_CURVES, index=False)
+    print("Saving projections →", OUTPUT_PROJECTIONS)
+    proj.to_csv(OUTPUT_PROJECTIONS, index=False)
+    print("Done.")
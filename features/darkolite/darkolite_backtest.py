@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import importlib
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import darkolite_box_talent as box_talent
+import darkolite_final as final_stage
+from darkolite_baselines import build_league_baselines
+
+# --------------------------------------------------------
+# CONFIG
+# --------------------------------------------------------
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+ROLLING_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_rapm_rolling.csv"
+BACKTEST_CACHE_DIR = r"C:\Users\gngim\Desktop\Darko\features\darkolite\backtest_cache"
+BACKTEST_SUMMARY = r"C:\Users\gngim\Desktop\Darko\features\darkolite\backtest_summary.csv"
+
+# Bump when the evaluation itself changes, so cached seasons are recomputed
+# (source and constants of FINGERPRINT_MODULES are already in the key)
+BACKTEST_VERSION = 2
+FINGERPRINT_MODULES = ["darkolite_box_talent", "darkolite_final", "darkolite_baselines"]
+
+# Model variants to compare: name → {"module.CONSTANT": value} overrides
+# applied while that variant's talent and ratings are built.
+VARIANTS = {
+    "baseline": {},
+    "kalman": {"darkolite_box_talent.TALENT_ENGINE": "kalman"},
+}
+
+HOME_ADV_100 = 3.0        # home-court edge, points per 100 possessions
+REPLACEMENT_DPM = -2.0    # players with no as-of rating yet
+SEASONS = None            # e.g. ["2015-16", "2016-17"]; None = every season with a predecessor
+WORKERS = os.cpu_count()
+
+
+# --------------------------------------------------------
+# VARIANTS
+# --------------------------------------------------------
+@contextmanager
+def overrides(settings: dict):
+    """Temporarily set module constants, e.g. {"darkolite_final.SCALE": 4.0}."""
+    saved = []
+    try:
+        for key, value in settings.items():
+            mod_name, attr = key.rsplit(".", 1)
+            mod = importlib.import_module(mod_name)
+            saved.append((mod, attr, getattr(mod, attr)))
+            setattr(mod, attr, value)
+        yield
+    finally:
+        for mod, attr, value in reversed(saved):
+            setattr(mod, attr, value)
+
+
+def code_fingerprint() -> str:
+    """
+    Hash of the source and module-level constants (UPPERCASE names) of this
+    script and every module the evaluation depends on, so editing code or
+    a non-overridden constant invalidates the cache.
+    """
+    h = hashlib.sha256()
+    mods = [sys.modules[__name__]] + [importlib.import_module(m) for m in FINGERPRINT_MODULES]
+    for mod in mods:
+        with open(mod.__file__, "rb") as f:
+            h.update(f.read())
+        consts = {k: v for k, v in vars(mod).items() if k.isupper()}
+        h.update(json.dumps(consts, sort_keys=True, default=repr).encode("utf-8"))
+    return h.hexdigest()
+
+
+def variant_key(settings: dict, *paths) -> str:
+    """Cache key: the overrides, code + constants fingerprint and the input files."""
+    h = hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    h.update(f"v{BACKTEST_VERSION}|{code_fingerprint()}".encode("utf-8"))
+    for p in paths:
+        if os.path.exists(p):
+            st = os.stat(p)
+            h.update(f"{os.path.abspath(p)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+# --------------------------------------------------------
+# AS-OF INPUTS
+# --------------------------------------------------------
+def causal_clean(master: pd.DataFrame) -> pd.DataFrame:
+    """
+    Player-game rows cleaned without looking ahead: winsor caps from each
+    player's earlier games, missing TS% / eFG% filled with the previous
+    season's league rate.
+    """
+    df = box_talent.prepare_master(master.copy())
+    base = None
+    if box_talent.ERA_PRIORS:
+        base = box_talent.prior_season_baselines(build_league_baselines(df))
+    return box_talent.clean_base_stats(df, base, causal=True)
+
+
+def pregame_box(df: pd.DataFrame, kalman_scales: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Causally cleaned player-game rows → box talent as of the start of each
+    game (the talent after the player's previous game), built with whatever
+    constants the current variant has set.
+    """
+    if box_talent.TALENT_ENGINE == "kalman":
+        df = box_talent.add_kalman_talent(df, kalman_scales)
+    else:
+        df = box_talent.add_ewma_talent(df)
+    df = box_talent.add_box_components(df)
+
+    df["box_pre"] = df.groupby("player_id")["darkolite_box_total"].shift(1)
+
+    cols = ["game_id", "team_id", "player_id", "season", "game_date_team", "minutes",
+            "team_minutes", "plus_minus_team", "team_possessions", "is_home",
+            "darkolite_box_total", "box_pre"]
+    return df[[c for c in cols if c in df.columns]]
+
+
+def season_inputs(master: pd.DataFrame, seasons: list) -> dict:
+    """
+    season → (pregame rows, box_mu, box_sd) for each test season. The EWMA
+    engine has no fitted state, so one causal pass covers every season. The
+    Kalman engine's noise scales are fit on the seasons before each test
+    season and the filter is rerun per season with them.
+    """
+    df = causal_clean(master)
+    out = {}
+    if box_talent.TALENT_ENGINE != "kalman":
+        rows = pregame_box(df)
+        ref = box_reference(rows)
+        for s in seasons:
+            if s in ref.index:
+                out[s] = (rows[rows["season"] == s], ref.loc[s, "box_mu"], ref.loc[s, "box_sd"])
+        return out
+
+    for s in seasons:
+        past = df[df["season"] < s]
+        if past.empty:
+            continue
+        scales = box_talent.fit_kalman_scales(past, cleaned=True)
+        rows = pregame_box(df[df["season"] <= s].copy(), scales)
+        ref = box_reference(rows)
+        if s in ref.index:
+            out[s] = (rows[rows["season"] == s], ref.loc[s, "box_mu"], ref.loc[s, "box_sd"])
+    return out
+
+
+def box_reference(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per season, the mean / sd of the previous season's player-season box
+    totals: the scale a box rating is z-scored on without looking ahead.
+    """
+    ps = rows.groupby(["season", "player_id"])["darkolite_box_total"].mean()
+    ref = ps.groupby("season").agg(["mean", lambda s: s.std(ddof=0)])
+    ref.columns = ["box_mu", "box_sd"]
+    return ref.shift(1).dropna()
+
+
+def load_rolling_z(path: str = ROLLING_CSV) -> pd.DataFrame | None:
+    """Rolling RAPM as within-date z-scores (each date's cross-section is already known that day)."""
+    if not os.path.exists(path):
+        print(f"Warning: no rolling RAPM at {path}; backtesting box talent only.")
+        return None
+    roll = pd.read_csv(path, parse_dates=["game_date"])
+    roll["player_id"] = roll["player_id"].astype(int)
+    g = roll.groupby("game_date")["rapm_rolling"]
+    sd = g.transform(lambda s: s.std(ddof=0)).replace(0, np.nan)
+    roll["rapm_z"] = ((roll["rapm_rolling"] - g.transform("mean")) / sd).fillna(0.0)
+    return roll[["game_date", "player_id", "rapm_z"]].sort_values("game_date")
+
+
+# --------------------------------------------------------
+# EVALUATION
+# --------------------------------------------------------
+def evaluate_season(rows: pd.DataFrame, rolling: pd.DataFrame | None,
+                    box_mu: float, box_sd: float, blend: dict) -> pd.DataFrame:
+    """
+    Every game of one season at once: each player's as-of DPM, team
+    ratings as 5 x minute-share-weighted sums, and the predicted margin per
+    100 possessions against the actual one. One row per game.
+    """
+    rows = rows.sort_values("game_date_team").copy()
+
+    if rolling is not None and not rolling.empty:
+        rows = pd.merge_asof(
+            rows, rolling, left_on="game_date_team", right_on="game_date",
+            by="player_id", allow_exact_matches=False,
+        )
+    rows["rapm_z"] = rows["rapm_z"].fillna(0.0) if "rapm_z" in rows.columns else 0.0
+
+    box_z = (rows["box_pre"] - box_mu) / box_sd if box_sd > 0 else rows["box_pre"] * 0.0
+    dpm = (blend["box_weight"] * box_z + blend["rapm_weight"] * rows["rapm_z"]) * blend["scale"]
+    rows["dpm_pre"] = dpm.clip(-10, 10).fillna(REPLACEMENT_DPM)
+
+    rows["share"] = (rows["minutes"] / rows["team_minutes"]).clip(0, 1)
+    rows["contrib"] = 5.0 * rows["share"] * rows["dpm_pre"]
+    if "is_home" not in rows.columns:
+        rows["is_home"] = 0
+
+    team = rows.groupby(["game_id", "team_id"]).agg(
+        game_date=("game_date_team", "first"),
+        rating=("contrib", "sum"),
+        plus_minus=("plus_minus_team", "first"),
+        poss=("team_possessions", "first"),
+        is_home=("is_home", "first"),
+    ).reset_index()
+
+    games = team.merge(team, on="game_id", suffixes=("", "_opp"))
+    games = games[games["team_id"] != games["team_id_opp"]]
+    # One row per game: the home side (or the lower team id if unknown)
+    home = games["is_home"] > games["is_home_opp"]
+    tie = (games["is_home"] == games["is_home_opp"]) & (games["team_id"] < games["team_id_opp"])
+    games = games[home | tie]
+
+    side = np.where(games["is_home"] > games["is_home_opp"], 1.0, 0.0)
+    games = games.assign(
+        pred_100=games["rating"] - games["rating_opp"] + HOME_ADV_100 * side,
+        actual_100=games["plus_minus"] / games["poss"].where(games["poss"] > 0) * 100.0,
+    )
+    games["error"] = games["pred_100"] - games["actual_100"]
+    return games[["game_id", "game_date", "team_id", "team_id_opp", "pred_100", "actual_100", "error"]]
+
+
+def summarize(games: pd.DataFrame) -> dict:
+    ok = games["actual_100"].notna()
+    g = games[ok]
+    return {
+        "games": int(len(g)),
+        "rmse": float(np.sqrt((g["error"] ** 2).mean())) if len(g) else np.nan,
+        "mae": float(g["error"].abs().mean()) if len(g) else np.nan,
+        "winner_acc": float((np.sign(g["pred_100"]) == np.sign(g["actual_100"])).mean()) if len(g) else np.nan,
+    }
+
+
+def _season_job(args):
+    season, rows, rolling, box_mu, box_sd, blend, path = args
+    games = evaluate_season(rows, rolling, box_mu, box_sd, blend)
+    games["season"] = season
+    tmp = path + ".tmp"
+    games.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return season, games
+
+
+def backtest_variant(name: str, settings: dict, master: pd.DataFrame,
+                     rolling: pd.DataFrame | None) -> pd.DataFrame:
+    """Per-game results for every season, reusing cached seasons for this variant."""
+    key = variant_key(settings, MASTER_CSV, ROLLING_CSV)
+    cache_dir = os.path.join(BACKTEST_CACHE_DIR, f"{name}_{key}")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    seasons = sorted(master["season"].astype(str).unique())[1:]
+    if SEASONS is not None:
+        seasons = [s for s in seasons if s in SEASONS]
+    todo = [s for s in seasons if not os.path.exists(os.path.join(cache_dir, f"{s}.csv"))]
+
+    results = [pd.read_csv(os.path.join(cache_dir, f"{s}.csv")) for s in seasons if s not in todo]
+    print(f"[{name}] {len(seasons) - len(todo)} seasons cached, {len(todo)} to run")
+
+    if todo:
+        with overrides(settings):
+            inputs = season_inputs(master, todo)
+            blend = {"box_weight": final_stage.BOX_WEIGHT,
+                     "rapm_weight": final_stage.RAPM_WEIGHT,
+                     "scale": final_stage.SCALE}
+
+        jobs = []
+        for s in todo:
+            if s not in inputs:
+                continue
+            season_rows, box_mu, box_sd = inputs[s]
+            season_roll = None
+            if rolling is not None:
+                lo, hi = season_rows["game_date_team"].min(), season_rows["game_date_team"].max()
+                season_roll = rolling[(rolling["game_date"] < hi) & (rolling["game_date"] >= lo - pd.Timedelta(days=366))]
+            jobs.append((s, season_rows, season_roll, box_mu, box_sd,
+                         blend, os.path.join(cache_dir, f"{s}.csv")))
+
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            for season, games in pool.map(_season_job, jobs):
+                results.append(games)
+
+    if not results:
+        return pd.DataFrame()
+    out = pd.concat(results, ignore_index=True)
+    out["variant"] = name
+    return out
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    t0 = time.time()
+    print("Loading:", MASTER_CSV)
+    master = pd.read_csv(MASTER_CSV, low_memory=False)
+    master["season"] = master["season"].astype(str)
+    rolling = load_rolling_z()
+
+    per_game = [backtest_variant(name, settings, master, rolling) for name, settings in VARIANTS.items()]
+    per_game = pd.concat(per_game, ignore_index=True)
+
+    rows = []
+    for (variant, season), g in per_game.groupby(["variant", "season"]):
+        rows.append({"variant": variant, "season": season, **summarize(g)})
+    for variant, g in per_game.groupby("variant"):
+        rows.append({"variant": variant, "season": "ALL", **summarize(g)})
+    summary = pd.DataFrame(rows)
+
+    print(summary[summary["season"] == "ALL"].to_string(index=False))
+    print("Saving backtest summary →", BACKTEST_SUMMARY)
+    summary.to_csv(BACKTEST_SUMMARY, index=False)
+    print(f"Done in {time.time() - t0:.1f}s.")
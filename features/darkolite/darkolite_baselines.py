@@ -0,0 +1,134 @@
+import os
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------
+# CONFIG
+# --------------------------------------------------------
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+BASELINES_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\league_season_baselines.csv"
+
+QUANTILES = [0.10, 0.25, 0.50, 0.75, 0.90]
+
+# Identifiers and flags that are numeric but are not features
+NON_FEATURES = {"game_id", "team_id", "player_id", "is_home", "won"}
+
+# Shooting priors are league rates from totals (not an average of noisy
+# per-game percentages); every other prior is the season mean
+RATE_PRIORS = {
+    "ts_pct_calc": "league_ts_pct",
+    "efg_pct_calc": "league_efg_pct",
+}
+
+
+# --------------------------------------------------------
+# BUILD
+# --------------------------------------------------------
+def feature_columns(df: pd.DataFrame) -> list:
+    return [c for c in df.select_dtypes(include="number").columns if c not in NON_FEATURES]
+
+
+def build_league_baselines(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Master feature rows → one row per season: mean / sd (ddof=0) / count /
+    quantiles of every numeric feature as {col}_{stat}, league TS% and eFG%
+    from season totals, and pace (possessions per team-game).
+    """
+    d = df.copy()
+    d["season"] = d["season"].astype(str)
+    cols = feature_columns(d)
+    vals = d[cols].replace([np.inf, -np.inf], np.nan)
+    g = vals.groupby(d["season"])
+
+    parts = [
+        g.mean().add_suffix("_mean"),
+        g.std(ddof=0).add_suffix("_sd"),
+        g.count().add_suffix("_n"),
+    ]
+    q = g.quantile(QUANTILES).unstack()
+    q.columns = [f"{c}_q{int(round(p * 100)):02d}" for c, p in q.columns]
+    parts.append(q)
+
+    base = pd.concat(parts, axis=1)
+    base = base[sorted(base.columns, key=lambda c: (cols.index(c.rsplit("_", 1)[0]), c))]
+
+    totals = d.groupby("season")[[c for c in ["pts", "fga", "fgm", "fg3m", "fta"] if c in d.columns]].sum()
+    if {"pts", "fga", "fta"} <= set(totals.columns):
+        base.insert(0, "league_ts_pct", totals["pts"] / (2 * (totals["fga"] + 0.44 * totals["fta"])))
+    if {"fgm", "fg3m", "fga"} <= set(totals.columns):
+        base.insert(0, "league_efg_pct", (totals["fgm"] + 0.5 * totals["fg3m"]) / totals["fga"])
+    if "team_possessions" in d.columns:
+        team_games = d.drop_duplicates(["season", "game_id", "team_id"])
+        base.insert(0, "pace", team_games.groupby("season")["team_possessions"].mean())
+
+    return base.rename_axis("season").reset_index()
+
+
+def load_league_baselines(path: str = BASELINES_CSV, df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Read the materialized table, or build it from feature rows if it is missing."""
+    if os.path.exists(path):
+        return pd.read_csv(path, dtype={"season": str})
+    if df is None:
+        raise FileNotFoundError(f"❌ No league baselines at {path}. Run darkolite_baselines.py first.")
+    return build_league_baselines(df)
+
+
+def write_league_baselines(base: pd.DataFrame, path: str = BASELINES_CSV):
+    tmp = path + ".tmp"
+    base.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+# --------------------------------------------------------
+# JOINS
+# --------------------------------------------------------
+def season_priors(base: pd.DataFrame, col: str) -> pd.Series:
+    """Era-aware prior for one feature, indexed by season."""
+    src = RATE_PRIORS.get(col, f"{col}_mean")
+    return base.set_index("season")[src]
+
+
+def season_moments(df: pd.DataFrame, col: str, group: str = "season",
+                   mask: pd.Series | None = None) -> pd.DataFrame:
+    """mean / sd (ddof=0) of col per group in one grouped pass, optionally over a subset of rows."""
+    d = df if mask is None else df[mask]
+    m = d.groupby(group)[col].agg(["mean", lambda s: s.std(ddof=0)])
+    m.columns = ["mean", "sd"]
+    return m
+
+
+def z_from_moments(df: pd.DataFrame, col: str, moments: pd.DataFrame,
+                   group: str = "season", outcol: str | None = None) -> pd.DataFrame:
+    """
+    (col - mean) / sd with the group's moments joined in; groups with no
+    spread (or missing from the table) get 0.
+    """
+    mu = df[group].map(moments["mean"])
+    sd = df[group].map(moments["sd"])
+    df[outcol or f"{col}_z"] = ((df[col] - mu) / sd).where(sd > 0, 0.0)
+    return df
+
+
+def z_against_baselines(df: pd.DataFrame, col: str, base: pd.DataFrame,
+                        outcol: str | None = None) -> pd.DataFrame:
+    """Game-level feature z-scored against its season's league mean / sd from the baseline table."""
+    moments = base.set_index("season")[[f"{col}_mean", f"{col}_sd"]]
+    moments.columns = ["mean", "sd"]
+    df["season"] = df["season"].astype(str)
+    return z_from_moments(df, col, moments, "season", outcol)
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    print("Loading master features:", MASTER_CSV)
+    df = pd.read_csv(MASTER_CSV, low_memory=False)
+
+    base = build_league_baselines(df)
+    print(f"Baselines: {len(base)} seasons x {base.shape[1] - 1} columns")
+    cols = [c for c in ["season", "pace", "league_ts_pct", "league_efg_pct"] if c in base.columns]
+    print(base[cols].to_string(index=False))
+
+    write_league_baselines(base)
+    print("Saved league baselines →", BASELINES_CSV)
@@ -1,12 +1,21 @@
 import os
+import sys
 import numpy as np
 import pandas as pd
 
+# Player dimension (canonical names by id) is built during ingestion
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ingestion"))
+from build_player_dim import build_player_dim, load_player_dim, attach_player_names, PLAYER_DIM_CSV
+from darkolite_baselines import (
+    RATE_PRIORS, build_league_baselines, season_moments, season_priors, z_from_moments,
+)
+
 # --------------------------------------------------------
 # CONFIG
 # --------------------------------------------------------
 MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
 OUTPUT_BOX_SEASON = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_box_player_season.csv"
+KALMAN_SCALES_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_kalman_scales.csv"
 
 # Fast/slow decay rates per stat (approx DARKO-ish)
 ALPHA_FAST = {
@@ -39,6 +48,43 @@ PRIORS = {
     "pm_per100": 0.0,
 }
 
+# Fill missing TS% / eFG% with the season's league rate from the baseline
+# table (PRIORS stays the fallback for seasons the table doesn't cover)
+ERA_PRIORS = True
+
+# Causal cleaning (as-of uses: backtest, talent store) clips each game to
+# quantiles of the player's earlier games only, once there are this many
+WINSOR_MIN_GAMES = 20
+
+# Talent = SLOW_WEIGHT * slow EWMA + (1 - SLOW_WEIGHT) * fast EWMA
+SLOW_WEIGHT = 0.70
+
+# Box component weights on the talent columns
+BOX_OFFENSE_COEFS = {
+    "pts_per100": 0.40,
+    "ast_per100": 0.25,
+    "ts_pct_calc": 12,
+    "efg_pct_calc": 8,
+    "to_per100": -0.25,
+}
+BOX_DEFENSE_COEFS = {
+    "reb_per100": 0.12,
+    "blk_per100": 0.30,
+    "stl_per100": 0.25,
+    "to_per100": -0.05,
+}
+
+# "ewma"   = fixed-alpha fast/slow EWMA blend (ALPHA_FAST / ALPHA_SLOW)
+# "kalman" = local-level Kalman filter: observation noise shrinks with the
+#            game's player_possessions, process noise grows with days since
+#            the player's last game. Also outputs {stat}_talent_var.
+TALENT_ENGINE = "ewma"
+
+KALMAN_REF_POSS = 70.0        # possessions at which a game has the baseline noise
+KALMAN_DAYS_PER_GAME = 2.0    # typical in-season gap; calibrates daily drift
+KALMAN_MAX_GAP_DAYS = 365     # cap on drift accumulated over one absence
+KALMAN_SCALE_COLS = ["obs_var", "prior_var", "prior", "drift"]
+
 # --------------------------------------------------------
 # HELPERS
 # --------------------------------------------------------
@@ -48,6 +94,12 @@ def winsorize(s: pd.Series, lo: float = 0.01, hi: float = 0.99) -> pd.Series:
     return s.clip(s.quantile(lo), s.quantile(hi))
 
 
+def winsorize_causal(s: pd.Series, lo: float = 0.01, hi: float = 0.99) -> pd.Series:
+    """Clip each value to the quantiles of the values before it (no clipping until WINSOR_MIN_GAMES)."""
+    prev = s.shift(1).expanding(min_periods=WINSOR_MIN_GAMES)
+    return s.clip(prev.quantile(lo), prev.quantile(hi))
+
+
 def ewma_smooth(values: np.ndarray, alpha: float) -> np.ndarray:
     if len(values) == 0:
         return values
@@ -59,47 +111,79 @@ def ewma_smooth(values: np.ndarray, alpha: float) -> np.ndarray:
 
 
 def z_score(df: pd.DataFrame, col: str, group: str, outcol: str) -> pd.DataFrame:
-    def _z(s: pd.Series) -> pd.Series:
-        sd = s.std(ddof=0)
-        if sd <= 0 or np.isnan(sd):
-            return pd.Series(0.0, index=s.index)
-        return (s - s.mean()) / sd
-    df[outcol] = df.groupby(group)[col].transform(_z)
-    return df
+    return z_from_moments(df, col, season_moments(df, col, group), group, outcol)
 
 
-# --------------------------------------------------------
-# MAIN
-# --------------------------------------------------------
-if __name__ == "__main__":
-    print("Loading master features:", MASTER_CSV)
-    df = pd.read_csv(MASTER_CSV, low_memory=False)
+BASE_STATS = [
+    "pts_per100", "reb_per100", "ast_per100", "stl_per100", "blk_per100",
+    "to_per100", "ts_pct_calc", "efg_pct_calc", "pm_per100"
+]
+
+BOX_COLS = [
+    "darkolite_box_offense",
+    "darkolite_box_defense",
+    "darkolite_box_total",
+]
 
+
+def prepare_master(df: pd.DataFrame) -> pd.DataFrame:
     # Types & ordering
     df["game_date_team"] = pd.to_datetime(df["game_date_team"])
     df["player_id"] = df["player_id"].astype(int)
     df["season"] = df["season"].astype(str)
+    return df.sort_values(["player_id", "game_date_team"])
+
+
+def era_baselines(df: pd.DataFrame) -> pd.DataFrame | None:
+    """
+    League baseline table for era priors, built from df itself so it always
+    matches the rows being cleaned (None when ERA_PRIORS is off).
+    """
+    return build_league_baselines(df) if ERA_PRIORS else None
 
-    df = df.sort_values(["player_id", "game_date_team"])
 
-    # Clean base stats
-    base_stats = [
-        "pts_per100", "reb_per100", "ast_per100", "stl_per100", "blk_per100",
-        "to_per100", "ts_pct_calc", "efg_pct_calc", "pm_per100"
-    ]
+def prior_season_baselines(baselines: pd.DataFrame | None) -> pd.DataFrame | None:
+    """
+    Baseline table re-keyed so each season carries the previous season's
+    values: what was known before the season started. The first season
+    drops out and falls back to PRIORS.
+    """
+    if baselines is None:
+        return None
+    b = baselines.sort_values("season").reset_index(drop=True)
+    prev = b.drop(columns="season").iloc[:-1].reset_index(drop=True)
+    prev.insert(0, "season", b["season"].iloc[1:].to_numpy())
+    return prev
 
-    for col in base_stats:
+
+def clean_base_stats(df: pd.DataFrame, baselines: pd.DataFrame | None = None,
+                     causal: bool = False) -> pd.DataFrame:
+    """
+    Infinite → NaN, missing shooting / plus-minus filled with priors, then
+    per-player winsorizing. causal=True (df sorted by player and date, as
+    prepare_master leaves it) uses only each player's earlier games for the
+    caps, so a game's cleaned value never depends on later games; pass
+    prior_season_baselines for the fills in that case.
+    """
+    for col in BASE_STATS:
         df[col] = df[col].replace([np.inf, -np.inf], np.nan)
 
     for col, prior in PRIORS.items():
-        if col in df.columns:
-            df[col] = df[col].fillna(prior)
+        if col not in df.columns:
+            continue
+        if baselines is not None and col in RATE_PRIORS:
+            df[col] = df[col].fillna(df["season"].map(season_priors(baselines, col)))
+        df[col] = df[col].fillna(prior)
+
+    clip = winsorize_causal if causal else winsorize
+    for col in BASE_STATS:
+        df[col] = df.groupby("player_id")[col].transform(clip)
+    return df
 
-    for col in base_stats:
-        df[col] = df.groupby("player_id")[col].transform(winsorize)
 
+def add_ewma_talent(df: pd.DataFrame) -> pd.DataFrame:
     # Fast/slow EWMA & blend into "talent"
-    for stat in base_stats:
+    for stat in BASE_STATS:
         if stat not in df.columns:
             print(f"Warning: missing {stat}, skipping.")
             continue
@@ -112,7 +196,7 @@ if __name__ == "__main__":
             fast = ewma_smooth(v, alpha_f)
             slow = ewma_smooth(v, alpha_s)
             # 70% slow, 30% fast → stable but responsive
-            blended = 0.70 * slow + 0.30 * fast
+            blended = SLOW_WEIGHT * slow + (1.0 - SLOW_WEIGHT) * fast
             return pd.DataFrame({
                 f"{stat}_fast": fast,
                 f"{stat}_slow": slow,
@@ -126,42 +210,208 @@ if __name__ == "__main__":
         )
 
         df = pd.concat([df, talent_df], axis=1)
+    return df
+
+
+def kalman_noise_scales(df: pd.DataFrame, stats: list, w: np.ndarray):
+    """
+    Data-driven scales for the filter, per stat:
+      obs_var   - noise variance of one REF_POSS game (within-player spread)
+      prior_var - spread of true talent across players (starting variance)
+      prior     - possession-weighted league mean (starting mean)
+      drift     - process variance per day; per game it equals the
+                  ALPHA_SLOW EWMA's implied q/r ratio, a² / (1 − a)
+    """
+    Y = df[stats].to_numpy(dtype=float)
+    W = np.where(np.isnan(Y), 0.0, w[:, None])
+    Yz = np.nan_to_num(Y)
+
+    gid = df["player_id"].values
+    sum_w = pd.DataFrame(W).groupby(gid).sum()
+    player_mean = pd.DataFrame(W * Yz).groupby(gid).sum() / sum_w.replace(0, np.nan)
+
+    resid = Yz - player_mean.reindex(gid).to_numpy()
+    obs_var = np.nansum(W * resid ** 2, axis=0) / np.maximum(np.isfinite(Y).sum(axis=0), 1)
+    prior = (W * Yz).sum(axis=0) / np.maximum(W.sum(axis=0), 1e-12)
+    prior_var = np.maximum(np.nanvar(player_mean.to_numpy(), axis=0), 1e-6 * obs_var + 1e-12)
+
+    alpha = np.array([ALPHA_SLOW[s] for s in stats])
+    drift = obs_var * alpha ** 2 / (1.0 - alpha) / KALMAN_DAYS_PER_GAME
+    return obs_var, prior_var, prior, drift
+
+
+def kalman_weights(df: pd.DataFrame) -> np.ndarray:
+    """Per-game observation weight: player_possessions / KALMAN_REF_POSS."""
+    poss = df["player_possessions"].to_numpy(dtype=float) if "player_possessions" in df.columns \
+        else np.full(len(df), KALMAN_REF_POSS)
+    poss = np.where(np.isfinite(poss) & (poss > 0), poss, KALMAN_REF_POSS)
+    return poss / KALMAN_REF_POSS
+
+
+def fit_kalman_scales(df: pd.DataFrame, baselines: pd.DataFrame | None = None,
+                      cleaned: bool = False) -> pd.DataFrame:
+    """
+    Kalman noise scales as a table (one row per stat, KALMAN_SCALE_COLS).
+    Fit on the full master so every build - full, incremental, backtest
+    window - filters with the same scales. Pass cleaned=True for rows that
+    already went through prepare_master / clean_base_stats.
+    """
+    if not cleaned:
+        df = prepare_master(df.copy())
+        df = clean_base_stats(df, baselines if baselines is not None else era_baselines(df))
+    stats = [s for s in BASE_STATS if s in df.columns]
+    scales = kalman_noise_scales(df, stats, kalman_weights(df))
+    return pd.DataFrame(dict(zip(KALMAN_SCALE_COLS, scales)), index=pd.Index(stats, name="stat"))
 
-    # Box-only DARKO-lite components
-    print("Building DARKO-Lite box components...")
 
-    df["darkolite_box_offense"] = (
-        df["pts_per100_talent"] * 0.40 +
-        df["ast_per100_talent"] * 0.25 +
-        df["ts_pct_calc_talent"] * 12 +
-        df["efg_pct_calc_talent"] * 8 -
-        df["to_per100_talent"] * 0.25
+def load_kalman_scales(path: str = KALMAN_SCALES_CSV) -> pd.DataFrame | None:
+    return pd.read_csv(path, index_col="stat") if os.path.exists(path) else None
+
+
+def write_kalman_scales(scales: pd.DataFrame, path: str = KALMAN_SCALES_CSV):
+    tmp = path + ".tmp"
+    scales.to_csv(tmp)
+    os.replace(tmp, path)
+
+
+def add_kalman_talent(df: pd.DataFrame, scales: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Batched local-level Kalman filter over every player and stat at once.
+    df must be sorted by player and date (prepare_master). The loop runs over
+    a player's n-th game, not over players: step n updates every player's
+    n-th game together as one array operation. Adds per-game posterior means
+    ({stat}_talent) and variances ({stat}_talent_var).
+
+    scales (fit_kalman_scales) should come from the full master; without
+    them they are estimated from df, which for a subset of players (the
+    nightly refresh) gives different noise scales than a full rebuild.
+    """
+    stats = [s for s in BASE_STATS if s in df.columns]
+    for stat in BASE_STATS:
+        if stat not in stats:
+            print(f"Warning: missing {stat}, skipping.")
+    print(f"Kalman filter for {len(stats)} stats ...")
+
+    w = kalman_weights(df)
+    if scales is None:
+        scales = fit_kalman_scales(df, cleaned=True)
+    obs_var, prior_var, prior, drift = (scales.loc[stats, c].to_numpy(float) for c in KALMAN_SCALE_COLS)
+
+    player, _ = pd.factorize(df["player_id"].values)
+    step = df.groupby("player_id").cumcount().to_numpy()
+    gap = (
+        df.groupby("player_id")["game_date_team"].diff().dt.days
+          .fillna(0).clip(0, KALMAN_MAX_GAP_DAYS).to_numpy(dtype=float)
     )
+    Y = df[stats].to_numpy(dtype=float)
+
+    # Rows grouped by step: every player's n-th game is one contiguous slice
+    order = np.argsort(step, kind="stable")
+    bounds = np.searchsorted(step[order], np.arange(step.max() + 2))
+
+    n_players = player.max() + 1
+    M = np.tile(prior, (n_players, 1))
+    P = np.tile(prior_var, (n_players, 1))
+    out_m = np.empty_like(Y)
+    out_p = np.empty_like(Y)
 
-    df["darkolite_box_defense"] = (
-        df["reb_per100_talent"] * 0.12 +
-        df["blk_per100_talent"] * 0.30 +
-        df["stl_per100_talent"] * 0.25 -
-        df["to_per100_talent"] * 0.05
+    for n in range(len(bounds) - 1):
+        rows = order[bounds[n]:bounds[n + 1]]
+        pl = player[rows]
+
+        P_pred = P[pl] + drift * gap[rows, None]
+        R = obs_var / w[rows, None]
+        y = Y[rows]
+
+        K = np.where(np.isnan(y), 0.0, P_pred / (P_pred + R))
+        M[pl] = M[pl] + K * np.nan_to_num(y - M[pl])
+        P[pl] = (1.0 - K) * P_pred
+
+        out_m[rows] = M[pl]
+        out_p[rows] = P[pl]
+
+    talent = pd.DataFrame(
+        np.hstack([out_m, out_p]),
+        columns=[f"{s}_talent" for s in stats] + [f"{s}_talent_var" for s in stats],
+        index=df.index,
     )
+    return pd.concat([df, talent], axis=1)
+
+
+def weighted_talent(df: pd.DataFrame, coefs: dict) -> pd.Series:
+    terms = [df[f"{stat}_talent"] * coef for stat, coef in coefs.items()]
+    total = terms[0]
+    for term in terms[1:]:
+        total = total + term
+    return total
+
+
+def add_box_components(df: pd.DataFrame) -> pd.DataFrame:
+    # Box-only DARKO-lite components
+    df["darkolite_box_offense"] = weighted_talent(df, BOX_OFFENSE_COEFS)
+    df["darkolite_box_defense"] = weighted_talent(df, BOX_DEFENSE_COEFS)
 
     df["darkolite_box_total"] = df["darkolite_box_offense"] + df["darkolite_box_defense"]
+    return df
 
-    # Collapse to player-season via average of talent
-    print("Collapsing DARKO-Lite box talents to player-season...")
-    box_cols = [
-        "darkolite_box_offense",
-        "darkolite_box_defense",
-        "darkolite_box_total",
-    ]
 
+def collapse_player_season(df: pd.DataFrame, player_dim: pd.DataFrame) -> pd.DataFrame:
+    # Collapse to player-season via average of talent. Keyed on the id only,
+    # so differing name spellings can't split a player-season.
     df_box = (
-        df.groupby(["player_id", "player_name", "season"], as_index=False)
-          .agg({c: "mean" for c in box_cols})
+        df.groupby(["player_id", "season"], as_index=False)
+          .agg({c: "mean" for c in BOX_COLS})
     )
+    return attach_player_names(df_box, player_dim)
+
+
+def build_box_talent(df: pd.DataFrame, player_dim: pd.DataFrame | None = None,
+                     baselines: pd.DataFrame | None = None,
+                     kalman_scales: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Master feature rows → box-only player-season talent (z-scored within season).
+    Names come from the player dimension (built from df if not given); era
+    priors from the league baseline table (built from df if not given; pass
+    the full master's table when df is a subset of players). Kalman
+    scales should be passed whenever df is not the full master.
+    """
+    if player_dim is None:
+        player_dim = build_player_dim(df)
+    if baselines is None:
+        baselines = era_baselines(df)
+
+    df = prepare_master(df)
+    df = clean_base_stats(df, baselines)
+    if TALENT_ENGINE == "kalman":
+        df = add_kalman_talent(df, kalman_scales)
+    else:
+        df = add_ewma_talent(df)
+
+    print("Building DARKO-Lite box components...")
+    df = add_box_components(df)
+
+    print("Collapsing DARKO-Lite box talents to player-season...")
+    df_box = collapse_player_season(df, player_dim)
 
     # Within-season z-scoring of box-total to make it comparable across seasons
-    df_box = z_score(df_box, "darkolite_box_total", "season", "darkolite_box_z")
+    return z_score(df_box, "darkolite_box_total", "season", "darkolite_box_z")
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    print("Loading master features:", MASTER_CSV)
+    df = pd.read_csv(MASTER_CSV, low_memory=False)
+
+    baselines = era_baselines(df)
+    scales = None
+    if TALENT_ENGINE == "kalman":
+        scales = fit_kalman_scales(df, baselines)
+        print("Saving Kalman scales →", KALMAN_SCALES_CSV)
+        write_kalman_scales(scales)
+
+    df_box = build_box_talent(df, load_player_dim(PLAYER_DIM_CSV, df), baselines, scales)
 
     print("Saving box-only DARKO-Lite player-season file →", OUTPUT_BOX_SEASON)
     df_box.to_csv(OUTPUT_BOX_SEASON, index=False)
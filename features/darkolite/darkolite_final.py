@@ -2,6 +2,8 @@ import os
 import numpy as np
 import pandas as pd
 
+from darkolite_baselines import season_moments, z_from_moments
+
 # --------------------------------------------------------
 # CONFIG
 # --------------------------------------------------------
@@ -13,6 +15,10 @@ OUTPUT_FINAL = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_playe
 BOX_WEIGHT = 0.55
 RAPM_WEIGHT = 0.45
 
+# Weight RAPM by its bootstrap precision (needs rapm_se from the RAPM stage):
+# noisy RAPM hands part of its RAPM_WEIGHT back to the box component.
+RAPM_PRECISION_WEIGHTING = False
+
 # Scaling to DARKO-ish range
 SCALE = 3.5  # typical range ends up around -6 to +8
 
@@ -25,54 +31,53 @@ def z_score_qualified(df, col, group_col, outcol, min_minutes=None, minutes_col=
     Z-score col within group_col, but compute mean/std only on 'qualified' players
     (e.g., season_minutes >= 1000) if min_minutes is provided.
     """
-    df[outcol] = np.nan
-
-    def _apply(group):
-        g = group.copy()
-        if min_minutes is not None and minutes_col is not None and minutes_col in g.columns:
-            qual = g[g[minutes_col] >= min_minutes]
-        else:
-            qual = g
-
-        if qual.empty:
-            mu = g[col].mean()
-            sd = g[col].std(ddof=0)
-        else:
-            mu = qual[col].mean()
-            sd = qual[col].std(ddof=0)
-
-        if sd <= 0 or np.isnan(sd):
-            g[outcol] = 0.0
-        else:
-            g[outcol] = (g[col] - mu) / sd
-        return g
-
-    df = df.groupby(group_col, group_keys=False).apply(_apply)
-    return df
+    moments = season_moments(df, col, group_col)
+    if min_minutes is not None and minutes_col is not None and minutes_col in df.columns:
+        qual = season_moments(df, col, group_col, mask=df[minutes_col] >= min_minutes)
+        # Groups with no qualified players fall back to all rows
+        moments = qual.reindex(moments.index).combine_first(moments)
+    return z_from_moments(df, col, moments, group_col, outcol)
 
 
-# --------------------------------------------------------
-# MAIN
-# --------------------------------------------------------
-if __name__ == "__main__":
-    print("Loading box:", BOX_CSV)
-    box = pd.read_csv(BOX_CSV)
+def rapm_precision_weights(df: pd.DataFrame, has_rapm: pd.Series | None = None) -> pd.DataFrame:
+    """
+    Per-row blend weights from RAPM bootstrap SEs. The SE is put in z units
+    (divided by the season's RAPM sd) and turned into a reliability
+    1 / (1 + se_z²); RAPM keeps RAPM_WEIGHT * reliability and the rest goes
+    to box. Players with a RAPM but no bootstrap SE (season too small to
+    bootstrap) keep the fixed weights; players with no RAPM at all
+    (has_rapm False, value filled with 0) get reliability 0.
+    """
+    sd = df["season"].map(season_moments(df, "rapm_darkolite")["sd"])
+    se_z = df["rapm_se"] / sd.replace(0, np.nan)
+    reliability = (1.0 / (1.0 + se_z ** 2)).fillna(1.0)
+    if has_rapm is not None:
+        reliability = reliability.where(has_rapm, 0.0)
+
+    df["rapm_weight"] = RAPM_WEIGHT * reliability
+    df["box_weight"] = BOX_WEIGHT + RAPM_WEIGHT * (1.0 - reliability)
+    return df
 
-    print("Loading RAPM:", RAPM_CSV)
-    rapm = pd.read_csv(RAPM_CSV)
 
+def blend_darkolite(box: pd.DataFrame, rapm: pd.DataFrame) -> pd.DataFrame:
+    """
+    Box player-season talent + RAPM → final DARKO-Lite player-season table.
+    """
     box["season"] = box["season"].astype(str)
     rapm["season"] = rapm["season"].astype(str)
     box["player_id"] = box["player_id"].astype(int)
     rapm["player_id"] = rapm["player_id"].astype(int)
 
     # Merge
+    rapm_cols = ["player_id", "season", "rapm_darkolite"]
+    rapm_cols += [c for c in ["rapm_se", "rapm_lo", "rapm_hi"] if c in rapm.columns]
     df = box.merge(
-        rapm[["player_id", "season", "rapm_darkolite"]],
+        rapm[rapm_cols],
         on=["player_id", "season"],
         how="left"
     )
 
+    has_rapm = df["rapm_darkolite"].notna()
     df["rapm_darkolite"] = df["rapm_darkolite"].fillna(0.0)
 
     # If you have season_minutes, merge it in for better z-scoring
@@ -86,13 +91,30 @@ if __name__ == "__main__":
                            min_minutes=None, minutes_col=None)
 
     # DARKO-Lite blend
-    df["darkolite_blend_z"] = BOX_WEIGHT * df["box_z"] + RAPM_WEIGHT * df["rapm_z"]
+    if RAPM_PRECISION_WEIGHTING and "rapm_se" in df.columns:
+        df = rapm_precision_weights(df, has_rapm)
+        df["darkolite_blend_z"] = df["box_weight"] * df["box_z"] + df["rapm_weight"] * df["rapm_z"]
+    else:
+        df["darkolite_blend_z"] = BOX_WEIGHT * df["box_z"] + RAPM_WEIGHT * df["rapm_z"]
 
     # Scale to DPM-like units
     df["darkolite_dpm"] = (df["darkolite_blend_z"] * SCALE).clip(-10, 10)
 
     # Sort nicely
-    df = df.sort_values(["season", "darkolite_dpm"], ascending=[True, False])
+    return df.sort_values(["season", "darkolite_dpm"], ascending=[True, False])
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    print("Loading box:", BOX_CSV)
+    box = pd.read_csv(BOX_CSV)
+
+    print("Loading RAPM:", RAPM_CSV)
+    rapm = pd.read_csv(RAPM_CSV)
+
+    df = blend_darkolite(box, rapm)
 
     print("Saving final DARKO-Lite file →", OUTPUT_FINAL)
     df.to_csv(OUTPUT_FINAL, index=False)
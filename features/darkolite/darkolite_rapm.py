@@ -1,6 +1,19 @@
 import os
+import sys
+import glob
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from scipy.linalg import cho_factor, cho_solve
+from scipy.sparse.linalg import cg
+
+# Player dimension (canonical names by id) is built during ingestion
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ingestion"))
+from build_player_dim import build_player_dim, load_player_dim, PLAYER_DIM_CSV
 
 # --------------------------------------------------------
 # CONFIG
@@ -10,41 +23,121 @@ OUTPUT_RAPM = r"C:\Users\gngim\Desktop\Darko\features\darkolite_rapm_player_seas
 
 LAMBDA_RIDGE = 1500.0  # heavier ridge to shrink noise
 
+# Master columns the RAPM stage reads (lets in-memory callers hand over a
+# narrow projection instead of the full feature frame)
+RAPM_COLUMNS = [
+    "game_id", "team_id", "player_id", "player_name", "season", "game_date_team",
+    "minutes", "team_minutes", "plus_minus_team", "team_possessions", "pts_team",
+]
+
+# Design rows:
+# "one_sided" = each team-game row holds only that team's minute shares
+# "two_sided" = one row per game, +share for the team, −share for the opponent
+# "off_def"   = per-possession points scored regressed on separate offense
+#               (team) and defense (opponent) coefficients
+RAPM_DESIGN = "one_sided"
+
+# Target / row weights:
+# "per48"  = net rating per 48 minutes, weighted by sqrt(team_minutes / 48)
+# "per100" = net rating per 100 possessions, weighted by sqrt(possessions / 100)
+#            (pace-neutral, comparable across eras)
+RAPM_TARGET = "per48"
+
+# "ridge" = every season solved cold, shrunk toward 0
+# "prior" = shrink toward each player's previous-season value (Bayesian RAPM)
+RAPM_MODE = "ridge"
+
+# Prior source for RAPM_MODE = "prior": last season's "rapm" or "box" talent
+PRIOR_SOURCE = "rapm"
+BOX_SEASON_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_box_player_season.csv"
+
+PRIOR_DECAY = 0.80            # regress last season's value toward 0 before using it
+PRIOR_MINUTES_FULL = 1500.0   # last-season minutes at which a prior is fully trusted
+PRIOR_PRECISION_MAX = 3.0     # extra ridge strength (x LAMBDA_RIDGE) for a fully trusted prior
+
+CG_TOL = 1e-8
+CG_MAXITER = 1000
+
+# Bootstrap uncertainty (opt-in; 0 replicates = off). Seasons with fewer
+# design rows than BOOTSTRAP_MIN_ROWS are not bootstrapped.
+BOOTSTRAP_REPLICATES = 0
+BOOTSTRAP_MIN_ROWS = 200
+BOOTSTRAP_CI = 0.90
+BOOTSTRAP_WORKERS = os.cpu_count()
+BOOTSTRAP_SEED = 42
+
+# Per-season design cache: sparse X, y, w and the column → player_id map,
+# keyed by a fingerprint of the season's input rows and of the source of
+# every function that builds the system (SYSTEM_FUNCTIONS), so editing one
+# of them invalidates the cache. Past seasons never change, so reruns and
+# LAMBDA_RIDGE / prior experiments skip straight to the solve.
+DESIGN_CACHE_DIR = r"C:\Users\gngim\Desktop\Darko\features\darkolite\rapm_design_cache"
+USE_DESIGN_CACHE = True
+
 
 # --------------------------------------------------------
 # HELPERS
 # --------------------------------------------------------
+def usable_rows(df_season: pd.DataFrame) -> pd.DataFrame:
+    """Filter junk: garbage-time cameos and team-games with missing minutes."""
+    return df_season[(df_season["minutes"] >= 4) & (df_season["team_minutes"] >= 120)]
+
+
 def winsorize(s: pd.Series, lo: float = 0.01, hi: float = 0.99) -> pd.Series:
     if s.empty:
         return s
     return s.clip(s.quantile(lo), s.quantile(hi))
 
 
-def safe_name(series: pd.Series) -> str:
-    cleaned = series.dropna()
-    cleaned = cleaned[cleaned.astype(str).str.strip() != ""]
-    if cleaned.empty:
-        return "Unknown"
-    m = cleaned.mode()
-    if not m.empty:
-        return m.iloc[0]
-    return cleaned.iloc[0]
-
-
-def build_team_game_table(df_season: pd.DataFrame) -> pd.DataFrame:
-    grp = df_season.groupby(["game_id", "team_id"], as_index=False)
-    tg = grp.agg({
-        "plus_minus_team": "first",
-        "team_minutes": "first"
-    })
+def build_team_game_table(df_season: pd.DataFrame, clip: bool = True) -> pd.DataFrame:
+    """
+    One row per team-game with every RAPM target built from a single grouped
+    pass: net_rating_team (per 48), plus net_rating_100 / ortg_team (per 100
+    possessions) when team_possessions / pts_team are in the master file.
+    Targets are winsorized over the season unless clip=False (callers that
+    must not see later games clip them themselves).
+    """
+    winsorize_ = winsorize if clip else (lambda s: s)
+    cols = ["plus_minus_team", "team_minutes"]
+    cols += [c for c in ["team_possessions", "pts_team"] if c in df_season.columns]
+    tg = df_season.groupby(["game_id", "team_id"], as_index=False)[cols].first()
 
     tg = tg[tg["team_minutes"] > 0].copy()
     tg["net_rating_team"] = tg["plus_minus_team"] / (tg["team_minutes"] / 48.0)
-    tg["net_rating_team"] = winsorize(tg["net_rating_team"])
+    tg["net_rating_team"] = winsorize_(tg["net_rating_team"])
+
+    if "team_possessions" in tg.columns:
+        poss = tg["team_possessions"].where(tg["team_possessions"] > 0)
+        tg["net_rating_100"] = winsorize_(tg["plus_minus_team"] / poss * 100.0)
+        if "pts_team" in tg.columns:
+            tg["ortg_team"] = winsorize_(tg["pts_team"] / poss * 100.0)
+
     tg["team_game_id"] = tg["game_id"].astype(str) + "_" + tg["team_id"].astype(str)
     return tg.set_index("team_game_id")
 
 
+def rapm_target(team_games: pd.DataFrame, target: str = RAPM_TARGET):
+    """
+    (y, w, valid) for the chosen target: w are sqrt row weights and valid
+    marks team-games that have the target (per100 needs possessions).
+    """
+    if target == "per48":
+        y = team_games["net_rating_team"].values
+        w = np.sqrt(team_games["team_minutes"].values / 48.0)
+        return y, w, np.ones(len(team_games), dtype=bool)
+
+    if target == "per100":
+        if "net_rating_100" not in team_games.columns:
+            raise ValueError("RAPM_TARGET = 'per100' needs team_possessions in the master file.")
+        y = team_games["net_rating_100"].values
+        poss = team_games["team_possessions"].values
+        valid = np.isfinite(y) & (poss > 0)
+        w = np.sqrt(np.where(valid, poss, 0.0) / 100.0)
+        return np.where(valid, y, 0.0), w, valid
+
+    raise ValueError(f"Unknown RAPM target: {target}")
+
+
 def build_design_matrix(df_season: pd.DataFrame, team_games: pd.DataFrame) -> pd.DataFrame:
     df = df_season.copy()
     df["minute_share"] = (df["minutes"] / df["team_minutes"]).clip(0, 1)
@@ -62,6 +155,216 @@ def build_design_matrix(df_season: pd.DataFrame, team_games: pd.DataFrame) -> pd
     return design.reindex(team_games.index)
 
 
+def build_sparse_design(df_season: pd.DataFrame,
+                        team_games: pd.DataFrame) -> tuple[sp.csr_matrix, pd.Index]:
+    """
+    Sparse twin of build_design_matrix: same summed minute shares, rows
+    aligned to team_games, columns = sorted player_ids.
+    """
+    row = pd.Series(np.arange(len(team_games)), index=team_games.index)
+    key = df_season["game_id"].astype(str) + "_" + df_season["team_id"].astype(str)
+    r = key.map(row)
+    mask = r.notna().values
+
+    share = (df_season["minutes"] / df_season["team_minutes"]).clip(0, 1).values[mask]
+    col, players = pd.factorize(df_season["player_id"].values[mask], sort=True)
+
+    X = sp.csr_matrix(
+        (share, (r.values[mask].astype(int), col)),
+        shape=(len(team_games), len(players)),
+    )
+    return X, pd.Index(players, name="player_id")
+
+
+def opponent_rows(team_games: pd.DataFrame) -> np.ndarray:
+    """
+    Row position of the opponent's team-game for every row (-1 if the game
+    doesn't have exactly two team rows).
+    """
+    pos = pd.Series(np.arange(len(team_games)), index=team_games.index)
+    g = pos.groupby(team_games["game_id"].values)
+    size = g.transform("size").values
+    first = g.transform("first").values
+    last = g.transform("last").values
+
+    opp = np.where(pos.values == first, last, first)
+    return np.where(size == 2, opp, -1)
+
+
+def build_rapm_system(df_season: pd.DataFrame,
+                      team_games: pd.DataFrame,
+                      design: str = RAPM_DESIGN,
+                      target: str = RAPM_TARGET):
+    """
+    Sparse design X, target y and sqrt weights w for the chosen RAPM design.
+    Returns (X, y, w, players); off_def has 2 * len(players) columns
+    laid out as [offense | defense].
+    """
+    X_own, players = build_sparse_design(df_season, team_games)
+
+    if design == "off_def":
+        # Points scored per 100 possessions is the only off_def target
+        if "ortg_team" not in team_games.columns:
+            raise ValueError("RAPM_DESIGN = 'off_def' needs team_possessions and pts_team.")
+        y = team_games["ortg_team"].values
+        poss = team_games["team_possessions"].values
+        valid = np.isfinite(y) & (poss > 0)
+        w = np.sqrt(np.where(valid, poss, 0.0) / 100.0)
+    else:
+        y, w, valid = rapm_target(team_games, target)
+
+    if design == "one_sided":
+        keep = np.flatnonzero(valid)
+        return X_own[keep], y[keep], w[keep], players
+
+    opp = opponent_rows(team_games)
+    paired = (opp >= 0) & valid
+
+    if design == "two_sided":
+        # Both rows of a game carry the same information with opposite
+        # sign, so keep one row per game.
+        keep = np.flatnonzero(paired & (np.arange(len(opp)) < opp))
+        X = X_own[keep] - X_own[opp[keep]]
+        return X.tocsr(), y[keep], w[keep], players
+
+    if design == "off_def":
+        keep = np.flatnonzero(paired & valid[np.maximum(opp, 0)])
+        ortg = y[keep]
+
+        # pts/100 = league avg + offense(team) − defense(opponent)
+        X = sp.hstack([X_own[keep], -X_own[opp[keep]]]).tocsr()
+        return X, ortg - ortg.mean(), w[keep], players
+
+    raise ValueError(f"Unknown RAPM design: {design}")
+
+
+SYSTEM_FUNCTIONS = [usable_rows, winsorize, build_team_game_table, rapm_target,
+                    build_sparse_design, opponent_rows, build_rapm_system]
+
+
+def system_target(design: str, target: str) -> str:
+    """The target as far as the system is concerned: off_def always fits ortg."""
+    return "ortg" if design == "off_def" else target
+
+
+def season_fingerprint(df_season: pd.DataFrame, design: str, target: str) -> str:
+    """Hash of everything the RAPM system for one season is built from: rows and code."""
+    cols = [c for c in RAPM_COLUMNS if c in df_season.columns and c not in ("player_name", "game_date_team")]
+    h = hashlib.sha256(pd.util.hash_pandas_object(df_season[cols], index=False).values.tobytes())
+    h.update(f"{design}|{system_target(design, target)}|{','.join(cols)}".encode("utf-8"))
+    for fn in SYSTEM_FUNCTIONS:
+        h.update(inspect.getsource(fn).encode("utf-8"))
+    return h.hexdigest()[:20]
+
+
+def cached_rapm_system(df_season: pd.DataFrame,
+                       season: str,
+                       design: str = RAPM_DESIGN,
+                       target: str = RAPM_TARGET,
+                       cache_dir: str | None = None):
+    """
+    build_rapm_system through the on-disk cache: a hit loads the stored
+    (X, y, w, players); a miss builds, stores and replaces any stale entry
+    for the same season / design / target.
+    """
+    cache_dir = cache_dir or DESIGN_CACHE_DIR
+    stem = f"{season}_{design}_{system_target(design, target)}"
+    path = os.path.join(cache_dir, f"{stem}_{season_fingerprint(df_season, design, target)}.npz")
+
+    if os.path.exists(path):
+        with np.load(path) as z:
+            X = sp.csr_matrix((z["data"], z["indices"], z["indptr"]), shape=tuple(z["shape"]))
+            print("  Design cache hit.")
+            return X, z["y"], z["w"], pd.Index(z["players"], name="player_id")
+
+    team_games = build_team_game_table(df_season)
+    X, y, w, players = build_rapm_system(df_season, team_games, design, target)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(cache_dir, f"{stem}_*.npz")):
+        os.remove(stale)
+
+    # np.savez appends .npz to names that lack it, so the temp name keeps it
+    tmp = path[:-len(".npz")] + ".tmp.npz"
+    X = X.tocsr()
+    np.savez(tmp, data=X.data, indices=X.indices, indptr=X.indptr, shape=np.array(X.shape),
+             y=y, w=w, players=players.values.astype(np.int64))
+    os.replace(tmp, path)
+    return X, y, w, players
+
+
+def solve_sparse_ridge(X: sp.spmatrix,
+                       y: np.ndarray,
+                       w: np.ndarray,
+                       precision,
+                       prior_mean: np.ndarray | None = None,
+                       x0: np.ndarray | None = None) -> np.ndarray:
+    """
+    Weighted ridge on a sparse design via CG on the normal equations:
+        (XᵀWX + Λ) β = XᵀWy + Λ μ
+    w are sqrt weights (as in compute_ridge_rapm); precision may be a scalar
+    or one value per coefficient.
+    """
+    n = X.shape[1]
+    precision = np.broadcast_to(np.asarray(precision, dtype=float), (n,))
+
+    Xw = sp.diags(w) @ X
+    A = (Xw.T @ Xw).tocsr() + sp.diags(precision)
+    b = Xw.T @ (y * w)
+    if prior_mean is not None:
+        b = b + precision * prior_mean
+
+    beta, info = cg(A, b, x0=x0, rtol=CG_TOL, maxiter=CG_MAXITER)
+    if info > 0:
+        print(f"  Warning: CG did not converge in {info} iterations.")
+    return beta
+
+
+def bootstrap_rapm(X: sp.spmatrix,
+                   y: np.ndarray,
+                   w: np.ndarray,
+                   precision,
+                   beta: np.ndarray,
+                   n_sides: int = 1,
+                   n_boot: int = BOOTSTRAP_REPLICATES,
+                   ci: float = BOOTSTRAP_CI,
+                   seed: int = BOOTSTRAP_SEED) -> dict:
+    """
+    Bootstrap SEs / intervals for a fitted RAPM by resampling team-game
+    residuals. The design stays fixed, so every replicate shares one
+    Cholesky factor of (XᵀWX + Λ) and all replicates are solved at once as
+    a multi-column right-hand side:
+        β_b − β = (XᵀWX + Λ)⁻¹ XᵀW r*_b
+    Returns per-player se / lo / hi deviations (net of both sides for off_def)
+    around the raw, unwinsorized β. The exact replicate deviation also has a
+    constant term (XᵀWX + Λ)⁻¹ Λ (μ − β), the shrinkage toward the prior
+    mean μ (0 outside prior mode); it is left out, so the intervals are
+    centred on the fit.
+    """
+    n = X.shape[1]
+    precision = np.broadcast_to(np.asarray(precision, dtype=float), (n,))
+
+    Xw = sp.diags(w) @ X
+    A = (Xw.T @ Xw).toarray()
+    A[np.diag_indices_from(A)] += precision
+    factor = cho_factor(A)
+
+    resid = w * y - Xw @ beta
+    resid = resid - resid.mean()
+
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(resid), size=(len(resid), n_boot))
+    dev = cho_solve(factor, Xw.T @ resid[idx])
+    dev = dev.reshape(n_sides, n // n_sides, n_boot).sum(axis=0)
+
+    tail = (1.0 - ci) / 2.0
+    return {
+        "se": dev.std(axis=1, ddof=1),
+        "lo": np.quantile(dev, tail, axis=1),
+        "hi": np.quantile(dev, 1.0 - tail, axis=1),
+    }
+
+
 def compute_ridge_rapm(design: pd.DataFrame, team_games: pd.DataFrame, lam: float) -> pd.Series:
     X = design.values
     y = team_games["net_rating_team"].values
@@ -76,13 +379,47 @@ def compute_ridge_rapm(design: pd.DataFrame, team_games: pd.DataFrame, lam: floa
     return winsorize(rapm)
 
 
-# --------------------------------------------------------
-# MAIN
-# --------------------------------------------------------
-if __name__ == "__main__":
-    print("Loading:", MASTER_CSV)
-    df = pd.read_csv(MASTER_CSV, low_memory=False)
+def build_player_prior(players: pd.Index,
+                       prev: pd.DataFrame | None,
+                       lam: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per-player prior mean and ridge precision for this season's players.
+
+    prev is indexed by player_id with columns prior_value and prior_minutes.
+    Returning players are pulled toward their (decayed) previous-season value,
+    more strongly the more they played; newcomers keep plain ridge toward 0.
+    """
+    mean = np.zeros(len(players))
+    precision = np.full(len(players), lam)
+
+    if prev is None or prev.empty:
+        return mean, precision
+
+    prev = prev.reindex(players)
+    has_prior = prev["prior_value"].notna().values
+
+    reliability = (prev["prior_minutes"].fillna(0).values / PRIOR_MINUTES_FULL).clip(0, 1)
+    mean[has_prior] = PRIOR_DECAY * prev["prior_value"].values[has_prior]
+    precision[has_prior] = lam * (1.0 + PRIOR_PRECISION_MAX * reliability[has_prior])
+    return mean, precision
 
+
+def box_prior_from_season(box_prev: pd.DataFrame, rapm_prev: pd.Series | None) -> pd.Series:
+    """
+    Map last season's box z-scores onto the RAPM scale with a one-variable
+    least-squares fit against last season's RAPM (slope only, through 0).
+    """
+    box_z = box_prev.set_index("player_id")["darkolite_box_z"]
+    if rapm_prev is None or rapm_prev.empty:
+        return box_z * 0.0
+
+    both = pd.concat([box_z, rapm_prev], axis=1, join="inner").dropna()
+    denom = (both.iloc[:, 0] ** 2).sum()
+    slope = (both.iloc[:, 0] * both.iloc[:, 1]).sum() / denom if denom > 0 else 0.0
+    return box_z * slope
+
+
+def prepare_master(df: pd.DataFrame) -> pd.DataFrame:
     df["game_id"] = df["game_id"].astype(str)
     df["team_id"] = df["team_id"].astype(str)
     df["player_id"] = df["player_id"].astype(int)
@@ -91,44 +428,152 @@ if __name__ == "__main__":
     # Clean minutes
     df["minutes"] = df["minutes"].fillna(0)
     df["team_minutes"] = df["team_minutes"].fillna(240)
+    return df
+
+
+def compute_rapm_by_season(df: pd.DataFrame,
+                           box_seasons: pd.DataFrame | None = None,
+                           emit_seasons=None,
+                           player_dim: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    RAPM for every season in df, in order (prior mode carries each season
+    into the next). emit_seasons limits which seasons are returned (and
+    bootstrapped) without breaking the prior chain. Names come from the
+    player dimension (built from df if not given).
+    """
+    if player_dim is None:
+        player_dim = build_player_dim(df)
+    names = player_dim.set_index("player_id")["player_name"]
 
     rapm_rows = []
     seasons = sorted(df["season"].unique())
     print("Seasons:", seasons)
+    print("RAPM mode:", RAPM_MODE, "| design:", RAPM_DESIGN, "| target:", RAPM_TARGET)
+
+    if box_seasons is None and RAPM_MODE == "prior" and PRIOR_SOURCE == "box":
+        print("Loading box priors:", BOX_SEASON_CSV)
+        box_seasons = pd.read_csv(BOX_SEASON_CSV)
+        box_seasons["season"] = box_seasons["season"].astype(str)
+        box_seasons["player_id"] = box_seasons["player_id"].astype(int)
+
+    # Bootstrap replicates run in worker processes while later seasons solve;
+    # the pool is only started once a season qualifies
+    pool = None
+    boot_jobs = []
 
-    for season in seasons:
+    # Carried season to season in prior mode
+    prev_season = None
+    prev_rapm = None
+    prev_minutes = None
+
+    for season_idx, season in enumerate(seasons):
         print(f"\n--- RAPM for season {season} ---")
         sub = df[df["season"] == season].copy()
 
-        # Filter junk
-        sub = sub[(sub["minutes"] >= 4) & (sub["team_minutes"] >= 120)]
+        sub = usable_rows(sub)
         if sub.empty:
             print("  No usable rows for this season.")
             continue
 
-        team_games = build_team_game_table(sub)
-        design = build_design_matrix(sub, team_games)
+        if USE_DESIGN_CACHE:
+            X, y, w, players = cached_rapm_system(sub, season, RAPM_DESIGN, RAPM_TARGET)
+        else:
+            team_games = build_team_game_table(sub)
+            X, y, w, players = build_rapm_system(sub, team_games, RAPM_DESIGN, RAPM_TARGET)
 
-        if design.empty:
+        if X.shape[0] == 0 or len(players) == 0:
             print("  Empty design matrix, skipping.")
             continue
 
-        rapm = compute_ridge_rapm(design, team_games, LAMBDA_RIDGE)
-
-        names = sub.groupby("player_id")["player_name"].agg(safe_name)
+        n_sides = X.shape[1] // len(players)
+
+        if RAPM_MODE == "prior":
+            prior = None
+            if prev_rapm is not None:
+                if PRIOR_SOURCE == "box":
+                    box_prev = box_seasons[box_seasons["season"] == prev_season]
+                    prior_value = box_prior_from_season(box_prev, prev_rapm)
+                else:
+                    prior_value = prev_rapm
+                prior = pd.DataFrame({
+                    "prior_value": prior_value,
+                    "prior_minutes": prev_minutes,
+                })
+
+            mean, precision = build_player_prior(players, prior, LAMBDA_RIDGE)
+
+            # Warm start: last season's solution for returning players, prior mean otherwise
+            x0 = mean.copy()
+            if prev_rapm is not None:
+                last = prev_rapm.reindex(players).values
+                x0 = np.where(np.isnan(last), mean, last)
+
+            # off_def: split each net prior evenly across the two sides
+            mean = np.tile(mean / n_sides, n_sides)
+            x0 = np.tile(x0 / n_sides, n_sides)
+            precision = np.tile(precision, n_sides)
+            beta = solve_sparse_ridge(X, y, w, precision, prior_mean=mean, x0=x0)
+        else:
+            precision = LAMBDA_RIDGE
+            beta = solve_sparse_ridge(X, y, w, precision)
+
+        sides = beta.reshape(n_sides, len(players))
+        raw = sides.sum(axis=0)
+        rapm = winsorize(pd.Series(raw, index=players))
+
+        if RAPM_MODE == "prior":
+            prev_season = season
+            prev_rapm = rapm
+            prev_minutes = sub.groupby("player_id")["minutes"].sum()
+
+        if emit_seasons is not None and season not in emit_seasons:
+            continue
 
         out = pd.DataFrame({
             "player_id": rapm.index,
             "rapm_darkolite": rapm.values,
             "season": season,
         })
-        out["player_name"] = out["player_id"].map(names)
+        out["player_name"] = out["player_id"].map(names).fillna("Unknown")
+        if RAPM_DESIGN == "off_def":
+            out["rapm_off"] = winsorize(pd.Series(sides[0])).values
+            out["rapm_def"] = winsorize(pd.Series(sides[1])).values
         rapm_rows.append(out)
 
+        if BOOTSTRAP_REPLICATES > 0 and X.shape[0] >= BOOTSTRAP_MIN_ROWS:
+            if pool is None:
+                pool = ProcessPoolExecutor(max_workers=BOOTSTRAP_WORKERS)
+            job = pool.submit(bootstrap_rapm, X, y, w, precision, beta, n_sides,
+                              BOOTSTRAP_REPLICATES, BOOTSTRAP_CI, BOOTSTRAP_SEED + season_idx)
+            boot_jobs.append((out, raw, job))
+
+    if pool is not None:
+        print(f"\nCollecting {BOOTSTRAP_REPLICATES} bootstrap replicates per season...")
+        for out, raw, job in boot_jobs:
+            boot = job.result()
+            # Intervals around the raw β, clipped to the same season caps
+            # as rapm_darkolite (its min / max are the winsor quantiles)
+            lo_cap, hi_cap = out["rapm_darkolite"].min(), out["rapm_darkolite"].max()
+            out["rapm_se"] = boot["se"]
+            out["rapm_lo"] = np.clip(raw + boot["lo"], lo_cap, hi_cap)
+            out["rapm_hi"] = np.clip(raw + boot["hi"], lo_cap, hi_cap)
+        pool.shutdown()
+
     if not rapm_rows:
         raise ValueError("No RAPM results computed.")
 
-    rapm_all = pd.concat(rapm_rows, ignore_index=True)
+    return pd.concat(rapm_rows, ignore_index=True)
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    print("Loading:", MASTER_CSV)
+    df = pd.read_csv(MASTER_CSV, low_memory=False)
+
+    df = prepare_master(df)
+    rapm_all = compute_rapm_by_season(df, player_dim=load_player_dim(PLAYER_DIM_CSV, df))
 
     print("Saving RAPM output →", OUTPUT_RAPM)
     rapm_all.to_csv(OUTPUT_RAPM, index=False)
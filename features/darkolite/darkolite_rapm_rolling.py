@@ -0,0 +1,187 @@
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import cg
+
+from darkolite_rapm import (
+    build_team_game_table, build_sparse_design, rapm_target, winsorize,
+    LAMBDA_RIDGE, RAPM_TARGET, CG_TOL, CG_MAXITER,
+)
+
+# --------------------------------------------------------
+# CONFIG
+# --------------------------------------------------------
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+OUTPUT_ROLLING = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_rapm_rolling.csv"
+
+# Trailing window: either calendar days or a team's last N games.
+# Exactly one of these should be set.
+WINDOW_DAYS = 365
+WINDOW_GAMES = None  # e.g. 82
+
+# Seasons to emit a daily series for (None = all). Earlier games still feed
+# the window so the first days of a season are not solved cold.
+SEASONS = None
+
+# Targets are winsorized against earlier team-games only (quantiles over
+# every team-game before it, across seasons), so a day's rating never
+# depends on later results. Off = season-wide caps, as the season RAPM.
+CAUSAL_TARGETS = True
+TARGET_MIN_GAMES = 200
+
+
+# --------------------------------------------------------
+# HELPERS
+# --------------------------------------------------------
+def causal_winsorize(s: pd.Series, lo: float = 0.01, hi: float = 0.99) -> pd.Series:
+    """Clip each (date-sorted) value to the quantiles of the non-missing values before it."""
+    prev = s.shift(1).expanding(min_periods=TARGET_MIN_GAMES)
+    return s.clip(prev.quantile(lo), prev.quantile(hi))
+
+
+def build_rolling_rows(df: pd.DataFrame) -> tuple[pd.DataFrame, sp.csr_matrix, pd.Index]:
+    """
+    One row per team-game across every season, sorted by date, plus a sparse
+    minute-share matrix (team-game x player) sharing that row order.
+    Targets are the season RAPM's net ratings, winsorized causally when
+    CAUSAL_TARGETS is on.
+    """
+    tables = []
+    for season, sub in df.groupby("season", sort=True):
+        tg = build_team_game_table(sub, clip=not CAUSAL_TARGETS)
+        dates = sub.groupby(["game_id", "team_id"])["game_date_team"].first()
+        tg["game_date"] = dates.reindex(pd.MultiIndex.from_frame(tg[["game_id", "team_id"]])).values
+        tg["season"] = season
+        tables.append(tg)
+
+    team_games = pd.concat(tables)
+    team_games = team_games.sort_values(["game_date", "team_id"], kind="stable")
+    if CAUSAL_TARGETS:
+        for col in ["net_rating_team", "net_rating_100", "ortg_team"]:
+            if col in team_games.columns:
+                team_games[col] = causal_winsorize(team_games[col])
+
+    X, players = build_sparse_design(df, team_games)
+    return team_games, X, players
+
+
+def expiry_dates(team_games: pd.DataFrame) -> np.ndarray:
+    """
+    Date on which each team-game leaves the window (NaT = never inside the data).
+    """
+    if WINDOW_GAMES is not None:
+        # A team-game expires on the date of that team's game N games later
+        dates = team_games.groupby("team_id")["game_date"].shift(-int(WINDOW_GAMES))
+        return dates.values
+    return (team_games["game_date"] + pd.Timedelta(days=WINDOW_DAYS)).values
+
+
+def accumulate(A: np.ndarray, b: np.ndarray, X_rows: sp.csr_matrix,
+               w: np.ndarray, y: np.ndarray, sign: float) -> None:
+    """
+    In-place A += sign * XᵀWX and b += sign * XᵀWy for a batch of team-games.
+    """
+    Xw = sp.diags(w) @ X_rows
+    M = (X_rows.T @ Xw).tocoo()
+    np.add.at(A, (M.row, M.col), sign * M.data)
+    b += sign * (Xw.T @ y)
+
+
+def rolling_rapm(team_games: pd.DataFrame, X: sp.csr_matrix, players: pd.Index,
+                 lam: float = LAMBDA_RIDGE, emit_seasons=None,
+                 target: str = RAPM_TARGET) -> pd.DataFrame:
+    """
+    Walk the schedule one game-date at a time, adding that day's team-games
+    to running XᵀWX / XᵀWy accumulators and subtracting those that fell out
+    of the window, then re-solve with CG warm-started from the previous day.
+    Only players with exposure inside the window are solved (and emitted).
+    """
+    n = len(players)
+    A = np.zeros((n, n))
+    b = np.zeros(n)
+    beta = np.zeros(n)
+
+    y, w, _ = rapm_target(team_games, target)
+    w = w ** 2  # rows with no target get weight 0
+    dates = team_games["game_date"].values
+    expires = expiry_dates(team_games)
+    seasons = team_games["season"].values
+
+    unique_dates = np.unique(dates)
+    exp_order = np.argsort(expires, kind="stable")
+    exp_sorted = expires[exp_order]
+    exp_ptr = 0
+
+    add_bounds = np.searchsorted(dates, unique_dates, side="left")
+    add_bounds = np.append(add_bounds, len(dates))
+
+    out = []
+    for i, day in enumerate(unique_dates):
+        # Drop everything whose expiry date has arrived
+        exp_end = np.searchsorted(exp_sorted, day, side="right")
+        if exp_end > exp_ptr:
+            rows = exp_order[exp_ptr:exp_end]
+            accumulate(A, b, X[rows], w[rows], y[rows], -1.0)
+            exp_ptr = exp_end
+
+        rows = np.arange(add_bounds[i], add_bounds[i + 1])
+        accumulate(A, b, X[rows], w[rows], y[rows], +1.0)
+
+        season = seasons[rows[0]]
+        if emit_seasons is not None and season not in emit_seasons:
+            continue
+
+        active = np.flatnonzero(np.diag(A) > 1e-12)
+        if active.size == 0:
+            continue
+
+        A_act = A[np.ix_(active, active)]
+        A_act[np.diag_indices_from(A_act)] += lam
+        beta_act, info = cg(A_act, b[active], x0=beta[active], rtol=CG_TOL, maxiter=CG_MAXITER)
+        if info > 0:
+            print(f"  Warning: CG did not converge on {pd.Timestamp(day).date()}.")
+        beta[:] = 0.0
+        beta[active] = beta_act
+
+        out.append(pd.DataFrame({
+            "game_date": day,
+            "season": season,
+            "player_id": players[active],
+            "rapm_rolling": winsorize(pd.Series(beta_act)).values,
+        }))
+
+    if not out:
+        return pd.DataFrame(columns=["game_date", "season", "player_id", "rapm_rolling"])
+    return pd.concat(out, ignore_index=True)
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    print("Loading:", MASTER_CSV)
+    df = pd.read_csv(MASTER_CSV, low_memory=False)
+
+    df["game_id"] = df["game_id"].astype(str)
+    df["team_id"] = df["team_id"].astype(str)
+    df["player_id"] = df["player_id"].astype(int)
+    df["season"] = df["season"].astype(str)
+    df["game_date_team"] = pd.to_datetime(df["game_date_team"])
+
+    df["minutes"] = df["minutes"].fillna(0)
+    df["team_minutes"] = df["team_minutes"].fillna(240)
+    df = df[(df["minutes"] >= 4) & (df["team_minutes"] >= 120)]
+
+    window = f"{WINDOW_GAMES} team games" if WINDOW_GAMES is not None else f"{WINDOW_DAYS} days"
+    print("Rolling window:", window)
+
+    team_games, X, players = build_rolling_rows(df)
+    print(f"Team-games: {len(team_games):,}   Players: {len(players):,}")
+
+    emit = set(SEASONS) if SEASONS is not None else None
+    rolling = rolling_rapm(team_games, X, players, LAMBDA_RIDGE, emit_seasons=emit)
+
+    print("Saving rolling RAPM →", OUTPUT_ROLLING)
+    rolling.to_csv(OUTPUT_ROLLING, index=False)
+    print("Done.")
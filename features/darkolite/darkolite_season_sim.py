@@ -0,0 +1,275 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.special import ndtr
+
+import darkolite_team as team_stage
+
+# --------------------------------------------------------
+# CONFIG
+# --------------------------------------------------------
+SEASON = "2025-26"
+TEAM_DIR = r"C:\Users\gngim\Desktop\Darko\historical_scraper\team_boxscores"
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+FINAL_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_player_season_final.csv"
+OUTPUT_ODDS = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_season_odds.csv"
+OUTPUT_WIN_DIST = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_win_distribution.csv"
+
+# The season log only holds games already played. Unplayed games come from
+# TEAM_DIR/schedule_{season}.csv (GAME_DATE, HOME_TEAM_ID, AWAY_TEAM_ID,
+# optional GAME_ID): every scheduled game not yet in the log is simulated,
+# and without that file there is nothing to simulate. With AS_OF_DATE set,
+# logged games after that date are re-simulated instead (replaying a
+# finished season from any point); players are then rated with the previous
+# season's final DPMs, since this season's finals already know the result.
+AS_OF_DATE = None   # e.g. "2025-01-15"; None = every logged game counts as played
+
+N_SIMS = 50_000
+SIM_CHUNK = 10_000      # sims per array block (games x SIM_CHUNK floats at a time)
+SEED = 7
+
+ROTATION_GAMES = 15     # recent games defining each team's minutes distribution
+HOME_ADV = 2.5          # points
+GAME_SD = 12.0          # single-game margin noise, points
+RATING_SD = 2.0         # season-long uncertainty in each team rating, points
+PACE = 100.0            # possessions per game (ratings are per 100)
+
+PLAYOFF_SEEDS = 6       # direct playoff spots per conference
+PLAYIN_SEEDS = 10       # seeds 7..PLAYIN_SEEDS go to the play-in
+
+# Team log has no conference column; teams not listed share one league-wide table
+CONFERENCES = {
+    "East": ["ATL", "BOS", "BKN", "NJN", "CHA", "CHH", "CHI", "CLE", "DET", "IND",
+             "MIA", "MIL", "NYK", "ORL", "PHI", "TOR", "WAS"],
+    "West": ["DAL", "DEN", "GSW", "HOU", "LAC", "LAL", "MEM", "VAN", "MIN", "NOP",
+             "NOH", "NOK", "OKC", "SEA", "PHX", "POR", "SAC", "SAS", "UTA"],
+}
+
+
+# --------------------------------------------------------
+# SCHEDULE
+# --------------------------------------------------------
+def schedule_path(season: str = SEASON, team_dir: str | None = None) -> str:
+    return os.path.join(team_dir or TEAM_DIR, f"schedule_{season}.csv")
+
+
+def previous_season(season: str) -> str:
+    """'2025-26' → '2024-25'."""
+    start = int(str(season)[:4]) - 1
+    return f"{start}-{str(start + 1)[-2:]}"
+
+
+def unplayed_games(sched: pd.DataFrame, played: pd.DataFrame) -> pd.DataFrame:
+    """
+    Scheduled games not in the played set. Matched on GAME_ID when the
+    schedule has one; otherwise each (home, away) pairing's first k
+    scheduled games count as played, k being how often it has been played
+    since the schedule's first date. Postponed games and late tips on the
+    last logged date are neither dropped nor simulated twice.
+    """
+    if "GAME_ID" in sched.columns:
+        ids = sched["GAME_ID"].astype(str).str.zfill(10)
+        return sched[~ids.isin(played["GAME_ID"])].reset_index(drop=True)
+
+    pair = ["HOME_TEAM_ID", "AWAY_TEAM_ID"]
+    sched = sched.sort_values("GAME_DATE", kind="stable")
+    nth = sched.groupby(pair).cumcount()
+    since = played[played["GAME_DATE"] >= sched["GAME_DATE"].min()]
+    done = since.groupby(pair).size().rename("n_played")
+    k = sched[pair].join(done, on=pair)["n_played"].fillna(0).to_numpy()
+    return sched[nth.to_numpy() >= k].reset_index(drop=True)
+
+
+def load_team_log(season: str = SEASON, team_dir: str = TEAM_DIR) -> pd.DataFrame:
+    log = pd.read_csv(os.path.join(team_dir, f"boxscores_{season}.csv"),
+                      dtype={"GAME_ID": str}, parse_dates=["GAME_DATE"])
+    log["GAME_ID"] = log["GAME_ID"].str.zfill(10)
+    log["TEAM_ID"] = pd.to_numeric(log["TEAM_ID"], errors="coerce").astype(int)
+    log["is_home"] = log["MATCHUP"].str.contains("vs.", regex=False)
+    return log
+
+
+def split_schedule(log: pd.DataFrame, season: str = SEASON, as_of=AS_OF_DATE):
+    """
+    (played, remaining): one row per game with HOME_TEAM_ID / AWAY_TEAM_ID,
+    plus home_win for played games.
+    """
+    home = log[log["is_home"]].set_index("GAME_ID")
+    away = log[~log["is_home"]].set_index("GAME_ID")
+    games = pd.DataFrame({
+        "GAME_DATE": home["GAME_DATE"],
+        "HOME_TEAM_ID": home["TEAM_ID"],
+        "AWAY_TEAM_ID": away["TEAM_ID"].reindex(home.index),
+        "home_win": home["WL"].eq("W"),
+    }).dropna(subset=["AWAY_TEAM_ID"]).reset_index()
+    games["AWAY_TEAM_ID"] = games["AWAY_TEAM_ID"].astype(int)
+
+    if as_of is not None:
+        cut = games["GAME_DATE"] > pd.Timestamp(as_of)
+        return games[~cut].reset_index(drop=True), games[cut].drop(columns="home_win").reset_index(drop=True)
+
+    schedule_csv = schedule_path(season)
+    if not os.path.exists(schedule_csv):
+        raise FileNotFoundError(f"No schedule for {season} ({schedule_csv}); nothing left to simulate.")
+    sched = pd.read_csv(schedule_csv, parse_dates=["GAME_DATE"])
+    return games, unplayed_games(sched, games)
+
+
+# --------------------------------------------------------
+# RATINGS
+# --------------------------------------------------------
+def team_ratings(master_season: pd.DataFrame, final: pd.DataFrame, season: str,
+                 team_ids, last_n_games: int = ROTATION_GAMES) -> pd.Series:
+    """
+    Points per game vs an average team: each team's recent rotation rated
+    with the given season's player DPMs (team_stage.evaluate_rosters, one
+    sparse product for the whole league).
+    """
+    ratings = team_stage.season_ratings(final, season)
+    rosters = [team_stage.team_rotation(master_season, t, last_n_games) for t in team_ids]
+    per100 = team_stage.evaluate_rosters(rosters, ratings)["team_darkolite_dpm"].to_numpy()
+    per100 = per100 - per100.mean()     # league-relative
+    return pd.Series(per100 * PACE / 100.0, index=list(team_ids), name="rating")
+
+
+# --------------------------------------------------------
+# SIMULATION
+# --------------------------------------------------------
+def simulate_wins(remaining: pd.DataFrame, rating: np.ndarray, team_pos: dict,
+                  n_sims: int = N_SIMS, seed: int = SEED) -> np.ndarray:
+    """
+    Wins from the remaining games, (n_sims x teams). Each block draws a
+    rating shock per team per sim, turns every game's expected margin into
+    a home win probability and resolves all games x sims with one uniform
+    draw; wins are tallied with a sparse (teams x games) product.
+    """
+    n_teams = len(rating)
+    wins = np.zeros((n_sims, n_teams))
+    if remaining.empty:
+        return wins
+
+    h = remaining["HOME_TEAM_ID"].map(team_pos).to_numpy(int)
+    a = remaining["AWAY_TEAM_ID"].map(team_pos).to_numpy(int)
+    g = np.arange(len(h))
+    H = sp.csr_matrix((np.ones(len(h)), (h, g)), shape=(n_teams, len(h)))
+    A = sp.csr_matrix((np.ones(len(a)), (a, g)), shape=(n_teams, len(a)))
+
+    rng = np.random.default_rng(seed)
+    for lo in range(0, n_sims, SIM_CHUNK):
+        n = min(SIM_CHUNK, n_sims - lo)
+        r = rating[:, None] + rng.normal(0.0, RATING_SD, size=(n_teams, n))   # teams x sims
+        p_home = ndtr((r[h] - r[a] + HOME_ADV) / GAME_SD)                    # games x sims
+        home_win = rng.random(p_home.shape) < p_home
+        wins[lo:lo + n] = (H @ home_win + A @ ~home_win).T
+    return wins
+
+
+def conference_seeds(total_wins: np.ndarray, conf_of: np.ndarray, seed: int = SEED) -> np.ndarray:
+    """Seed (1 = best) of every team in every sim within its conference; ties broken at random."""
+    rng = np.random.default_rng(seed + 1)
+    key = total_wins + rng.random(total_wins.shape) * 0.5
+    seeds = np.zeros(total_wins.shape, dtype=int)
+    for conf in np.unique(conf_of):
+        cols = np.flatnonzero(conf_of == conf)
+        order = np.argsort(-key[:, cols], axis=1)
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(len(cols))[None, :], axis=1)
+        seeds[:, cols] = rank + 1
+    return seeds
+
+
+def season_odds(played: pd.DataFrame, remaining: pd.DataFrame, rating: pd.Series,
+                abbrev: pd.Series | None = None, n_sims: int = N_SIMS) -> tuple:
+    """(odds per team, win distribution) for one season."""
+    teams = rating.index.to_numpy()
+    pos = {t: i for i, t in enumerate(teams)}
+
+    cur_w = (played.loc[played["home_win"], "HOME_TEAM_ID"].value_counts()
+             .add(played.loc[~played["home_win"], "AWAY_TEAM_ID"].value_counts(), fill_value=0))
+    cur_g = played["HOME_TEAM_ID"].value_counts().add(played["AWAY_TEAM_ID"].value_counts(), fill_value=0)
+    cur_w = cur_w.reindex(teams, fill_value=0).to_numpy()
+    cur_l = cur_g.reindex(teams, fill_value=0).to_numpy() - cur_w
+
+    sides = pd.concat([remaining["HOME_TEAM_ID"], remaining["AWAY_TEAM_ID"]]).map(pos)
+    left = np.bincount(sides.to_numpy(int), minlength=len(teams))
+
+    total = cur_w[None, :] + simulate_wins(remaining, rating.to_numpy(), pos, n_sims)
+
+    names = abbrev.reindex(teams).to_numpy() if abbrev is not None else np.array([""] * len(teams))
+    lookup = {t: c for c, members in CONFERENCES.items() for t in members}
+    conf_of = np.array([lookup.get(n, "League") for n in names])
+    seeds = conference_seeds(total, conf_of)
+
+    max_seed = int(seeds.max())
+    seed_p = np.stack([(seeds == s).mean(axis=0) for s in range(1, max_seed + 1)], axis=1)
+
+    odds = pd.DataFrame({
+        "team_id": teams,
+        "team_abbreviation": names,
+        "conference": conf_of,
+        "rating": rating.to_numpy(),
+        "wins": cur_w.astype(int),
+        "losses": cur_l.astype(int),
+        "games_left": left,
+        "proj_wins": total.mean(axis=0),
+        "wins_p10": np.percentile(total, 10, axis=0),
+        "wins_p50": np.percentile(total, 50, axis=0),
+        "wins_p90": np.percentile(total, 90, axis=0),
+        "p_playoffs": (seeds <= PLAYOFF_SEEDS).mean(axis=0),
+        "p_playin": ((seeds > PLAYOFF_SEEDS) & (seeds <= PLAYIN_SEEDS)).mean(axis=0),
+        "p_top_seed": (seeds == 1).mean(axis=0),
+    })
+    for s in range(max_seed):
+        odds[f"seed_{s + 1}"] = seed_p[:, s]
+
+    # Win distribution: P(final wins = w) per team
+    w = total.astype(int)
+    max_w = int(w.max()) + 1
+    counts = np.apply_along_axis(np.bincount, 0, w, minlength=max_w) / len(w)   # wins x teams
+    dist = pd.DataFrame(counts, columns=teams).rename_axis("final_wins").reset_index()
+    dist = dist.melt(id_vars="final_wins", var_name="team_id", value_name="probability")
+    dist = dist[dist["probability"] > 0]
+
+    return odds.sort_values(["conference", "proj_wins"], ascending=[True, False]), dist
+
+
+def run_simulation(season: str = SEASON, final: pd.DataFrame | None = None,
+                   n_sims: int = N_SIMS) -> tuple:
+    """Load the season log, rotations and ratings, simulate, and write both outputs."""
+    log = load_team_log(season)
+    played, remaining = split_schedule(log, season, AS_OF_DATE)
+    rating_season = season if AS_OF_DATE is None else previous_season(season)
+
+    cols = ["game_id", "team_id", "player_id", "season", "game_date_team", "minutes"]
+    master = pd.read_csv(MASTER_CSV, usecols=cols, low_memory=False)
+    master = master[master["season"].astype(str) == season]
+    if AS_OF_DATE is not None:
+        master = master[pd.to_datetime(master["game_date_team"]) <= pd.Timestamp(AS_OF_DATE)]
+    if final is None:
+        final = pd.read_csv(FINAL_CSV)
+
+    team_ids = sorted(log["TEAM_ID"].unique())
+    rating = team_ratings(master, final, rating_season, team_ids)
+    abbrev = log.drop_duplicates("TEAM_ID").set_index("TEAM_ID")["TEAM_ABBREVIATION"]
+
+    odds, dist = season_odds(played, remaining, rating, abbrev, n_sims)
+    odds.insert(0, "season", season)
+    dist.insert(0, "season", season)
+    odds.to_csv(OUTPUT_ODDS, index=False)
+    dist.to_csv(OUTPUT_WIN_DIST, index=False)
+    return odds, dist
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    t0 = time.time()
+    odds, dist = run_simulation()
+    cols = ["team_abbreviation", "wins", "losses", "games_left", "proj_wins", "p_playoffs", "p_playin", "p_top_seed"]
+    print(odds[cols].to_string(index=False))
+    print(f"Saved odds → {OUTPUT_ODDS}")
+    print(f"Saved win distribution → {OUTPUT_WIN_DIST}")
+    print(f"{N_SIMS:,} seasons simulated in {time.time() - t0:.1f}s.")
@@ -0,0 +1,329 @@
+import os
+import time
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import darkolite_box_talent as box_talent
+import darkolite_final as final_stage
+
+# --------------------------------------------------------
+# CONFIG
+# --------------------------------------------------------
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+RAPM_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_rapm_player_season.csv"
+SWEEP_CACHE = r"C:\Users\gngim\Desktop\Darko\features\darkolite\sweep_cache.npz"
+SWEEP_RESULTS = r"C:\Users\gngim\Desktop\Darko\features\darkolite\sweep_results.csv"
+
+# EWMA alphas a configuration may use. Every (stat, alpha) series is
+# smoothed once up front; the current ALPHA_FAST / ALPHA_SLOW values are
+# always included so the default configuration is reproduced exactly.
+ALPHA_GRID = sorted(
+    {0.03, 0.05, 0.10, 0.15, 0.20, 0.25, 0.30, 0.40, 0.50, 0.60}
+    | set(box_talent.ALPHA_FAST.values())
+    | set(box_talent.ALPHA_SLOW.values())
+)
+
+# "random" = N_RANDOM draws around the current constants
+# "grid"   = every combination in GRID (other parameters stay at default)
+SEARCH = "random"
+N_RANDOM = 5000
+GRID = {
+    "slow_weight": [0.5, 0.6, 0.7, 0.8, 0.9],
+    "box_weight": [0.35, 0.45, 0.55, 0.65, 0.75],
+    "scale": [2.5, 3.0, 3.5, 4.0],
+}
+
+# Team prediction: players with no previous-season rating count as this
+REPLACEMENT_DPM = -2.0
+
+WORKERS = os.cpu_count()
+CHUNK = 250
+SEED = 7
+
+
+# --------------------------------------------------------
+# PARAMETERS
+# --------------------------------------------------------
+def default_config() -> dict:
+    """The constants currently hard-coded in the box and final stages, flattened."""
+    cfg = {}
+    for stat in box_talent.BASE_STATS:
+        cfg[f"alpha_fast.{stat}"] = box_talent.ALPHA_FAST[stat]
+        cfg[f"alpha_slow.{stat}"] = box_talent.ALPHA_SLOW[stat]
+    for stat, coef in box_talent.BOX_OFFENSE_COEFS.items():
+        cfg[f"coef_off.{stat}"] = coef
+    for stat, coef in box_talent.BOX_DEFENSE_COEFS.items():
+        cfg[f"coef_def.{stat}"] = coef
+    cfg["slow_weight"] = box_talent.SLOW_WEIGHT
+    cfg["box_weight"] = final_stage.BOX_WEIGHT
+    cfg["rapm_weight"] = final_stage.RAPM_WEIGHT
+    cfg["scale"] = final_stage.SCALE
+    return cfg
+
+
+def random_config(rng: np.random.Generator, base: dict) -> dict:
+    """One random draw around base: alphas from the grid, jittered coefficients."""
+    cfg = dict(base)
+    for stat in box_talent.BASE_STATS:
+        a, b = rng.choice(ALPHA_GRID, size=2)
+        cfg[f"alpha_fast.{stat}"], cfg[f"alpha_slow.{stat}"] = max(a, b), min(a, b)
+    for key in base:
+        if key.startswith("coef_"):
+            cfg[key] = base[key] * float(np.exp(rng.normal(0.0, 0.3)))
+    cfg["slow_weight"] = float(rng.uniform(0.3, 0.95))
+    cfg["box_weight"] = float(rng.uniform(0.2, 0.9))
+    cfg["rapm_weight"] = 1.0 - cfg["box_weight"]
+    cfg["scale"] = float(rng.uniform(2.0, 5.0))
+    return cfg
+
+
+def grid_configs(base: dict) -> list:
+    keys = list(GRID)
+    out = []
+    for values in itertools.product(*(GRID[k] for k in keys)):
+        cfg = dict(base)
+        cfg.update(zip(keys, values))
+        if "box_weight" in GRID and "rapm_weight" not in GRID:
+            cfg["rapm_weight"] = 1.0 - cfg["box_weight"]
+        out.append(cfg)
+    return out
+
+
+# --------------------------------------------------------
+# CACHED INTERMEDIATES
+# --------------------------------------------------------
+def ewma_grid_means(df: pd.DataFrame, ps_code: np.ndarray, n_ps: int) -> np.ndarray:
+    """
+    Player-season mean of every (stat, alpha) EWMA: array [stat, alpha, ps].
+    df is sorted by player and date. All players, stats and alphas advance
+    together one game-index at a time, so the work is a few thousand array
+    steps rather than a Python loop per player.
+    """
+    stats = box_talent.BASE_STATS
+    alphas = np.array(ALPHA_GRID)
+
+    # Same NaN handling as the EWMA stage: carry values within each player
+    filled = df.groupby("player_id")[stats].ffill()
+    Y = filled.groupby(df["player_id"]).bfill().to_numpy(dtype=float)
+
+    player, _ = pd.factorize(df["player_id"].values)
+    step = df.groupby("player_id").cumcount().to_numpy()
+    order = np.argsort(step, kind="stable")
+    bounds = np.searchsorted(step[order], np.arange(step.max() + 2))
+
+    M = np.zeros((player.max() + 1, len(stats), len(alphas)))
+    sums = np.zeros((n_ps, len(stats), len(alphas)))
+    for n in range(len(bounds) - 1):
+        rows = order[bounds[n]:bounds[n + 1]]
+        pl = player[rows]
+        y = Y[rows][:, :, None]
+        M[pl] = y if n == 0 else alphas * y + (1 - alphas) * M[pl]
+        # Each player has one row per step, so these indices never repeat
+        sums[ps_code[rows]] += M[pl]
+
+    counts = np.bincount(ps_code, minlength=n_ps)
+    return (sums / counts[:, None, None]).transpose(1, 2, 0)
+
+
+def team_season_targets(df: pd.DataFrame) -> pd.DataFrame:
+    """Team-season net rating per 100 possessions from the team-game rows."""
+    tg = df.groupby(["game_id", "team_id"], as_index=False).agg(
+        season=("season", "first"),
+        plus_minus_team=("plus_minus_team", "first"),
+        team_possessions=("team_possessions", "first"),
+        team_minutes=("team_minutes", "first"),
+    )
+    ts = tg.groupby(["team_id", "season"]).agg(
+        pm=("plus_minus_team", "sum"),
+        poss=("team_possessions", "sum"),
+        team_minutes=("team_minutes", "sum"),
+    )
+    ts["net_100"] = ts["pm"] / ts["poss"].where(ts["poss"] > 0) * 100.0
+    return ts
+
+
+def build_sweep_cache(master: pd.DataFrame, rapm: pd.DataFrame) -> dict:
+    """Everything a configuration's score depends on that it can't change."""
+    df = box_talent.prepare_master(master)
+    df = box_talent.clean_base_stats(df, box_talent.era_baselines(df))
+
+    # Player-season rows, in the order the box collapse produces them
+    ps = df[["player_id", "season"]].drop_duplicates().sort_values(["player_id", "season"])
+    ps_index = pd.MultiIndex.from_frame(ps)
+    ps_code = ps_index.get_indexer(pd.MultiIndex.from_frame(df[["player_id", "season"]]))
+
+    print(f"Smoothing {len(box_talent.BASE_STATS)} stats x {len(ALPHA_GRID)} alphas ...")
+    ewma = ewma_grid_means(df, ps_code, len(ps))
+
+    seasons = sorted(ps["season"].unique())
+    season_code = pd.Index(seasons).get_indexer(ps["season"])
+
+    # RAPM side of the blend is fixed across configurations
+    rapm = rapm[["player_id", "season", "rapm_darkolite"]].copy()
+    rapm["season"] = rapm["season"].astype(str)
+    rapm["player_id"] = rapm["player_id"].astype(int)
+    blend = ps.merge(rapm, on=["player_id", "season"], how="left")
+    rapm_val = blend["rapm_darkolite"].fillna(0.0).to_numpy()
+
+    # Team rosters: each player's minute share of the team-season, scored
+    # with that player's rating from the previous season
+    targets = team_season_targets(df)
+    prev_season = dict(zip(seasons[1:], seasons[:-1]))
+    roster = df.groupby(["team_id", "season", "player_id"], as_index=False)["minutes"].sum()
+    roster = roster[roster["season"].isin(prev_season)]
+    roster["prev"] = roster["season"].map(prev_season)
+    prev_code = ps_index.get_indexer(pd.MultiIndex.from_frame(roster[["player_id", "prev"]]))
+
+    team_keys = pd.MultiIndex.from_frame(roster[["team_id", "season"]])
+    team_idx, teams = pd.factorize(team_keys)
+    team_t = targets.reindex(teams)
+    share = roster["minutes"].to_numpy() / team_t["team_minutes"].to_numpy()[team_idx]
+
+    return {
+        "ewma": ewma,
+        "alphas": np.array(ALPHA_GRID),
+        "season_code": season_code,
+        "n_seasons": np.array(len(seasons)),
+        "rapm": rapm_val,
+        "roster_team": team_idx,
+        "roster_prev": prev_code,
+        "roster_share": share,
+        "team_target": team_t["net_100"].to_numpy(),
+    }
+
+
+def cache_key(*paths) -> str:
+    h = hashlib.sha256(repr((ALPHA_GRID, box_talent.ERA_PRIORS, box_talent.PRIORS)).encode("utf-8"))
+    for p in paths:
+        st = os.stat(p)
+        h.update(f"{os.path.abspath(p)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_or_build_cache() -> dict:
+    key = cache_key(MASTER_CSV, RAPM_CSV)
+    if os.path.exists(SWEEP_CACHE):
+        with np.load(SWEEP_CACHE) as z:
+            if str(z["key"]) == key:
+                print("Using sweep cache:", SWEEP_CACHE)
+                return {k: z[k] for k in z.files if k != "key"}
+
+    print("Loading:", MASTER_CSV)
+    master = pd.read_csv(MASTER_CSV, low_memory=False)
+    cache = build_sweep_cache(master, pd.read_csv(RAPM_CSV))
+
+    tmp = SWEEP_CACHE[:-len(".npz")] + ".tmp.npz"
+    np.savez(tmp, key=np.array(key), **cache)
+    os.replace(tmp, SWEEP_CACHE)
+    return cache
+
+
+# --------------------------------------------------------
+# SCORING
+# --------------------------------------------------------
+def season_z(x: np.ndarray, season_code: np.ndarray, n_seasons: int) -> np.ndarray:
+    """Within-season z-score (ddof=0), as z_score / z_score_qualified do."""
+    n = np.bincount(season_code, minlength=n_seasons)
+    mu = np.bincount(season_code, x, minlength=n_seasons) / np.maximum(n, 1)
+    d = x - mu[season_code]
+    sd = np.sqrt(np.bincount(season_code, d * d, minlength=n_seasons) / np.maximum(n, 1))
+    return np.where(sd[season_code] > 0, d / np.where(sd > 0, sd, 1.0)[season_code], 0.0)
+
+
+def config_dpm(cfg: dict, cache: dict) -> np.ndarray:
+    """Player-season darkolite_dpm for one configuration."""
+    alpha_pos = {a: i for i, a in enumerate(cache["alphas"])}
+    stat_pos = {s: i for i, s in enumerate(box_talent.BASE_STATS)}
+    sw = cfg["slow_weight"]
+
+    box_total = 0.0
+    for side in ("coef_off", "coef_def"):
+        for key, coef in cfg.items():
+            if not key.startswith(side + "."):
+                continue
+            stat = key.split(".", 1)[1]
+            s = stat_pos[stat]
+            slow = cache["ewma"][s, alpha_pos[cfg[f"alpha_slow.{stat}"]]]
+            fast = cache["ewma"][s, alpha_pos[cfg[f"alpha_fast.{stat}"]]]
+            box_total = box_total + coef * (sw * slow + (1.0 - sw) * fast)
+
+    n_seasons = int(cache["n_seasons"])
+    box_z = season_z(box_total, cache["season_code"], n_seasons)
+    rapm_z = season_z(cache["rapm"], cache["season_code"], n_seasons)
+    blend = cfg["box_weight"] * box_z + cfg["rapm_weight"] * rapm_z
+    return np.clip(blend * cfg["scale"], -10, 10)
+
+
+def score_config(cfg: dict, cache: dict) -> dict:
+    """
+    Out-of-sample fit: every team-season's net rating predicted from its
+    players' previous-season ratings, weighted by this season's minute
+    share (x5 players on the floor).
+    """
+    dpm = config_dpm(cfg, cache)
+    prev = cache["roster_prev"]
+    rating = np.where(prev >= 0, dpm[np.maximum(prev, 0)], REPLACEMENT_DPM)
+
+    n_teams = len(cache["team_target"])
+    pred = 5.0 * np.bincount(cache["roster_team"], cache["roster_share"] * rating, minlength=n_teams)
+    actual = cache["team_target"]
+    ok = np.isfinite(actual)
+
+    err = pred[ok] - actual[ok]
+    return {
+        "rmse": float(np.sqrt(np.mean(err ** 2))),
+        "mae": float(np.mean(np.abs(err))),
+        "corr": float(np.corrcoef(pred[ok], actual[ok])[0, 1]),
+        "n_team_seasons": int(ok.sum()),
+    }
+
+
+# Worker processes get the cache once, not with every task
+_CACHE = None
+
+
+def _init_worker(cache: dict):
+    global _CACHE
+    _CACHE = cache
+
+
+def _score_chunk(configs: list) -> list:
+    return [{**cfg, **score_config(cfg, _CACHE)} for cfg in configs]
+
+
+def run_sweep(cache: dict, configs: list, workers: int = WORKERS) -> pd.DataFrame:
+    """Score configurations in parallel; best (lowest RMSE) first."""
+    chunks = [configs[i:i + CHUNK] for i in range(0, len(configs), CHUNK)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache,)) as pool:
+        rows = [r for chunk in pool.map(_score_chunk, chunks) for r in chunk]
+    return pd.DataFrame(rows).sort_values("rmse").reset_index(drop=True)
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    cache = load_or_build_cache()
+    base = default_config()
+
+    if SEARCH == "grid":
+        configs = grid_configs(base)
+    else:
+        rng = np.random.default_rng(SEED)
+        configs = [base] + [random_config(rng, base) for _ in range(N_RANDOM)]
+
+    t0 = time.time()
+    results = run_sweep(cache, configs)
+    print(f"Scored {len(configs):,} configurations in {time.time() - t0:.1f}s")
+
+    baseline = score_config(base, cache)
+    print(f"Current constants: RMSE {baseline['rmse']:.3f}  corr {baseline['corr']:.3f}")
+    print(f"Best:              RMSE {results.loc[0, 'rmse']:.3f}  corr {results.loc[0, 'corr']:.3f}")
+
+    print("Saving sweep results →", SWEEP_RESULTS)
+    results.to_csv(SWEEP_RESULTS, index=False)
+    print("Done.")
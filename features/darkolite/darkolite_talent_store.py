@@ -0,0 +1,177 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+import darkolite_box_talent as box_talent
+from darkolite_baselines import build_league_baselines
+
+# --------------------------------------------------------
+# CONFIG
+# --------------------------------------------------------
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+TALENT_STORE = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_talent_store.parquet"
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APP_TALENT_STORE = os.path.join(REPO_DIR, "app", "data", "darkolite_talent_store.parquet")
+
+# Columns kept per player-game: every smoothed stat plus the box components
+STORE_COLS = [f"{s}_talent" for s in box_talent.BASE_STATS] + box_talent.BOX_COLS
+
+# Sort key = player_id * KEY_STRIDE + days since 1970; one int64 array
+# covers both levels of the (player_id, game_date) order
+KEY_STRIDE = 1_000_000
+
+
+# --------------------------------------------------------
+# BUILD
+# --------------------------------------------------------
+def causal_kalman_talent(league: pd.DataFrame, df: pd.DataFrame, seasons=None) -> pd.DataFrame:
+    """
+    Kalman talent for df's rows in the given seasons (default: all), season
+    by season: each season is filtered with noise scales fit on the league's
+    earlier seasons only (the first season has none, so it uses its own).
+    Both frames cleaned and sorted.
+    """
+    parts = []
+    for s in sorted(df["season"].unique() if seasons is None else seasons):
+        past = league[league["season"] < s]
+        scales = box_talent.fit_kalman_scales(past if not past.empty else league[league["season"] == s],
+                                              cleaned=True)
+        rows = box_talent.add_kalman_talent(df[df["season"] <= s].copy(), scales)
+        parts.append(rows[rows["season"] == s])
+    return pd.concat(parts).sort_values(["player_id", "game_date_team"], kind="stable")
+
+
+def build_talent_store(df: pd.DataFrame, player_ids=None, seasons=None) -> pd.DataFrame:
+    """
+    Master feature rows → talent after every player-game, sorted by
+    (player_id, game_date). Same talent engine as the box stage, without
+    the season collapse, and causal: winsor caps from each player's earlier
+    games, era fills from the previous season, Kalman scales from earlier
+    seasons. Talent as of a date never moves when later games arrive.
+    player_ids / seasons limit the rows rebuilt (the nightly refresh); df
+    must still be the full master, which sets the baselines and scales.
+    Double-headers keep the later row.
+    """
+    df = box_talent.prepare_master(df)
+    baselines = None
+    if box_talent.ERA_PRIORS:
+        baselines = box_talent.prior_season_baselines(build_league_baselines(df))
+
+    kalman = box_talent.TALENT_ENGINE == "kalman"
+    if player_ids is not None and not kalman:
+        # Cleaning is per player; only the Kalman scales need the league
+        df = df[df["player_id"].isin(player_ids)]
+    df = box_talent.clean_base_stats(df, baselines, causal=True)
+
+    mine = df if player_ids is None else df[df["player_id"].isin(player_ids)]
+    if kalman:
+        mine = causal_kalman_talent(df, mine, seasons)
+    else:
+        mine = box_talent.add_ewma_talent(mine.copy())
+    if seasons is not None:
+        mine = mine[mine["season"].isin(seasons)]
+    mine = box_talent.add_box_components(mine)
+
+    store = mine[["player_id", "game_date_team", "season"] + [c for c in STORE_COLS if c in mine.columns]]
+    store = store.rename(columns={"game_date_team": "game_date"})
+    store = store.drop_duplicates(["player_id", "game_date"], keep="last")
+    return store.sort_values(["player_id", "game_date"]).reset_index(drop=True)
+
+
+def write_talent_store(store: pd.DataFrame, path: str = TALENT_STORE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    store.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+# --------------------------------------------------------
+# LOOKUP
+# --------------------------------------------------------
+def _days(dates) -> np.ndarray:
+    return pd.to_datetime(dates).values.astype("datetime64[D]").astype(np.int64)
+
+
+def index_talent_store(store: pd.DataFrame) -> dict:
+    """
+    Arrays behind the lookups: sorted int64 keys, player ids, dates and the
+    talent matrix (rows in key order). Build once, query many times.
+    """
+    pid = store["player_id"].to_numpy(np.int64)
+    keys = pid * KEY_STRIDE + _days(store["game_date"])
+    order = np.argsort(keys, kind="stable")
+    cols = [c for c in store.columns if c not in ("player_id", "game_date", "season")]
+    return {
+        "keys": keys[order],
+        "player_id": pid[order],
+        "game_date": store["game_date"].to_numpy()[order],
+        "season": store["season"].to_numpy()[order],
+        "values": store[cols].to_numpy(float)[order],
+        "columns": cols,
+    }
+
+
+def load_talent_store(path: str = TALENT_STORE) -> dict:
+    return index_talent_store(pd.read_parquet(path))
+
+
+def _asof_rows(idx: dict, player_ids: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """Row of each player's last game on or before each date (-1 if none)."""
+    q = player_ids * KEY_STRIDE + days
+    pos = np.searchsorted(idx["keys"], q, side="right") - 1
+    ok = (pos >= 0) & (idx["player_id"][np.maximum(pos, 0)] == player_ids)
+    return np.where(ok, pos, -1)
+
+
+def talent_asof(idx: dict, player_id: int, date) -> dict | None:
+    """One player's talent as of a date (after their last game on or before it)."""
+    q = int(player_id) * KEY_STRIDE + int(np.datetime64(pd.Timestamp(date).date(), "D").astype(np.int64))
+    pos = int(np.searchsorted(idx["keys"], q, side="right")) - 1
+    if pos < 0 or idx["player_id"][pos] != player_id:
+        return None
+    out = dict(zip(idx["columns"], idx["values"][pos].tolist()))
+    out["last_game_date"] = idx["game_date"][pos]
+    out["season"] = idx["season"][pos]
+    return out
+
+
+def talent_asof_batch(idx: dict, player_ids, dates) -> pd.DataFrame:
+    """
+    Vectorized as-of lookup for many (player, date) pairs: one searchsorted
+    over the whole batch. Pairs with no earlier game come back as NaN.
+    """
+    pids = np.asarray(player_ids, dtype=np.int64)
+    days = _days(dates)
+    rows = _asof_rows(idx, pids, days)
+    hit = rows >= 0
+
+    vals = np.full((len(rows), len(idx["columns"])), np.nan)
+    vals[hit] = idx["values"][rows[hit]]
+    out = pd.DataFrame(vals, columns=idx["columns"])
+    out.insert(0, "player_id", pids)
+    out.insert(1, "date", pd.to_datetime(dates))
+    out.insert(2, "last_game_date", pd.Series(idx["game_date"][np.maximum(rows, 0)]).where(hit).values)
+    return out
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    print("Loading master features:", MASTER_CSV)
+    df = pd.read_csv(MASTER_CSV, low_memory=False)
+
+    store = build_talent_store(df)
+    print(f"Talent store: {len(store):,} player-games, {store['player_id'].nunique():,} players")
+
+    for path in [TALENT_STORE, APP_TALENT_STORE]:
+        print("Saving →", path)
+        write_talent_store(store, path)
+
+    idx = index_talent_store(store)
+    sample = store.sample(min(10_000, len(store)), random_state=0)
+    t0 = time.perf_counter()
+    talent_asof_batch(idx, sample["player_id"], sample["game_date"])
+    print(f"Batch of {len(sample):,} as-of lookups: {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    print("Done.")
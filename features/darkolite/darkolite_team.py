@@ -0,0 +1,172 @@
+import time
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import darkolite_rapm as rapm_stage
+
+# --------------------------------------------------------
+# CONFIG
+# --------------------------------------------------------
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+FINAL_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_player_season_final.csv"
+OUTPUT_TEAM_GAME = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_team_game.csv"
+OUTPUT_TEAM_SEASON = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_team_season.csv"
+
+# Player columns rolled up to the team (DPM is per 100 possessions, so a
+# lineup is worth the sum of its five players: 5 x minute-share average)
+RATING_COLS = ["darkolite_dpm", "darkolite_box_offense", "darkolite_box_defense"]
+REPLACEMENT_PCTL = 0.10  # players missing from the ratings: this quantile of every column
+FLOOR_SLOTS = 5.0
+
+
+# --------------------------------------------------------
+# HELPERS
+# --------------------------------------------------------
+def season_ratings(final: pd.DataFrame, season: str, cols: list = RATING_COLS) -> pd.DataFrame:
+    """One season's player ratings indexed by player_id."""
+    r = final[final["season"].astype(str) == str(season)]
+    cols = [c for c in cols if c in r.columns]
+    return r.groupby(r["player_id"].astype(int))[cols].mean()
+
+
+def rating_vector(ratings: pd.DataFrame, players: pd.Index) -> np.ndarray:
+    """(players x ratings) array in design-column order; unknown players at replacement."""
+    v = ratings.reindex(players)
+    return v.fillna(ratings.quantile(REPLACEMENT_PCTL)).to_numpy(float)
+
+
+def team_game_ratings(df_season: pd.DataFrame, ratings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Team-game ratings for one season from the RAPM stage's sparse
+    minute-share design: one sparse product X @ V covers every team-game
+    and every rating column at once.
+    """
+    team_games = rapm_stage.build_team_game_table(df_season)
+    X, players = rapm_stage.build_sparse_design(df_season, team_games)
+    R = FLOOR_SLOTS * (X @ rating_vector(ratings, players))
+
+    out = team_games[["game_id", "team_id", "plus_minus_team"]].copy()
+    if "net_rating_100" in team_games.columns:
+        out["net_rating_100"] = team_games["net_rating_100"]
+    for j, c in enumerate(ratings.columns):
+        out[f"team_{c}"] = R[:, j]
+    return out.reset_index(drop=True)
+
+
+def team_season_ratings(team_games: pd.DataFrame) -> pd.DataFrame:
+    """
+    Team-season averages of the team-game table as sparse products: an
+    indicator matrix (teams x team-games) times the values and times the
+    non-null mask, so each column is averaged over the games that have it.
+    """
+    codes, teams = pd.factorize(team_games["team_id"], sort=True)
+    games = np.bincount(codes, minlength=len(teams)).astype(float)
+    T = sp.csr_matrix(
+        (np.ones(len(codes)), (codes, np.arange(len(codes)))),
+        shape=(len(teams), len(codes)),
+    )
+
+    cols = [c for c in team_games.columns if c.startswith("team_darkolite") or c == "net_rating_100"]
+    vals = team_games[cols].to_numpy(float)
+    seen = ~np.isnan(vals)
+    sums = T @ np.where(seen, vals, 0.0)
+    counts = T @ seen.astype(float)
+    means = np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0)
+    out = pd.DataFrame(means, columns=cols)
+    out.insert(0, "team_id", teams)
+    out.insert(1, "games", games.astype(int))
+    return out
+
+
+# --------------------------------------------------------
+# WHAT-IF
+# --------------------------------------------------------
+def team_rotation(df_season: pd.DataFrame, team_id, last_n_games: int | None = None) -> dict:
+    """A team's actual minutes per game by player (optionally over its last N games) as a starting roster."""
+    d = df_season[df_season["team_id"].astype(str) == str(team_id)]
+    if last_n_games is not None:
+        keep = d.drop_duplicates("game_id").sort_values("game_date_team")["game_id"].tail(last_n_games)
+        d = d[d["game_id"].isin(keep)]
+    n_games = d["game_id"].nunique()
+    mins = d.groupby("player_id")["minutes"].sum() / max(n_games, 1)
+    return mins[mins > 0].sort_values(ascending=False).to_dict()
+
+
+def evaluate_rosters(rosters: list, ratings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Projected team ratings for many hypothetical rosters at once. Each
+    roster is {player_id: minutes}; minutes are normalised to shares, so
+    per-game or per-season minutes both work. Builds one sparse
+    (rosters x players) share matrix and multiplies it into the ratings.
+    """
+    lens = np.array([len(r) for r in rosters], dtype=np.int64)
+    rows = np.repeat(np.arange(len(rosters)), lens)
+    pids = np.fromiter((int(p) for r in rosters for p in r), dtype=np.int64, count=lens.sum())
+    mins = np.fromiter((float(m) for r in rosters for m in r.values()), dtype=float, count=lens.sum())
+
+    totals = np.bincount(rows, weights=mins, minlength=len(rosters))
+    share = np.divide(mins, totals[rows], out=np.zeros_like(mins), where=totals[rows] > 0)
+
+    cols, players = pd.factorize(pids)
+    S = sp.csr_matrix((share, (rows, cols)), shape=(len(rosters), len(players)))
+    R = FLOOR_SLOTS * (S @ rating_vector(ratings, pd.Index(players)))
+    return pd.DataFrame(R, columns=[f"team_{c}" for c in ratings.columns])
+
+
+def roster_rating(roster: dict, ratings: pd.DataFrame) -> pd.Series:
+    """Single-roster convenience wrapper around evaluate_rosters."""
+    return evaluate_rosters([roster], ratings).iloc[0]
+
+
+def apply_trade(roster: dict, outgoing: list, incoming: dict) -> dict:
+    """Roster after a trade: outgoing players removed, incoming {player_id: minutes} added."""
+    gone = set(outgoing)
+    new = {p: m for p, m in roster.items() if p not in gone}
+    new.update(incoming)
+    return new
+
+
+# --------------------------------------------------------
+# MAIN
+# --------------------------------------------------------
+if __name__ == "__main__":
+    t0 = time.time()
+    print("Loading:", MASTER_CSV)
+    cols = rapm_stage.RAPM_COLUMNS + ["team_abbreviation"]
+    master = pd.read_csv(MASTER_CSV, usecols=lambda c: c in cols, low_memory=False)
+    master = rapm_stage.prepare_master(master)
+
+    print("Loading:", FINAL_CSV)
+    final = pd.read_csv(FINAL_CSV)
+
+    abbrev = None
+    if "team_abbreviation" in master.columns:
+        abbrev = master.drop_duplicates(["season", "team_id"]).set_index(["season", "team_id"])["team_abbreviation"]
+
+    game_frames, season_frames = [], []
+    for season, df_season in master.groupby("season"):
+        ratings = season_ratings(final, season)
+        if ratings.empty:
+            continue
+        tg = team_game_ratings(df_season, ratings)
+        ts = team_season_ratings(tg)
+        tg.insert(0, "season", season)
+        ts.insert(0, "season", season)
+        if abbrev is not None:
+            ts.insert(2, "team_abbreviation",
+                      abbrev.reindex(pd.MultiIndex.from_arrays([ts["season"], ts["team_id"]])).values)
+        game_frames.append(tg)
+        season_frames.append(ts)
+        print(f"{season}: {len(tg):,} team-games, {len(ts)} teams")
+
+    team_game = pd.concat(game_frames, ignore_index=True)
+    team_season = pd.concat(season_frames, ignore_index=True).sort_values(
+        ["season", "team_darkolite_dpm"], ascending=[True, False]
+    )
+
+    print("Saving team-game ratings →", OUTPUT_TEAM_GAME)
+    team_game.to_csv(OUTPUT_TEAM_GAME, index=False)
+    print("Saving team-season ratings →", OUTPUT_TEAM_SEASON)
+    team_season.to_csv(OUTPUT_TEAM_SEASON, index=False)
+    print(f"Done in {time.time() - t0:.1f}s.")
@@ -1,12 +1,38 @@
 import os
 import pandas as pd
 import numpy as np
+import polars as pl
 
 # -------------------------------------------------
 # CONFIG
 # -------------------------------------------------
 BASE_DIR = r"C:\Users\gngim\Desktop\Darko\historical_scraper\all_seasons"
 
+# "pandas" = build_darkish_features (reference implementation)
+# "polars" = build_darkish_features_lazy (one fused, multithreaded query plan)
+FEATURE_ENGINE = "pandas"
+
+NUMERIC_COLS = [
+    "pts", "reb", "ast", "stl", "blk", "to",
+    "fg3a", "fg3m", "fta", "fgm", "fga",
+    "plus_minus",
+    "fga_team", "fta_team", "oreb_team", "tov_team"
+]
+PER_STATS = ["pts", "reb", "ast", "stl", "blk", "to", "fg3a", "fg3m", "fta"]
+
+# Rolling form over each player's last N games (career-long, across seasons):
+# possession-weighted per-100 rates, average minutes and a minutes trend
+FORM_WINDOWS = [5, 10, 20]
+FORM_COUNTS = PER_STATS + ["plus_minus"]
+
+# Opponent adjustment: each per-100 rate is scaled by league / opponent
+# "allowed" rate as of the game date (shrunk toward the league over the
+# first CONTEXT_PRIOR_GAMES games); TS% / eFG% by league / allowed
+# shooting; pm_per100 gets the opponent's pre-game net rating added.
+OPPONENT_ADJUST = True
+ADJUST_COUNTS = ["pts", "reb", "ast", "stl", "blk", "to"]
+CONTEXT_PRIOR_GAMES = 10
+
 
 # -------------------------------------------------
 # HELPERS
@@ -73,13 +99,7 @@ def build_darkish_features(df: pd.DataFrame) -> pd.DataFrame:
     # --------------------
     # Numeric stats
     # --------------------
-    numeric_cols = [
-        "pts", "reb", "ast", "stl", "blk", "to",
-        "fg3a", "fg3m", "fta", "fgm", "fga",
-        "plus_minus",
-        "fga_team", "fta_team", "oreb_team", "tov_team"
-    ]
-    df = to_numeric(df, numeric_cols)
+    df = to_numeric(df, NUMERIC_COLS)
 
     # --------------------
     # Team possessions
@@ -101,7 +121,7 @@ def build_darkish_features(df: pd.DataFrame) -> pd.DataFrame:
     # --------------------
     # Per-36 stats
     # --------------------
-    per36_stats = ["pts", "reb", "ast", "stl", "blk", "to", "fg3a", "fg3m", "fta"]
+    per36_stats = PER_STATS
     minutes_nonzero = df["minutes"].replace(0, np.nan)
 
     for stat in per36_stats:
@@ -150,6 +170,314 @@ def build_darkish_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# -------------------------------------------------
+# LAZY (POLARS) FEATURE ENGINEERING
+# -------------------------------------------------
+def parse_minutes_expr(col: str) -> pl.Expr:
+    """Vectorized parse_minutes_col: "MM:SS[:00]" or a number; blanks / DNP / "NaN" → 0.0."""
+    parts = pl.col(col).cast(pl.String).str.strip_chars().str.split(":")
+    head = parts.list.get(0, null_on_oob=True).cast(pl.Float64, strict=False)
+    secs = parts.list.get(1, null_on_oob=True).cast(pl.Float64, strict=False)
+    return (
+        pl.when(parts.list.len() >= 2)
+          .then(head + secs / 60.0)
+          .otherwise(head)
+          .fill_nan(0.0)     # "NaN" casts to NaN, which Polars sorts above 0
+          .fill_null(0.0)
+    )
+
+
+def nonzero(expr: pl.Expr) -> pl.Expr:
+    """x with zeros turned into nulls, like .replace(0, np.nan)."""
+    return pl.when(expr != 0).then(expr)
+
+
+def build_darkish_features_lazy(df) -> pd.DataFrame:
+    """
+    Same output as build_darkish_features, built as a single lazy query:
+    every derived column and the three row filters go through one optimized
+    plan that Polars runs multithreaded, with no intermediate frame copies.
+    Accepts a pandas DataFrame, Polars DataFrame or LazyFrame.
+    """
+    if isinstance(df, pd.DataFrame):
+        df = pl.from_pandas(df)
+    lf = df.lazy()
+    schema = lf.collect_schema()
+
+    # --------------------
+    # Minutes
+    # --------------------
+    if "min_team" in schema and schema["min_team"] == pl.String:
+        team_minutes = parse_minutes_expr("min_team")
+    elif "min_team" in schema and schema["min_team"].is_numeric():
+        team_minutes = pl.col("min_team")
+    elif "min_team" in schema:
+        team_minutes = pl.col("min_team").cast(pl.Float64, strict=False)
+    else:
+        team_minutes = pl.lit(240.0)
+
+    # Strings get coerced; columns that are already numeric keep their dtype
+    numeric = [
+        pl.col(c).cast(pl.Float64, strict=False)
+        for c in NUMERIC_COLS
+        if c in schema and not schema[c].is_numeric()
+    ]
+
+    # --------------------
+    # Possessions + row filters (one pass)
+    # --------------------
+    team_possessions = (
+        pl.col("fga_team")
+        + 0.4 * pl.col("fta_team")
+        - pl.col("oreb_team")
+        + pl.col("tov_team")
+    )
+    minutes = pl.col("minutes")
+    poss = pl.col("player_possessions")
+    fga = nonzero(pl.col("fga"))
+
+    lf = (
+        lf.with_columns([parse_minutes_expr("min").alias("minutes"),
+                         nonzero(team_minutes).alias("team_minutes")] + numeric)
+          .with_columns(team_possessions.alias("team_possessions"))
+          .with_columns((pl.col("team_possessions") * (minutes / 48.0)).alias("player_possessions"))
+          .filter((minutes > 0) & (pl.col("team_possessions") > 0) & (poss > 0))
+    )
+
+    # --------------------
+    # Rates, shooting, context (one projection)
+    # --------------------
+    derived = (
+        [(pl.col(s) / nonzero(minutes) * 36.0).alias(f"{s}_per36") for s in PER_STATS]
+        + [(pl.col(s) / nonzero(poss) * 100.0).alias(f"{s}_per100") for s in PER_STATS]
+        + [
+            ((pl.col("fgm") + 0.5 * pl.col("fg3m")) / fga).alias("efg_pct_calc"),
+            (pl.col("pts") / nonzero(2 * (pl.col("fga") + 0.44 * pl.col("fta")))).alias("ts_pct_calc"),
+            (pl.col("fta") / fga).alias("ftr"),
+            (pl.col("fg3a") / fga).alias("threepar"),
+            (pl.col("ast") / nonzero(pl.col("to"))).alias("ast_tov"),
+            (pl.col("plus_minus") / nonzero(poss) * 100.0).alias("pm_per100"),
+        ]
+    )
+
+    if "matchup_team" in schema:
+        derived.append(pl.col("matchup_team").str.contains("vs.", literal=True).cast(pl.Int64).alias("is_home"))
+    else:
+        derived.append(pl.lit(0, dtype=pl.Int64).alias("is_home"))
+
+    if "wl_team" in schema:
+        derived.append(pl.col("wl_team").eq_missing("W").cast(pl.Int64).alias("won"))
+    else:
+        derived.append(pl.lit(None, dtype=pl.Float64).alias("won"))
+
+    return lf.with_columns(derived).collect().to_pandas()
+
+
+def form_col(stat: str, window: int) -> str:
+    name = "pm" if stat == "plus_minus" else stat
+    return f"{name}_per100_l{window}"
+
+
+def add_form_features(df: pd.DataFrame, windows=FORM_WINDOWS) -> pd.DataFrame:
+    """
+    Last-N-game form for every window and stat in one pass over
+    player-sorted arrays: each window sum is a difference of two cumulative
+    sums, clipped at the player's first game. Per-100 rates are
+    sum(stat) / sum(possessions) over the window; minutes_l{N} is the
+    average; minutes_trend = minutes_l{min} - minutes_l{max}. Windows
+    include the current game, like the EWMA talent.
+    """
+    order = np.lexsort((pd.to_datetime(df["game_date_team"]).to_numpy(), df["player_id"].to_numpy()))
+    df = df.iloc[order].reset_index(drop=True)
+
+    pid = df["player_id"].to_numpy()
+    n = len(df)
+    new_player = np.r_[True, pid[1:] != pid[:-1]] if n else np.zeros(0, bool)
+    first = np.maximum.accumulate(np.where(new_player, np.arange(n), 0))
+    end = np.arange(1, n + 1)
+
+    counts = [c for c in FORM_COUNTS if c in df.columns]
+    vals = np.column_stack(
+        [df[c].to_numpy(float) for c in counts] + [df["player_possessions"].to_numpy(float), df["minutes"].to_numpy(float)]
+    )
+    cs = np.vstack([np.zeros((1, vals.shape[1])), np.cumsum(np.nan_to_num(vals), axis=0)])
+
+    form = {}
+    for w in windows:
+        start = np.maximum(end - w, first)
+        total = cs[end] - cs[start]
+        poss = total[:, len(counts)]
+        rate = np.divide(total[:, :len(counts)] * 100.0, poss[:, None],
+                         out=np.full((n, len(counts)), np.nan), where=poss[:, None] > 0)
+        for j, c in enumerate(counts):
+            form[form_col(c, w)] = rate[:, j]
+        form[f"minutes_l{w}"] = total[:, -1] / (end - start)
+
+    form = pd.DataFrame(form, index=df.index)
+    form["minutes_trend"] = form[f"minutes_l{min(windows)}"] - form[f"minutes_l{max(windows)}"]
+    return pd.concat([df.drop(columns=form.columns, errors="ignore"), form], axis=1)
+
+
+def form_for_new_rows(history: pd.DataFrame, new: pd.DataFrame, windows=FORM_WINDOWS) -> pd.DataFrame:
+    """
+    Form features for freshly appended games, using only each player's last
+    max(windows) earlier games as context instead of the whole master.
+    """
+    hist = history[history["player_id"].isin(new["player_id"])
+                   & ~history["game_id"].astype(str).isin(new["game_id"].astype(str))]
+    hist = hist.iloc[np.lexsort((pd.to_datetime(hist["game_date_team"]).to_numpy(), hist["player_id"].to_numpy()))]
+    hist = hist.groupby("player_id").tail(max(windows))
+
+    both = add_form_features(pd.concat([hist.assign(_new=False), new.assign(_new=True)], ignore_index=True), windows)
+    return both[both["_new"]].drop(columns="_new").reset_index(drop=True)
+
+
+# -------------------------------------------------
+# OPPONENT ADJUSTMENT
+# -------------------------------------------------
+CONTEXT_SUMS = ADJUST_COUNTS + ["fga", "fta", "fgm", "fg3m"]
+CONTEXT_COLS = ["season", "game_id", "team_id", "game_date_team", "team_possessions"] + CONTEXT_SUMS
+KEY_STRIDE = 10_000_000_000   # team ids are < 1e10
+
+
+def team_game_key(game_id, team_id) -> np.ndarray:
+    """Integer join key for a (game, team) pair."""
+    return (pd.to_numeric(pd.Series(game_id)).to_numpy(np.int64) * KEY_STRIDE
+            + pd.to_numeric(pd.Series(team_id)).to_numpy(np.int64))
+
+
+def build_team_game_context(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Player-game feature rows → one row per team-game (indexed by
+    team_game_key) with the opponent's pre-game defensive profile: what it
+    allows per 100 possessions for every ADJUST_COUNTS stat, its allowed
+    TS% / eFG%, its net rating, and the league reference for each. The
+    opponent's and the league's running totals are looked up as of the game
+    date (strictly before it, within the season) with one searchsorted each
+    over a sorted int64 key, so no row depends on later games.
+    """
+    sums = [c for c in CONTEXT_SUMS if c in df.columns]
+    key = team_game_key(df["game_id"], df["team_id"])
+    keys, first, inv = np.unique(key, return_index=True, return_inverse=True)
+    vals = df[sums].to_numpy(float)
+    totals = np.column_stack([np.bincount(inv, weights=vals[:, j], minlength=len(keys))
+                              for j in range(len(sums))])
+    poss = df["team_possessions"].to_numpy(float)[first]
+    days = pd.to_datetime(df["game_date_team"].iloc[first]).values.astype("datetime64[D]").astype(np.int64)
+    season = df["season"].astype(str).to_numpy()[first] if "season" in df.columns else np.zeros(len(keys))
+    season_code, seasons = pd.factorize(season)
+
+    # Opponent = the other row of the same game: keys are sorted by game,
+    # so once partial games are dropped the two teams are adjacent
+    game = keys // KEY_STRIDE
+    _, game_inv, game_n = np.unique(game, return_inverse=True, return_counts=True)
+    keep = game_n[game_inv] == 2
+    keys, totals, poss, days, season_code = keys[keep], totals[keep], poss[keep], days[keep], season_code[keep]
+    opp = np.arange(len(keys)) ^ 1
+    col = {c: j for j, c in enumerate(sums)}
+
+    # Each team's running totals after every game it played: possessions,
+    # what it allowed (the opponent's counts) and its own points
+    team_code, _ = pd.factorize(keys % KEY_STRIDE)
+    n_teams = team_code.max() + 1 if len(team_code) else 1
+    group = season_code.astype(np.int64) * n_teams + team_code
+    run = np.column_stack([poss, totals[opp], totals[:, col["pts"]] if "pts" in col else np.zeros(len(keys))])
+    order = np.lexsort((days, group))
+    g_sorted = group[order]
+    cum = np.cumsum(run[order], axis=0)
+    starts = np.r_[0, np.flatnonzero(np.diff(g_sorted)) + 1]
+    seg = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    cum -= np.where(seg[:, None] > 0, cum[np.maximum(seg - 1, 0)], 0.0)
+    games_cum = np.arange(len(order)) - seg + 1
+
+    # As-of lookup: opponent's last game strictly before this game date
+    day0 = days.min() if len(days) else 0
+    day_span = days.max() - day0 + 2 if len(days) else 1
+    t_key = g_sorted * day_span + (days[order] - day0)
+    q_group = group[opp]
+    pos = np.searchsorted(t_key, q_group * day_span + (days - day0), side="left") - 1
+    hit = (pos >= 0) & (g_sorted[np.maximum(pos, 0)] == q_group)
+    before = np.where(hit[:, None], cum[np.maximum(pos, 0)], 0.0)
+    games = np.where(hit, games_cum[np.maximum(pos, 0)], 0)
+
+    # League per-team-game reference (shrinkage prior and adjustment
+    # numerator), as of the game date the same way. On a season's opening
+    # date nothing is earlier; the opponent has no games either, so the
+    # adjustment is neutral whatever the reference, and that date's own
+    # games stand in to keep it finite.
+    lg_order = np.lexsort((days, season_code))
+    lg_key = season_code[lg_order].astype(np.int64) * day_span + (days[lg_order] - day0)
+    lg_cum = np.cumsum(np.column_stack([np.ones(len(keys)), poss, totals])[lg_order], axis=0)
+    q_day = season_code.astype(np.int64) * day_span + (days - day0)
+    season_start = np.searchsorted(lg_key, season_code.astype(np.int64) * day_span, side="left") - 1
+    pos = np.searchsorted(lg_key, q_day, side="left") - 1
+    pos = np.where(pos > season_start, pos, np.searchsorted(lg_key, q_day, side="right") - 1)
+    lg_sum = lg_cum[pos] - np.where(season_start[:, None] >= 0, lg_cum[np.maximum(season_start, 0)], 0.0)
+    lg = lg_sum[:, 1:] / lg_sum[:, :1]
+    lg_poss, lg_tot = lg[:, 0], lg[:, 1:]
+
+    k = CONTEXT_PRIOR_GAMES
+    poss_a = before[:, 0] + k * lg_poss
+    allowed = before[:, 1:1 + len(sums)] + k * lg_tot
+
+    out = pd.DataFrame(index=keys)
+    for c in ADJUST_COUNTS:
+        if c in col:
+            out[f"opp_allowed_{c}_per100"] = allowed[:, col[c]] / poss_a * 100.0
+            out[f"lg_{c}_per100"] = lg_tot[:, col[c]] / lg_poss * 100.0
+
+    if {"pts", "fga", "fta", "fgm", "fg3m"} <= set(col):
+        a = {c: allowed[:, col[c]] for c in ["pts", "fga", "fta", "fgm", "fg3m"]}
+        l = {c: lg_tot[:, col[c]] for c in ["pts", "fga", "fta", "fgm", "fg3m"]}
+        out["opp_allowed_ts"] = a["pts"] / (2 * (a["fga"] + 0.44 * a["fta"]))
+        out["opp_allowed_efg"] = (a["fgm"] + 0.5 * a["fg3m"]) / a["fga"]
+        out["lg_ts"] = l["pts"] / (2 * (l["fga"] + 0.44 * l["fta"]))
+        out["lg_efg"] = (l["fgm"] + 0.5 * l["fg3m"]) / l["fga"]
+
+        # Opponent net rating per 100: points scored minus points allowed
+        scored = before[:, -1] + k * l["pts"]
+        out["opp_net_rating"] = (scored - a["pts"]) / poss_a * 100.0
+
+    out["opp_games_before"] = games
+    return out
+
+
+def add_opponent_adjusted(df: pd.DataFrame, history: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Opponent-adjusted copies ({col}_adj) of the per-100 talent inputs,
+    TS% / eFG% and pm_per100. The team-game context is built once (from
+    history + df, so incremental callers still see the season so far) and
+    joined to player rows by integer key. Columns are added to df in place
+    (no copy of the wide feature frame) and df is returned.
+    """
+    if history is not None:
+        cols = [c for c in CONTEXT_COLS if c in df.columns and c in history.columns]
+        ctx = build_team_game_context(pd.concat([history[cols], df[cols]], ignore_index=True))
+    else:
+        ctx = build_team_game_context(df)
+
+    rows = ctx.index.get_indexer(team_game_key(df["game_id"], df["team_id"]))
+    hit = rows >= 0
+    take = lambda col: np.where(hit, ctx[col].to_numpy()[np.maximum(rows, 0)], np.nan)
+
+    for c in ADJUST_COUNTS:
+        if f"opp_allowed_{c}_per100" in ctx.columns and f"{c}_per100" in df.columns:
+            df[f"{c}_per100_adj"] = df[f"{c}_per100"].to_numpy() * take(f"lg_{c}_per100") / take(f"opp_allowed_{c}_per100")
+    if "opp_allowed_ts" in ctx.columns:
+        df["ts_pct_calc_adj"] = df["ts_pct_calc"].to_numpy() * take("lg_ts") / take("opp_allowed_ts")
+        df["efg_pct_calc_adj"] = df["efg_pct_calc"].to_numpy() * take("lg_efg") / take("opp_allowed_efg")
+        df["pm_per100_adj"] = df["pm_per100"].to_numpy() + take("opp_net_rating")
+    df["opp_games_before"] = take("opp_games_before")
+    return df
+
+
+def build_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Feature engineering with the configured FEATURE_ENGINE."""
+    if FEATURE_ENGINE == "polars":
+        return build_darkish_features_lazy(df)
+    return build_darkish_features(df)
+
+
 # -------------------------------------------------
 # MAIN LOOP — PROCESS ALL SEASONS AUTOMATICALLY
 # -------------------------------------------------
@@ -183,7 +511,9 @@ if __name__ == "__main__":
         print(f"📥 Loading: {input_path}")
         raw = pd.read_csv(input_path)
 
-        feats = build_darkish_features(raw)
+        feats = build_features(raw)
+        if OPPONENT_ADJUST:
+            feats = add_opponent_adjusted(feats)
 
         print(f"💾 Saving: {output_path}\n")
         feats.to_csv(output_path, index=False)
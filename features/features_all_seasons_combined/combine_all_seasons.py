@@ -1,6 +1,16 @@
 import os
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ingestion"))
+from build_player_dim import build_player_dim, write_player_dim, PLAYER_DIM_CSV
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_eng_all_seasons import add_form_features
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "darkolite"))
+from darkolite_baselines import build_league_baselines, write_league_baselines, BASELINES_CSV
+
 # -------------------------------------------------
 # CONFIG
 # -------------------------------------------------
@@ -51,10 +61,22 @@ def combine_all_seasons():
     master_df = pd.concat(all_rows, ignore_index=True)
     print(f"\n🔢 Combined total rows: {len(master_df):,}")
 
+    # Last-N-game form spans seasons, so it is built on the combined frame
+    print("📈 Adding rolling form features...")
+    master_df = add_form_features(master_df)
+
     # Save master CSV
     print(f"💾 Saving master file → {OUTPUT_MASTER}")
     master_df.to_csv(OUTPUT_MASTER, index=False)
 
+    # Player dimension: canonical name per id, shared by every later stage
+    print(f"💾 Saving player dimension → {PLAYER_DIM_CSV}")
+    write_player_dim(build_player_dim(master_df), PLAYER_DIM_CSV)
+
+    # Per-season league baselines: era priors and z-score moments
+    print(f"💾 Saving league baselines → {BASELINES_CSV}")
+    write_league_baselines(build_league_baselines(master_df), BASELINES_CSV)
+
     print("\n🎉 Successfully created master features file!")
 
 
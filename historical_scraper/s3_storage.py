@@ -0,0 +1,238 @@
+import os
+import io
+import json
+import zlib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pandas as pd
+from botocore.exceptions import ClientError
+
+# --------------------------
+# CONFIG
+# --------------------------
+
+# Point at MinIO / a moto server for local testing, e.g. http://localhost:9000
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+
+PART_SIZE = 8 * 1024 * 1024       # multipart part size (S3 minimum is 5 MB)
+MAX_INFLIGHT_PARTS = 4            # bounds memory: ~PART_SIZE * (MAX_INFLIGHT_PARTS + 1)
+UPLOAD_WORKERS = 4
+DOWNLOAD_WORKERS = 8
+CSV_CHUNK_ROWS = 100_000          # DataFrame rows serialized per chunk
+READ_BLOCK = 1024 * 1024          # file bytes read per block
+
+HASH_METADATA_KEY = "content-sha256"
+SYNC_MANIFEST = ".s3_sync_manifest.json"   # per local_dir: relative path → ETag last downloaded
+
+
+# --------------------------
+# HELPERS
+# --------------------------
+
+def get_client():
+    return boto3.client("s3", endpoint_url=S3_ENDPOINT_URL)
+
+
+def remote_hash(s3, bucket: str, key: str) -> str | None:
+    """Content hash stored with the object on its last upload (None if absent)."""
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return head.get("Metadata", {}).get(HASH_METADATA_KEY)
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def dataframe_hash(df: pd.DataFrame) -> str:
+    h = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    h.update(",".join(map(str, df.columns)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def iter_file_blocks(path: str):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            yield block
+
+
+def iter_csv_blocks(df: pd.DataFrame, chunk_rows: int | None = None):
+    """CSV bytes for a DataFrame, a chunk of rows at a time (header once)."""
+    chunk_rows = chunk_rows or CSV_CHUNK_ROWS
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=(start == 0)).encode("utf-8")
+
+
+def iter_gzip(blocks):
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 → gzip container
+    for block in blocks:
+        out = comp.compress(block)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def iter_parts(blocks, part_size: int | None = None):
+    """Re-slice a byte stream into multipart-sized parts."""
+    part_size = part_size or PART_SIZE
+    buf = io.BytesIO()
+    emitted = False
+    for block in blocks:
+        buf.write(block)
+        if buf.tell() >= part_size:
+            yield buf.getvalue()
+            buf = io.BytesIO()
+            emitted = True
+    if buf.tell() or not emitted:
+        # An empty object still needs one part
+        yield buf.getvalue()
+
+
+def multipart_upload(s3, blocks, bucket: str, key: str, metadata: dict,
+                     content_type: str = "text/csv", content_encoding: str | None = None):
+    """
+    Stream blocks into a parallel multipart upload. At most
+    MAX_INFLIGHT_PARTS parts are held in memory at once.
+    """
+    extra = {"ContentType": content_type, "Metadata": metadata}
+    if content_encoding:
+        extra["ContentEncoding"] = content_encoding
+
+    upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, **extra)["UploadId"]
+    slots = threading.BoundedSemaphore(MAX_INFLIGHT_PARTS)
+
+    def _send(number: int, body: bytes):
+        try:
+            resp = s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                  PartNumber=number, Body=body)
+            return {"PartNumber": number, "ETag": resp["ETag"]}
+        finally:
+            slots.release()
+
+    try:
+        futures = []
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+            for number, body in enumerate(iter_parts(blocks), start=1):
+                slots.acquire()
+                futures.append(pool.submit(_send, number, body))
+            parts = [f.result() for f in futures]
+
+        s3.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                     MultipartUpload={"Parts": parts})
+    except Exception:
+        s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+
+# --------------------------
+# PUBLIC API
+# --------------------------
+
+def upload_dataframe(df: pd.DataFrame, bucket: str, key: str, compress: bool = True,
+                     s3=None) -> bool:
+    """
+    Stream a DataFrame to S3 as (gzipped) CSV. Skips the upload when the
+    object already holds the same content. Returns True if uploaded.
+    """
+    s3 = s3 or get_client()
+    digest = dataframe_hash(df)
+    if remote_hash(s3, bucket, key) == digest:
+        print(f"⏩ Unchanged, skipping: s3://{bucket}/{key}")
+        return False
+
+    blocks = iter_csv_blocks(df)
+    if compress:
+        blocks = iter_gzip(blocks)
+    multipart_upload(s3, blocks, bucket, key, {HASH_METADATA_KEY: digest},
+                     content_encoding="gzip" if compress else None)
+    print(f"☁️ Uploaded to S3: s3://{bucket}/{key}")
+    return True
+
+
+def upload_file(path: str, bucket: str, key: str, compress: bool = True, s3=None) -> bool:
+    """Stream a local file to S3 (optionally gzipped), skipping unchanged content."""
+    s3 = s3 or get_client()
+    digest = file_hash(path)
+    if remote_hash(s3, bucket, key) == digest:
+        print(f"⏩ Unchanged, skipping: s3://{bucket}/{key}")
+        return False
+
+    blocks = iter_file_blocks(path)
+    if compress:
+        blocks = iter_gzip(blocks)
+    multipart_upload(s3, blocks, bucket, key, {HASH_METADATA_KEY: digest},
+                     content_encoding="gzip" if compress else None)
+    print(f"☁️ Uploaded to S3: s3://{bucket}/{key}")
+    return True
+
+
+def load_sync_manifest(local_dir: str) -> dict:
+    path = os.path.join(local_dir, SYNC_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_sync_manifest(local_dir: str, manifest: dict):
+    os.makedirs(local_dir, exist_ok=True)
+    path = os.path.join(local_dir, SYNC_MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def sync_prefix(bucket: str, prefix: str, local_dir: str, s3=None) -> list:
+    """
+    Parallel download of every object under prefix into local_dir. A file is
+    skipped only when it is present with the object's size and the ETag
+    recorded when it was last downloaded still matches the listing (any
+    re-upload, even a same-size one, changes the ETag). Files synced
+    earlier whose object is gone are deleted, with their manifest entries.
+    Returns the local paths of the listed objects.
+    """
+    s3 = s3 or get_client()
+    objects = []
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        objects.extend(page.get("Contents", []))
+    manifest = load_sync_manifest(local_dir)
+
+    def _fetch(obj):
+        rel = obj["Key"][len(prefix):].lstrip("/")
+        path = os.path.join(local_dir, rel)
+        if (os.path.exists(path) and os.path.getsize(path) == obj["Size"]
+                and manifest.get(rel) == obj["ETag"]):
+            return rel, path, False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".part"
+        s3.download_file(bucket, obj["Key"], tmp)
+        os.replace(tmp, path)
+        return rel, path, True
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        results = list(pool.map(_fetch, [o for o in objects if not o["Key"].endswith("/")]))
+
+    etags = {o["Key"][len(prefix):].lstrip("/"): o["ETag"] for o in objects}
+    for rel in set(manifest) - set(etags):
+        path = os.path.join(local_dir, rel)
+        if os.path.exists(path):
+            os.remove(path)
+        del manifest[rel]
+    manifest.update({rel: etags[rel] for rel, _, _ in results})
+    write_sync_manifest(local_dir, manifest)
+
+    fetched = sum(new for _, _, new in results)
+    print(f"📥 Synced {len(results)} objects ({fetched} downloaded) from s3://{bucket}/{prefix} → {local_dir}")
+    return [path for _, path, _ in results]
@@ -0,0 +1,324 @@
+import os
+import time
+import random
+import socket
+import sqlite3
+import logging
+import argparse
+import multiprocessing as mp
+import pandas as pd
+from nba_api.stats.endpoints import boxscoretraditionalv2
+
+# Reuses the throttling headers and logging setup
+from scrape_player_boxscores import make_season_str
+from scrape_season_logs import fetch_season_log, normalize_game_keys, META_COLUMNS
+
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+BASE_DIR = r"C:\Users\gngim\Desktop\Darko\historical_scraper"
+TEAM_DIR = os.path.join(BASE_DIR, "team_boxscores")
+QUEUE_DB = os.path.join(BASE_DIR, "scrape_jobs.sqlite")
+
+START_YEAR = 1996
+END_YEAR = 2025
+
+MAX_ATTEMPTS = 25          # after this many failures a job is dead-lettered
+BACKOFF_BASE = 5.0         # seconds; retry delay grows with attempts
+BACKOFF_CAP = 180.0
+LEASE_SECONDS = 300        # a "running" job older than this is reclaimable
+IDLE_SLEEP = 5.0           # worker sleep when nothing is due yet
+REQUEST_SLEEP = 1.2        # polite gap between requests per worker
+
+
+# ---------------------------------------------------
+# QUEUE STORAGE
+# ---------------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    season        TEXT NOT NULL,
+    game_id       TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'pending',  -- pending | running | done | dead
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    next_retry_at REAL NOT NULL DEFAULT 0,
+    lease_until   REAL,
+    worker        TEXT,
+    last_error    TEXT,
+    updated_at    REAL,
+    PRIMARY KEY (season, game_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_retry_at);
+
+CREATE TABLE IF NOT EXISTS dead_letter (
+    season         TEXT NOT NULL,
+    game_id        TEXT NOT NULL,
+    attempts       INTEGER NOT NULL,
+    failure_reason TEXT,
+    failed_at      REAL NOT NULL,
+    PRIMARY KEY (season, game_id)
+);
+"""
+
+
+def connect(db_path: str = QUEUE_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=60000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def enqueue_games(conn: sqlite3.Connection, season: str, game_ids, done_ids=()) -> int:
+    """
+    Insert one job per game (existing jobs are left untouched, so re-running
+    enqueue never resets progress). Games already on disk start as done.
+    """
+    now = time.time()
+    done_ids = set(done_ids)
+    rows = [
+        (season, gid, "done" if gid in done_ids else "pending", now)
+        for gid in game_ids
+    ]
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO jobs (season, game_id, status, updated_at) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    return conn.total_changes - before
+
+
+def claim_job(conn: sqlite3.Connection, worker: str):
+    """
+    Atomically lease the next due job: pending and past its retry time, or
+    running with an expired lease (its worker died). Returns (season, game_id)
+    or None.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            """
+            SELECT season, game_id FROM jobs
+            WHERE (status = 'pending' AND next_retry_at <= ?)
+               OR (status = 'running' AND lease_until < ?)
+            ORDER BY next_retry_at, season, game_id
+            LIMIT 1
+            """,
+            (now, now),
+        ).fetchone()
+
+        if row is not None:
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'running', lease_until = ?, worker = ?, updated_at = ?
+                WHERE season = ? AND game_id = ?
+                """,
+                (now + LEASE_SECONDS, worker, now, row[0], row[1]),
+            )
+        conn.execute("COMMIT")
+        return row
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def complete_job(conn: sqlite3.Connection, season: str, game_id: str):
+    conn.execute(
+        "UPDATE jobs SET status = 'done', lease_until = NULL, last_error = NULL, updated_at = ? "
+        "WHERE season = ? AND game_id = ?",
+        (time.time(), season, game_id),
+    )
+
+
+def fail_job(conn: sqlite3.Connection, season: str, game_id: str, reason: str):
+    """
+    Record a failed attempt: schedule a backed-off retry, or park the job in
+    dead_letter once it has used MAX_ATTEMPTS.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        attempts = conn.execute(
+            "SELECT attempts FROM jobs WHERE season = ? AND game_id = ?", (season, game_id)
+        ).fetchone()[0] + 1
+
+        if attempts >= MAX_ATTEMPTS:
+            conn.execute(
+                "UPDATE jobs SET status = 'dead', attempts = ?, last_error = ?, lease_until = NULL, "
+                "updated_at = ? WHERE season = ? AND game_id = ?",
+                (attempts, reason, now, season, game_id),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO dead_letter VALUES (?, ?, ?, ?, ?)",
+                (season, game_id, attempts, reason, now),
+            )
+        else:
+            wait = min(BACKOFF_CAP, BACKOFF_BASE * attempts + random.uniform(1, 5))
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = ?, last_error = ?, lease_until = NULL, "
+                "next_retry_at = ?, updated_at = ? WHERE season = ? AND game_id = ?",
+                (attempts, reason, now + wait, now, season, game_id),
+            )
+        conn.execute("COMMIT")
+        return attempts
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def replay_dead(conn: sqlite3.Connection, season: str | None = None) -> int:
+    """Move dead-lettered jobs back to pending with a fresh attempt budget."""
+    where, args = ("WHERE season = ?", (season,)) if season else ("", ())
+    conn.execute("BEGIN IMMEDIATE")
+    keys = conn.execute(f"SELECT season, game_id FROM dead_letter {where}", args).fetchall()
+    conn.executemany(
+        "UPDATE jobs SET status = 'pending', attempts = 0, next_retry_at = 0, last_error = NULL "
+        "WHERE season = ? AND game_id = ?",
+        keys,
+    )
+    conn.executemany("DELETE FROM dead_letter WHERE season = ? AND game_id = ?", keys)
+    conn.execute("COMMIT")
+    return len(keys)
+
+
+def queue_status(conn: sqlite3.Connection) -> pd.DataFrame:
+    return pd.read_sql_query(
+        "SELECT season, status, COUNT(*) AS jobs FROM jobs GROUP BY season, status ORDER BY season, status",
+        conn,
+    )
+
+
+# ---------------------------------------------------
+# SCRAPING
+# ---------------------------------------------------
+def game_file(season: str, game_id: str) -> str:
+    return os.path.join(BASE_DIR, season, f"player_boxscore_{season}_{game_id}.csv")
+
+
+def load_season_meta(season: str) -> pd.DataFrame:
+    """Team-game metadata from disk, fetched once with LeagueGameLog if missing."""
+    path = os.path.join(TEAM_DIR, f"boxscores_{season}.csv")
+    if os.path.exists(path):
+        meta = pd.read_csv(path, dtype={"GAME_ID": str})
+    else:
+        os.makedirs(TEAM_DIR, exist_ok=True)
+        meta = fetch_season_log(season, "T")
+        if meta.empty:
+            return meta
+        meta.to_csv(path, index=False)
+    return normalize_game_keys(meta)
+
+
+def scrape_game(season: str, game_id: str, meta: pd.DataFrame):
+    """
+    Single attempt (retries are the queue's job). Raises on any failure and
+    writes the file atomically so a crash never leaves a half-written game.
+    """
+    bs = boxscoretraditionalv2.BoxScoreTraditionalV2(game_id=game_id, timeout=120).get_data_frames()[0]
+    if bs.empty:
+        raise ValueError("empty box score")
+
+    bs = normalize_game_keys(bs)
+    meta_game = meta.loc[meta["GAME_ID"] == game_id, ["GAME_ID", "TEAM_ID", "TEAM_ABBREVIATION"] + META_COLUMNS]
+    merged = bs.merge(meta_game, on=["GAME_ID", "TEAM_ID", "TEAM_ABBREVIATION"], how="left")
+
+    out_path = game_file(season, game_id)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    merged.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
+
+
+def run_worker(worker_idx: int = 0, db_path: str = QUEUE_DB, exit_when_idle: bool = True):
+    worker = f"{socket.gethostname()}:{os.getpid()}:{worker_idx}"
+    conn = connect(db_path)
+    meta_cache = {}
+    logging.info(f"👷 Worker {worker} started")
+
+    while True:
+        job = claim_job(conn, worker)
+        if job is None:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')"
+            ).fetchone()[0]
+            if pending == 0 and exit_when_idle:
+                logging.info(f"🏁 Worker {worker}: queue drained")
+                return
+            time.sleep(IDLE_SLEEP)
+            continue
+
+        season, game_id = job
+        try:
+            if season not in meta_cache:
+                meta_cache[season] = load_season_meta(season)
+            scrape_game(season, game_id, meta_cache[season])
+            complete_job(conn, season, game_id)
+            logging.info(f"💾 {season} {game_id} done")
+        except Exception as e:
+            attempts = fail_job(conn, season, game_id, str(e)[:500])
+            state = "dead-lettered" if attempts >= MAX_ATTEMPTS else "will retry"
+            logging.warning(f"⚠️ {season} {game_id} failed (attempt {attempts}, {state}): {e}")
+
+        time.sleep(REQUEST_SLEEP + random.uniform(0.4, 1.2))
+
+
+def enqueue_seasons(conn: sqlite3.Connection, start_year: int, end_year: int):
+    for year in range(start_year, end_year):
+        season = make_season_str(year)
+        meta = load_season_meta(season)
+        if meta.empty:
+            logging.error(f"❌ No metadata for {season}, nothing enqueued.")
+            continue
+
+        game_ids = sorted(meta["GAME_ID"].unique())
+        on_disk = [gid for gid in game_ids if os.path.exists(game_file(season, gid))]
+        added = enqueue_games(conn, season, game_ids, done_ids=on_disk)
+        logging.info(f"📥 {season}: {added} new jobs ({len(on_disk)} already on disk)")
+
+
+# ---------------------------------------------------
+# MAIN
+# ---------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable box-score scrape queue")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_enq = sub.add_parser("enqueue", help="add one job per game for a season range")
+    p_enq.add_argument("--start-year", type=int, default=START_YEAR)
+    p_enq.add_argument("--end-year", type=int, default=END_YEAR)
+
+    p_work = sub.add_parser("work", help="run worker processes until the queue drains")
+    p_work.add_argument("--workers", type=int, default=1)
+
+    p_replay = sub.add_parser("replay", help="move dead-lettered jobs back to pending")
+    p_replay.add_argument("--season", default=None)
+
+    sub.add_parser("status", help="job counts per season and status")
+    sub.add_parser("dead", help="list dead-lettered jobs")
+
+    args = parser.parse_args()
+    conn = connect()
+
+    if args.cmd == "enqueue":
+        enqueue_seasons(conn, args.start_year, args.end_year)
+
+    elif args.cmd == "work":
+        if args.workers <= 1:
+            run_worker(0)
+        else:
+            procs = [mp.Process(target=run_worker, args=(i,)) for i in range(args.workers)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+
+    elif args.cmd == "replay":
+        n = replay_dead(conn, args.season)
+        logging.info(f"🔁 Re-queued {n} dead-lettered jobs")
+
+    elif args.cmd == "status":
+        print(queue_status(conn).to_string(index=False))
+
+    elif args.cmd == "dead":
+        print(pd.read_sql_query("SELECT * FROM dead_letter ORDER BY season, game_id", conn).to_string(index=False))
@@ -0,0 +1,92 @@
+import os
+import time
+import random
+import logging
+import pandas as pd
+from nba_api.stats.endpoints import scheduleleaguev2
+
+# Reuses the throttling headers and logging setup
+from scrape_player_boxscores import make_season_str
+
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+SEASON_YEAR = 2025   # 2025 → the 2025-26 schedule
+BASE_DIR = r"C:\Users\gngim\Desktop\Darko\historical_scraper"
+TEAM_DIR = os.path.join(BASE_DIR, "team_boxscores")
+
+# Exact schedule file schema that darkolite_season_sim.py reads
+SCHEDULE_COLUMNS = ["GAME_ID", "GAME_DATE", "HOME_TEAM_ID", "AWAY_TEAM_ID"]
+
+
+# ---------------------------------------------------
+# HELPERS
+# ---------------------------------------------------
+def fetch_schedule(season: str) -> pd.DataFrame:
+    """
+    Full league schedule (ScheduleLeagueV2) reduced to regular-season games
+    in the schedule file schema. Regular-season GAME_IDs start with "002";
+    preseason, All-Star, play-in, playoff and NBA Cup final games are dropped,
+    matching the LeagueGameLog "Regular Season" team log they are compared to.
+    """
+    MAX_RETRIES = 10
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            data = scheduleleaguev2.ScheduleLeagueV2(season=season, timeout=90)
+            raw = data.season_games.get_data_frame()
+            break
+
+        except Exception as e:
+            wait = 5 * attempt + random.uniform(1, 5)
+            logging.warning(
+                f"⚠️ Error fetching schedule for {season}: {e} "
+                f"(attempt {attempt}/{MAX_RETRIES}) — waiting {wait:.1f}s"
+            )
+            time.sleep(wait)
+    else:
+        logging.error(f"❌ FAILED schedule for {season} after {MAX_RETRIES} attempts")
+        return pd.DataFrame(columns=SCHEDULE_COLUMNS)
+
+    sched = pd.DataFrame({
+        "GAME_ID": raw["gameId"].astype(str).str.zfill(10),
+        # Eastern calendar date, the same day LeagueGameLog's GAME_DATE uses
+        "GAME_DATE": pd.to_datetime(raw["gameDateEst"].astype(str).str[:10]),
+        "HOME_TEAM_ID": pd.to_numeric(raw["homeTeam_teamId"], errors="coerce"),
+        "AWAY_TEAM_ID": pd.to_numeric(raw["awayTeam_teamId"], errors="coerce"),
+    })
+    sched = sched[sched["GAME_ID"].str.startswith("002")].dropna()
+    sched = sched[(sched["HOME_TEAM_ID"] > 0) & (sched["AWAY_TEAM_ID"] > 0)]
+    sched[["HOME_TEAM_ID", "AWAY_TEAM_ID"]] = sched[["HOME_TEAM_ID", "AWAY_TEAM_ID"]].astype(int)
+    sched = sched.sort_values(["GAME_DATE", "GAME_ID"]).reset_index(drop=True)
+
+    logging.info(f"✅ {season} schedule: {len(sched):,} regular-season games")
+    return sched[SCHEDULE_COLUMNS]
+
+
+def write_schedule(season: str, team_dir: str = TEAM_DIR) -> str | None:
+    """
+    Fetch the schedule and write team_boxscores/schedule_{season}.csv, next
+    to the season's team log. Returns the path, or None if nothing came back
+    (an existing file is left untouched).
+    """
+    sched = fetch_schedule(season)
+    if sched.empty:
+        logging.error(f"❌ No schedule for {season}; nothing written.")
+        return None
+
+    os.makedirs(team_dir, exist_ok=True)
+    path = os.path.join(team_dir, f"schedule_{season}.csv")
+    tmp = path + ".tmp"
+    sched.to_csv(tmp, index=False, date_format="%Y-%m-%d")
+    os.replace(tmp, path)
+    logging.info(f"💾 Saved {len(sched):,} scheduled games → {path}")
+    return path
+
+
+# ---------------------------------------------------
+# MAIN
+# ---------------------------------------------------
+if __name__ == "__main__":
+    write_schedule(make_season_str(SEASON_YEAR))
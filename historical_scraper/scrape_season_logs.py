@@ -0,0 +1,189 @@
+import os
+import time
+import random
+import logging
+import pandas as pd
+from nba_api.stats.endpoints import leaguegamelog
+
+# Reuses the throttling headers, logging setup and per-game fetcher
+from scrape_player_boxscores import fetch_player_boxscore, make_season_str
+
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+START_YEAR = 1996
+END_YEAR = 2025
+BASE_DIR = r"C:\Users\gngim\Desktop\Darko\historical_scraper"
+TEAM_DIR = os.path.join(BASE_DIR, "team_boxscores")
+
+# Fetch per-game BoxScoreTraditionalV2 only for games the season log lacks
+FALLBACK_PER_GAME = True
+
+# Exact per-game player file schema (BoxScoreTraditionalV2 + game metadata)
+# that merge_team_data_into_player_data.py and build_darkish_features read.
+PLAYER_BOX_COLUMNS = [
+    "GAME_ID", "TEAM_ID", "TEAM_ABBREVIATION", "TEAM_CITY",
+    "PLAYER_ID", "PLAYER_NAME", "NICKNAME", "START_POSITION", "COMMENT",
+    "MIN", "FGM", "FGA", "FG_PCT", "FG3M", "FG3A", "FG3_PCT",
+    "FTM", "FTA", "FT_PCT", "OREB", "DREB", "REB",
+    "AST", "STL", "BLK", "TO", "PF", "PTS", "PLUS_MINUS",
+]
+META_COLUMNS = ["GAME_DATE", "MATCHUP", "WL"]
+
+
+# ---------------------------------------------------
+# HELPERS
+# ---------------------------------------------------
+def fetch_season_log(season: str, kind: str) -> pd.DataFrame:
+    """
+    One LeagueGameLog call for a whole season.
+    kind = "P" (one row per player-game) or "T" (one row per team-game).
+    """
+    MAX_RETRIES = 10
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            data = leaguegamelog.LeagueGameLog(
+                season=season,
+                season_type_all_star="Regular Season",
+                player_or_team_abbreviation=kind,
+                timeout=90,
+            )
+            df = data.get_data_frames()[0]
+            logging.info(f"✅ {season} {kind}-log: {len(df):,} rows")
+            return df
+
+        except Exception as e:
+            wait = 5 * attempt + random.uniform(1, 5)
+            logging.warning(
+                f"⚠️ Error fetching {kind}-log for {season}: {e} "
+                f"(attempt {attempt}/{MAX_RETRIES}) — waiting {wait:.1f}s"
+            )
+            time.sleep(wait)
+
+    logging.error(f"❌ FAILED {kind}-log for {season} after {MAX_RETRIES} attempts")
+    return pd.DataFrame()
+
+
+def normalize_game_keys(df: pd.DataFrame) -> pd.DataFrame:
+    df["GAME_ID"] = df["GAME_ID"].astype(str).str.zfill(10)
+    df["TEAM_ID"] = pd.to_numeric(df["TEAM_ID"], errors="coerce")
+    df["TEAM_ABBREVIATION"] = df["TEAM_ABBREVIATION"].astype(str).str.upper()
+    return df
+
+
+def minutes_to_clock(minutes: pd.Series) -> pd.Series:
+    """Fractional minutes → the per-game files' "MM:SS" strings."""
+    secs = (pd.to_numeric(minutes, errors="coerce") * 60).round()
+    clock = (secs // 60).astype("Int64").astype(str) + ":" + (secs % 60).astype("Int64").astype(str).str.zfill(2)
+    return clock.where(secs.notna(), pd.NA)
+
+
+def normalize_player_log(log: pd.DataFrame) -> pd.DataFrame:
+    """
+    Map a season player log onto the per-game box-score file schema.
+    TEAM_CITY / NICKNAME / START_POSITION / COMMENT are not in the season
+    log and are left empty (nothing downstream reads them).
+
+    Minutes: LeagueGameLog's MIN is whole minutes, coarser than the per-game
+    "MM:SS" clock that minutes, possessions, per-100 rates and RAPM minute
+    shares are built from. A MIN_SEC clock or fractional MIN is used when
+    the log carries one; otherwise the whole-minute values are kept and a
+    warning is logged.
+    """
+    df = normalize_game_keys(log.rename(columns={"TOV": "TO"}).copy())
+
+    if "MIN_SEC" in df.columns and df["MIN_SEC"].notna().any():
+        df["MIN"] = df["MIN_SEC"]
+    elif "MIN" in df.columns:
+        mins = pd.to_numeric(df["MIN"], errors="coerce")
+        if (mins.dropna() % 1 != 0).any():
+            df["MIN"] = minutes_to_clock(mins)
+        else:
+            logging.warning("⚠️ Season log has whole-minute MIN only; minutes are rounded "
+                            "relative to per-game box scores")
+
+    for col in PLAYER_BOX_COLUMNS + META_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.NA
+
+    return df[PLAYER_BOX_COLUMNS + META_COLUMNS]
+
+
+def fetch_missing_games(game_ids, team_log: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-game fallback for games the season log doesn't cover, joined to the
+    team-log metadata the same way scrape_player_boxscores.py does.
+    """
+    meta = team_log[["GAME_ID", "TEAM_ID", "TEAM_ABBREVIATION"] + META_COLUMNS]
+    frames = []
+
+    for idx, game_id in enumerate(game_ids, start=1):
+        logging.info(f"🎯 Fallback box score {game_id} ({idx}/{len(game_ids)})")
+        bs = fetch_player_boxscore(game_id)
+        if bs.empty:
+            logging.warning(f"⚠️ Empty result for {game_id}")
+            continue
+
+        bs = normalize_game_keys(bs)
+        merged = bs.merge(
+            meta[meta["GAME_ID"] == game_id],
+            on=["GAME_ID", "TEAM_ID", "TEAM_ABBREVIATION"],
+            how="left",
+        )
+        frames.append(merged[PLAYER_BOX_COLUMNS + META_COLUMNS])
+
+        time.sleep(1.0 + random.uniform(0.4, 1.2))
+
+    if not frames:
+        return pd.DataFrame(columns=PLAYER_BOX_COLUMNS + META_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def ingest_season(season: str):
+    """
+    Two LeagueGameLog calls per season instead of ~1,230 box-score calls.
+    Writes the team log to team_boxscores/boxscores_{season}.csv and all
+    player rows to {season}/player_boxscore_{season}_season.csv, which the
+    merge step's player_boxscore_{season}_*.csv pattern already picks up.
+    """
+    logging.info(f"===== Bulk ingest {season} =====")
+
+    season_dir = os.path.join(BASE_DIR, season)
+    os.makedirs(season_dir, exist_ok=True)
+    os.makedirs(TEAM_DIR, exist_ok=True)
+
+    team_log = fetch_season_log(season, "T")
+    if team_log.empty:
+        logging.error(f"❌ No team log for {season}, skipping season.")
+        return
+    team_log.to_csv(os.path.join(TEAM_DIR, f"boxscores_{season}.csv"), index=False)
+    team_log = normalize_game_keys(team_log)
+
+    player_log = fetch_season_log(season, "P")
+    players = normalize_player_log(player_log) if not player_log.empty else \
+        pd.DataFrame(columns=PLAYER_BOX_COLUMNS + META_COLUMNS)
+
+    missing = sorted(set(team_log["GAME_ID"]) - set(players["GAME_ID"]))
+    logging.info(f"📊 {players['GAME_ID'].nunique():,} games from season log, {len(missing)} missing")
+
+    if missing and FALLBACK_PER_GAME:
+        players = pd.concat([players, fetch_missing_games(missing, team_log)], ignore_index=True)
+
+    out_path = os.path.join(season_dir, f"player_boxscore_{season}_season.csv")
+    players.to_csv(out_path, index=False)
+    logging.info(f"💾 Saved {len(players):,} player rows → {out_path}")
+
+
+# ---------------------------------------------------
+# MAIN
+# ---------------------------------------------------
+if __name__ == "__main__":
+    logging.info("🚀 Starting bulk season-log ingestion...")
+
+    for year in range(START_YEAR, END_YEAR):
+        ingest_season(make_season_str(year))
+        time.sleep(1.5)
+
+    logging.info("🏁 DONE — all seasons ingested from season logs.")
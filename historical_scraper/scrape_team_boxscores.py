@@ -1,10 +1,11 @@
 import time
 import pandas as pd
-import boto3
 from nba_api.stats.endpoints import leaguegamelog
 from nba_api.stats.library.parameters import SeasonAll
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 
+from s3_storage import upload_dataframe
+
 # --------------------------
 # CONFIG
 # --------------------------
@@ -67,20 +68,11 @@ def save_local_csv(df: pd.DataFrame, season: str):
 
 
 def upload_to_s3(df: pd.DataFrame, season: str):
-    """Upload CSV of season data to S3."""
-    s3 = boto3.client("s3")
-
-    key = f"{S3_PREFIX}boxscores_{season}.csv"
-    csv_data = df.to_csv(index=False)
+    """Stream season data to S3 as gzipped CSV (skipped if unchanged)."""
+    key = f"{S3_PREFIX}boxscores_{season}.csv.gz"
 
     try:
-        s3.put_object(
-            Bucket=S3_BUCKET,
-            Key=key,
-            Body=csv_data.encode("utf-8"),
-            ContentType="text/csv"
-        )
-        print(f"☁️ Uploaded to S3: s3://{S3_BUCKET}/{key}")
+        upload_dataframe(df, S3_BUCKET, key)
 
     except (NoCredentialsError, PartialCredentialsError):
         print("❌ AWS credentials not found! Run `aws configure` and try again.")
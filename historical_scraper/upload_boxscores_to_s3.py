@@ -1,4 +1,4 @@
-import boto3
+from s3_storage import upload_file
 
 # -----------------------------
 # CONFIG
@@ -6,15 +6,14 @@ import boto3
 LOCAL_FILE = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darko_features.csv"
 
 BUCKET = "greg-darko-data"
-S3_KEY = "raw/nba_api/player_boxscores/all_darko_features.csv"
+S3_KEY = "raw/nba_api/player_boxscores/all_darko_features.csv.gz"
 
 # -----------------------------
 # UPLOAD
 # -----------------------------
-s3 = boto3.client("s3")
-
+# Streamed in gzipped multipart chunks; skipped if the content hash matches
 try:
-    s3.upload_file(LOCAL_FILE, BUCKET, S3_KEY)
-    print(f"Uploaded successfully → s3://{BUCKET}/{S3_KEY}")
+    if upload_file(LOCAL_FILE, BUCKET, S3_KEY):
+        print(f"Uploaded successfully → s3://{BUCKET}/{S3_KEY}")
 except Exception as e:
     print("Upload failed:", e)
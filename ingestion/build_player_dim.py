@@ -0,0 +1,87 @@
+import os
+import pandas as pd
+
+# =====================================================
+# CONFIG
+# =====================================================
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+PLAYER_DIM_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\player_dim.csv"
+
+ALIAS_SEP = "|"
+
+DIM_COLUMNS = ["player_id", "player_name", "aliases", "first_season", "last_season", "games"]
+
+
+# =====================================================
+# HELPERS
+# =====================================================
+def build_player_dim(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Player-game rows → one row per player_id: canonical name (the spelling
+    on the most games, most recent on ties), every alias seen, first/last
+    season and game count. Grouped once over (id, name) pairs, so there is
+    no per-player Python work.
+    """
+    d = df[["player_id", "player_name", "season"]].dropna(subset=["player_id"]).copy()
+    d["player_id"] = d["player_id"].astype(int)
+    d["season"] = d["season"].astype(str)
+    d["player_name"] = d["player_name"].astype("string").str.strip().replace("", pd.NA)
+
+    span = d.groupby("player_id").agg(
+        first_season=("season", "min"),
+        last_season=("season", "max"),
+        games=("season", "size"),
+    )
+
+    spellings = (
+        d.dropna(subset=["player_name"])
+         .groupby(["player_id", "player_name"], as_index=False)
+         .agg(n=("season", "size"), seen=("season", "max"))
+         .sort_values(["player_id", "n", "seen"], ascending=[True, False, False])
+    )
+    canonical = spellings.drop_duplicates("player_id").set_index("player_id")["player_name"]
+    aliases = spellings.groupby("player_id")["player_name"].agg(ALIAS_SEP.join)
+
+    dim = span.join(canonical).join(aliases.rename("aliases"))
+    dim["player_name"] = dim["player_name"].fillna("Unknown")
+    dim["aliases"] = dim["aliases"].fillna("")
+    return dim.reset_index()[DIM_COLUMNS]
+
+
+def load_player_dim(path: str = PLAYER_DIM_CSV, df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Read the materialized table, or build it from player-game rows if it is missing."""
+    if os.path.exists(path):
+        return pd.read_csv(path, dtype={"player_id": int, "aliases": str}, keep_default_na=False)
+    if df is None:
+        raise FileNotFoundError(f"❌ No player dimension at {path}. Run build_player_dim.py first.")
+    return build_player_dim(df)
+
+
+def attach_player_names(df: pd.DataFrame, dim: pd.DataFrame, after: str = "player_id") -> pd.DataFrame:
+    """Canonical player_name by integer id, placed right after the given column."""
+    names = dim.set_index("player_id")["player_name"]
+    df = df.drop(columns=["player_name"], errors="ignore")
+    df.insert(df.columns.get_loc(after) + 1, "player_name",
+              df["player_id"].astype(int).map(names).fillna("Unknown").values)
+    return df
+
+
+def write_player_dim(dim: pd.DataFrame, path: str = PLAYER_DIM_CSV):
+    tmp = path + ".tmp"
+    dim.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+# =====================================================
+# MAIN
+# =====================================================
+if __name__ == "__main__":
+    print("Loading:", MASTER_CSV)
+    df = pd.read_csv(MASTER_CSV, usecols=["player_id", "player_name", "season"])
+
+    dim = build_player_dim(df)
+    multi = (dim["aliases"].str.count(f"\\{ALIAS_SEP}") > 0).sum()
+    print(f"Players: {len(dim):,}   with more than one spelling: {multi:,}")
+
+    write_player_dim(dim)
+    print("Saved player dimension →", PLAYER_DIM_CSV)
@@ -1,34 +1,61 @@
-import pandas as pd
 import os
 import glob
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from upload_player_boxscores import PLAYER_BOX_COLUMNS, read_player_csv
 
 # ============================================
 # CONFIG
 # ============================================
-SEASON = "1996-97"
+# One-shot compaction of legacy player files down to the declared column
+# projection. Not needed for normal runs: every loader already reads only
+# PLAYER_BOX_COLUMNS, so extra columns are simply never parsed. Run this
+# once to shrink old files on disk.
+SEASONS = None   # e.g. ["1996-97"]; None = every season folder
 BASE_DIR = r"C:\Users\gngim\Desktop\Darko\historical_scraper"
-SEASON_FOLDER = os.path.join(BASE_DIR, SEASON)
-
-PLAYER_PATTERN = os.path.join(SEASON_FOLDER, f"player_boxscore_{SEASON}_*.csv")
+WORKERS = os.cpu_count()
 
-# Column AD = 30th column = zero-index 29
-CUT_INDEX = 29   # delete all columns from here onward
 
 # ============================================
-# PROCESS FILES
+# HELPERS
 # ============================================
-files = glob.glob(PLAYER_PATTERN)
-print(f"Found {len(files)} player files.")
-
-for file in files:
-    print("Cleaning:", os.path.basename(file))
+def compact_file(path: str) -> bool:
+    """
+    Rewrite one file with only the declared columns. Files already in shape
+    are left untouched; rewrites go through a temp file so a crash never
+    leaves a half-written game. Returns True if the file was rewritten.
+    """
+    header = list(pd.read_csv(path, nrows=0).columns)
+    if header == [c for c in PLAYER_BOX_COLUMNS if c in header]:
+        return False
+
+    tmp = path + ".tmp"
+    df = read_player_csv(path)
+    df[[c for c in PLAYER_BOX_COLUMNS if c in df.columns]].to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return True
+
+
+def legacy_files() -> list:
+    seasons = SEASONS or [
+        d for d in os.listdir(BASE_DIR) if os.path.isdir(os.path.join(BASE_DIR, d))
+    ]
+    files = []
+    for season in seasons:
+        files.extend(glob.glob(os.path.join(BASE_DIR, season, f"player_boxscore_{season}_*.csv")))
+    return sorted(files)
 
-    df = pd.read_csv(file)
 
-    # Keep only columns up to AC (index 0–28)
-    df_clean = df.iloc[:, :CUT_INDEX]
+# ============================================
+# PROCESS FILES
+# ============================================
+if __name__ == "__main__":
+    files = legacy_files()
+    print(f"Found {len(files)} player files.")
 
-    # Overwrite original file
-    df_clean.to_csv(file, index=False)
+    with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+        rewritten = sum(pool.map(compact_file, files, chunksize=64))
 
-print("Done cleaning all player files.")
+    print(f"Done: compacted {rewritten} files, {len(files) - rewritten} already clean.")
@@ -2,6 +2,8 @@ import pandas as pd
 import os
 import glob
 
+from upload_player_boxscores import read_player_csv
+
 # =====================================================
 # CONFIG
 # =====================================================
@@ -13,51 +15,65 @@ PLAYER_PATTERN = os.path.join(SEASON_FOLDER, f"player_boxscore_{SEASON}_*.csv")
 TEAM_FILE      = os.path.join(BASE_DIR, "team_boxscores", f"boxscores_{SEASON}.csv")
 OUTPUT_FILE    = os.path.join(SEASON_FOLDER, f"merged_player_team_{SEASON}.csv")
 
+
 # =====================================================
-# LOAD TEAM DATA
+# HELPERS
 # =====================================================
-df_team = pd.read_csv(TEAM_FILE)
+def normalize_keys(df: pd.DataFrame) -> pd.DataFrame:
+    # Normalize join keys
+    df = df.rename(columns={"TEAM_ID": "team_id", "GAME_ID": "game_id"})
 
-# Normalize join keys
-df_team.rename(columns={"TEAM_ID": "team_id", "GAME_ID": "game_id"}, inplace=True)
+    # Lowercase for consistency
+    df.columns = [c.lower() for c in df.columns]
 
-# Lowercase for consistency
-df_team.columns = [c.lower() for c in df_team.columns]
+    # CSV reads give integer game ids; API frames give "00296..." strings
+    df["game_id"] = pd.to_numeric(df["game_id"], errors="coerce")
+    df["team_id"] = pd.to_numeric(df["team_id"], errors="coerce")
+    return df
 
-# Add "_team" suffix to all team columns EXCEPT join keys
-team_cols_rename = {
-    c: f"{c}_team" 
-    for c in df_team.columns 
-    if c not in ["team_id", "game_id"]
-}
-df_team.rename(columns=team_cols_rename, inplace=True)
 
-# =====================================================
-# MERGE EACH PLAYER FILE
-# =====================================================
-player_files = glob.glob(PLAYER_PATTERN)
-merged_frames = []
-
-print(f"Found {len(player_files)} player files to merge.")
+def prepare_team_frame(df_team: pd.DataFrame) -> pd.DataFrame:
+    df_team = normalize_keys(df_team)
 
-for file in player_files:
-    print("Merging:", os.path.basename(file))
+    # Add "_team" suffix to all team columns EXCEPT join keys
+    team_cols_rename = {
+        c: f"{c}_team"
+        for c in df_team.columns
+        if c not in ["team_id", "game_id"]
+    }
+    return df_team.rename(columns=team_cols_rename)
 
-    df_p = pd.read_csv(file)
 
-    # Normalize join keys
-    df_p.rename(columns={"TEAM_ID": "team_id", "GAME_ID": "game_id"}, inplace=True)
-    df_p.columns = [c.lower() for c in df_p.columns]
+def merge_player_team(df_p: pd.DataFrame, df_team: pd.DataFrame) -> pd.DataFrame:
+    """
+    Perfect merge: all player cols + all team cols. df_team must already be
+    prepared with prepare_team_frame.
+    """
+    df_p = normalize_keys(df_p)
+    return df_p.merge(df_team, on=["game_id", "team_id"], how="left")
 
-    # Perfect merge: all player cols + all team cols
-    df_m = df_p.merge(df_team, on=["game_id", "team_id"], how="left")
-
-    merged_frames.append(df_m)
 
 # =====================================================
-# FINAL CONCAT + SAVE
+# MAIN
 # =====================================================
-df_final = pd.concat(merged_frames, ignore_index=True)
+if __name__ == "__main__":
+    df_team = prepare_team_frame(pd.read_csv(TEAM_FILE))
+
+    # Deterministic order, nightly refresh files last so their rows win the
+    # dedup below (timestamped names sort chronologically)
+    player_files = sorted(glob.glob(PLAYER_PATTERN), key=lambda f: ("_refresh" in os.path.basename(f), f))
+    merged_frames = []
+
+    print(f"Found {len(player_files)} player files to merge.")
+
+    for file in player_files:
+        print("Merging:", os.path.basename(file))
+        merged_frames.append(merge_player_team(read_player_csv(file), df_team))
+
+    df_final = pd.concat(merged_frames, ignore_index=True)
+
+    # A bulk season file (scrape_season_logs.py) can overlap older per-game files
+    df_final = df_final.drop_duplicates(subset=["game_id", "player_id"], keep="last")
 
-df_final.to_csv(OUTPUT_FILE, index=False)
-print("Saved merged dataset →", OUTPUT_FILE)
+    df_final.to_csv(OUTPUT_FILE, index=False)
+    print("Saved merged dataset →", OUTPUT_FILE)
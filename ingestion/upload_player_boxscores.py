@@ -1,57 +1,196 @@
 import polars as pl
+import pandas as pd
 import glob
 import os
+import re
 
 # -------------------------------------
 # CONFIG
 # -------------------------------------
 
-# Path to your local scraper output
-LOCAL_DATA_PATH = "../historical_scraper/player_boxscore_*.csv"
+# Path to your local scraper output (per-game files, plus the per-season
+# folders written by scrape_season_logs.py / scrape_job_queue.py)
+LOCAL_DATA_PATHS = [
+    "../historical_scraper/player_boxscore_*.csv",
+    "../historical_scraper/*/player_boxscore_*.csv",
+]
 
+# Partitioned Parquet dataset, one folder per season
+OUTPUT_DATASET = "../historical_scraper/player_boxscores_parquet"
 
-def load_player_boxscores() -> pl.DataFrame:
+# Pinned schema for every player box-score CSV (BoxScoreTraditionalV2 +
+# game metadata). Read as given, so no inference pass over the files.
+# MIN stays a string ("MM:SS") and is parsed by minutes_expr().
+PLAYER_BOX_SCHEMA = {
+    "GAME_ID": pl.String,
+    "TEAM_ID": pl.Int64,
+    "TEAM_ABBREVIATION": pl.String,
+    "TEAM_CITY": pl.String,
+    "PLAYER_ID": pl.Int64,
+    "PLAYER_NAME": pl.String,
+    "NICKNAME": pl.String,
+    "START_POSITION": pl.String,
+    "COMMENT": pl.String,
+    "MIN": pl.String,
+    "FGM": pl.Float64,
+    "FGA": pl.Float64,
+    "FG_PCT": pl.Float64,
+    "FG3M": pl.Float64,
+    "FG3A": pl.Float64,
+    "FG3_PCT": pl.Float64,
+    "FTM": pl.Float64,
+    "FTA": pl.Float64,
+    "FT_PCT": pl.Float64,
+    "OREB": pl.Float64,
+    "DREB": pl.Float64,
+    "REB": pl.Float64,
+    "AST": pl.Float64,
+    "STL": pl.Float64,
+    "BLK": pl.Float64,
+    "TO": pl.Float64,
+    "PF": pl.Float64,
+    "PTS": pl.Float64,
+    "PLUS_MINUS": pl.Float64,
+    "GAME_DATE": pl.String,
+    "MATCHUP": pl.String,
+    "WL": pl.String,
+}
+
+
+# Declared projection: the only columns any loader parses. Anything else a
+# legacy file carries (duplicate merge columns etc.) is never read.
+PLAYER_BOX_COLUMNS = list(PLAYER_BOX_SCHEMA)
+
+
+# -------------------------------------
+# EXPRESSIONS
+# -------------------------------------
+
+def minutes_expr(col: str = "MIN") -> pl.Expr:
     """
-    Loads ALL player-level box score CSVs from local disk
-    and returns a unified Polars DataFrame.
+    Minutes as a float, vectorized version of parse_minutes_col:
+    "MM:SS" / "MM:SS:00" / plain numbers → minutes; DNP / empty → 0.0.
     """
-    print(f"📁 Looking for files: {LOCAL_DATA_PATH}")
+    parts = pl.col(col).str.strip_chars().str.split(":")
+    mins = parts.list.get(0, null_on_oob=True).cast(pl.Float64, strict=False)
+    secs = parts.list.get(1, null_on_oob=True).cast(pl.Float64, strict=False).fill_null(0.0)
+    return (mins + secs / 60.0).fill_null(0.0)
+
 
-    files = glob.glob(LOCAL_DATA_PATH)
+def season_expr(col: str = "GAME_ID") -> pl.Expr:
+    """Season string ("1996-97") from the two-digit year in the NBA game id."""
+    yy = pl.col(col).str.slice(3, 2).cast(pl.Int32, strict=False)
+    year = pl.when(yy >= 46).then(1900 + yy).otherwise(2000 + yy)
+    return pl.format("{}-{}", year, ((year + 1) % 100).cast(pl.String).str.zfill(2))
+
+
+# -------------------------------------
+# LOADING
+# -------------------------------------
+
+# Per-game files carry their game id in the name: player_boxscore_{season}_{game_id}.csv
+PER_GAME_FILE = re.compile(r"_(\d{8,10})\.csv$")
+
+
+def find_files() -> list:
+    # Deterministic order, lowest priority first: per-game files, then season
+    # files, then nightly refresh files (see resolve_overlaps)
+    files = sorted(set(f for pattern in LOCAL_DATA_PATHS for f in glob.glob(pattern)),
+                   key=lambda f: ("_refresh" in os.path.basename(f), f))
+    print(f"📁 Looking for files: {LOCAL_DATA_PATHS}")
     print(f"📄 Found {len(files):,} game files.")
 
     if not files:
         raise FileNotFoundError("❌ No player boxscore CSVs found. Run scraper first.")
+    return files
+
+
+def file_game_ids(path: str) -> set:
+    """GAME_IDs in one player CSV: from the name for per-game files, else a one-column scan."""
+    m = PER_GAME_FILE.search(os.path.basename(path))
+    if m:
+        return {m.group(1).zfill(10)}
+    ids = (pl.scan_csv(path, schema_overrides={"GAME_ID": pl.String}, infer_schema=False)
+             .select(pl.col("GAME_ID").str.zfill(10)).unique().collect())
+    return set(ids["GAME_ID"].to_list())
+
+
+def resolve_overlaps(files: list) -> list:
+    """
+    Bulk season files and per-game / refresh files overlap. Each game is
+    read from one file only: the latest in find_files() order that has it.
+    Returns (path, game ids to skip) pairs; per-game files that a later
+    file covers are dropped whole, so the streamed scan needs no global
+    dedup (which would buffer the full history).
+    """
+    covered, keep = set(), []
+    for path in reversed(files):
+        ids = file_game_ids(path)
+        skip = ids & covered
+        if skip == ids:
+            continue
+        keep.append((path, skip))
+        covered |= ids
+    return keep[::-1]
+
 
-    # Polars lazy scan = massively faster
-    df = (
-        pl.scan_csv(files)
+def _scan_csvs(files: list) -> pl.LazyFrame:
+    return (
+        pl.scan_csv(
+            files,
+            schema_overrides=PLAYER_BOX_SCHEMA,
+            infer_schema=False,          # unknown extra columns come through as strings
+            missing_columns="insert",    # older files without GAME_DATE/MATCHUP/WL
+            extra_columns="ignore",
+        )
+        .select(PLAYER_BOX_COLUMNS)
         .with_columns([
             # Core normalization
+            pl.col("GAME_ID").str.zfill(10),
             pl.col("GAME_DATE").str.to_date(strict=False).alias("game_date"),
             pl.col("PLAYER_NAME").str.to_uppercase().alias("player_name"),
             pl.col("TEAM_ABBREVIATION").str.to_uppercase().alias("team"),
             pl.col("START_POSITION").fill_null("BENCH").alias("start_pos"),
 
             # Numeric conversions
-            pl.col("MIN").cast(pl.Float64).alias("minutes"),
-            pl.col("PTS").cast(pl.Int64),
-            pl.col("REB").cast(pl.Int64),
-            pl.col("AST").cast(pl.Int64),
-            pl.col("STL").cast(pl.Int64),
-            pl.col("BLK").cast(pl.Int64),
-            pl.col("TOV").cast(pl.Int64),
-            pl.col("PF").cast(pl.Int64),
-            pl.col("PLUS_MINUS").cast(pl.Int64),
-
-            # Game metadata
-            pl.col("PLAYER_ID").cast(pl.Int64),
-            pl.col("TEAM_ID").cast(pl.Int64),
-            pl.col("GAME_ID"),
+            minutes_expr("MIN").alias("minutes"),
         ])
-        .collect()
+        .with_columns(season_expr("GAME_ID").alias("season"))
     )
 
+
+def scan_player_boxscores(files=None) -> pl.LazyFrame:
+    """
+    Lazy, schema-pinned scan of every player box-score CSV. Polars reads the
+    files in parallel; nothing is materialized until the plan is collected
+    or sunk. Overlapping files are resolved per game up front
+    (resolve_overlaps), so the plan stays a streaming scan and filter.
+    """
+    files = files if files is not None else find_files()
+
+    plain, frames = [], []
+    for path, skip in resolve_overlaps(files):
+        if skip:
+            frames.append(_scan_csvs([path]).filter(~pl.col("GAME_ID").is_in(sorted(skip))))
+        else:
+            plain.append(path)
+    if plain:
+        frames.insert(0, _scan_csvs(plain))
+    return pl.concat(frames)
+
+
+def read_player_csv(path: str) -> pd.DataFrame:
+    """One per-game / per-season player CSV, parsing only the declared columns."""
+    return pd.read_csv(path, usecols=lambda c: c in PLAYER_BOX_SCHEMA)
+
+
+def load_player_boxscores() -> pl.DataFrame:
+    """
+    Loads ALL player-level box score CSVs from local disk
+    and returns a unified Polars DataFrame.
+    """
+    df = scan_player_boxscores().collect(engine="streaming")
+
     print("====================================")
     print(f"✅ Loaded rows: {df.shape[0]:,}")
     print(f"🧍 Unique players: {df['PLAYER_ID'].n_unique()}")
@@ -62,6 +201,20 @@ def load_player_boxscores() -> pl.DataFrame:
     return df
 
 
+def write_player_dataset(output_dir: str = OUTPUT_DATASET, files=None):
+    """
+    Stream every CSV into a season-partitioned Parquet dataset without
+    holding the full history in memory.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    scan_player_boxscores(files).sink_parquet(
+        pl.PartitionBy(output_dir, key="season"),
+        mkdir=True,
+        engine="streaming",
+    )
+    print(f"💾 Wrote partitioned dataset → {output_dir}")
+
+
 if __name__ == "__main__":
-    df = load_player_boxscores()
-    print(df.head(20))
+    write_player_dataset()
+    print(pl.scan_parquet(OUTPUT_DATASET, hive_partitioning=True).head(20).collect())
@@ -1,30 +1,55 @@
+import os
+import sys
 import polars as pl
 
+# Shared S3 helpers live with the scrapers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "historical_scraper"))
+from s3_storage import sync_prefix
+
 # -------------------------------------
 # CONFIG
 # -------------------------------------
 
 S3_BUCKET = "greg-darko-data"
-S3_PATH = "historical/boxscores/*.csv"
+S3_PREFIX = "historical/boxscores/"
+
+# Local mirror of the prefix; only new or changed objects are downloaded
+LOCAL_CACHE = r"C:\Users\gngim\Desktop\Darko\historical_scraper\s3_cache\boxscores"
+
+FULL_S3_URI = f"s3://{S3_BUCKET}/{S3_PREFIX}"
 
-FULL_S3_URI = f"s3://{S3_BUCKET}/{S3_PATH}"
+
+def one_file_per_season(paths: list) -> list:
+    """
+    Seasons uploaded before gzip exist as boxscores_{season}.csv, re-uploads
+    as boxscores_{season}.csv.gz; keep one file per season, preferring .gz.
+    """
+    best = {}
+    for p in paths:
+        stem = p[:-len(".gz")] if p.endswith(".gz") else p
+        if stem not in best or p.endswith(".gz"):
+            best[stem] = p
+    return sorted(best.values())
 
 
 def load_all_boxscores() -> pl.DataFrame:
     """
-    Loads all boxscore CSV files from S3 and returns a combined Polars DataFrame.
+    Loads all boxscore CSV files (plain or gzipped) from S3 and returns a
+    combined Polars DataFrame (one file per season).
     """
 
     print(f"📡 Reading boxscore files from: {FULL_S3_URI}")
+    synced = sync_prefix(S3_BUCKET, S3_PREFIX, LOCAL_CACHE)
 
-    # Lazy scanning = memory efficient & fast
+    # Only what the bucket holds now, not whatever else sits in the cache
+    paths = one_file_per_season([p for p in synced if p.endswith((".csv", ".csv.gz"))])
+    # read_csv decompresses .gz transparently; scan_csv does not
     df = (
-        pl.scan_csv(FULL_S3_URI)
+        pl.concat([pl.read_csv(p, infer_schema_length=None) for p in paths], how="diagonal_relaxed")
         .with_columns([
             pl.col("GAME_DATE").str.to_date(strict=False).alias("game_date"),
             pl.col("PLAYER_NAME").str.to_uppercase().alias("player_name"),
         ])
-        .collect()
     )
 
     print(f"✅ Loaded {df.shape[0]:,} rows across {df['SEASON_ID'].n_unique()} seasons.")
@@ -0,0 +1,325 @@
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+# Stage scripts live in sibling folders; make them importable
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ["historical_scraper", "ingestion", "features", os.path.join("features", "darkolite")]:
+    sys.path.insert(0, os.path.join(REPO_DIR, sub))
+
+from scrape_player_boxscores import make_season_str
+from scrape_season_logs import (
+    fetch_season_log, fetch_missing_games, normalize_game_keys, normalize_player_log,
+)
+from scrape_schedule import write_schedule
+from merge_team_data_into_player_data import prepare_team_frame, merge_player_team
+from feature_eng_all_seasons import (
+    build_features, form_for_new_rows, add_opponent_adjusted, FORM_COUNTS, CONTEXT_COLS, OPPONENT_ADJUST,
+)
+from build_player_dim import build_player_dim, write_player_dim, PLAYER_DIM_CSV
+import darkolite_box_talent as box_talent
+import darkolite_rapm as rapm_stage
+import darkolite_final as final_stage
+import darkolite_season_sim as season_sim
+import darkolite_talent_store as talent_store
+from darkolite_baselines import build_league_baselines, write_league_baselines, BASELINES_CSV
+
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+SCRAPER_DIR = r"C:\Users\gngim\Desktop\Darko\historical_scraper"
+TEAM_DIR = os.path.join(SCRAPER_DIR, "team_boxscores")
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+BOX_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_box_player_season.csv"
+RAPM_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_rapm_player_season.csv"
+FINAL_CSV = r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_player_season_final.csv"
+APP_SNAPSHOT = os.path.join(REPO_DIR, "app", "data", "darkolite_player_season_final.csv")
+APP_PLAYER_DIM = os.path.join(REPO_DIR, "app", "data", "player_dim.csv")
+
+POLL_MINUTES = 15   # daemon mode: how often to look for newly completed games
+SIMULATE_SEASON = True   # rerun the season simulator on the fresh ratings
+
+
+# ---------------------------------------------------
+# HELPERS
+# ---------------------------------------------------
+def current_season(today: datetime | None = None) -> str:
+    today = today or datetime.now()
+    return make_season_str(today.year if today.month >= 8 else today.year - 1)
+
+
+def append_csv(df: pd.DataFrame, path: str, keys=("game_id", "player_id")):
+    """
+    Append rows under an existing header (column order taken from the file),
+    first dropping any existing rows with the same keys so a rerun of the
+    same games replaces them instead of duplicating them. Written atomically.
+    """
+    if not os.path.exists(path):
+        atomic_write_csv(df, path)
+        return
+    old = pd.read_csv(path, low_memory=False)
+    key_of = lambda d: pd.MultiIndex.from_arrays([pd.to_numeric(d[k], errors="coerce") for k in keys])
+    old = old[~key_of(old).isin(key_of(df))]
+    atomic_write_csv(pd.concat([old, df.reindex(columns=old.columns)], ignore_index=True), path)
+
+
+def atomic_write_csv(df: pd.DataFrame, path: str):
+    """Write next to the target then swap it in, so readers never see a partial file."""
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def replace_season_rows(path: str, new_rows: pd.DataFrame, season: str, keys=None) -> pd.DataFrame:
+    """
+    Swap one season's rows (or only the given key rows of it) in a
+    player-season file and return the full updated table.
+    """
+    old = pd.read_csv(path) if os.path.exists(path) else new_rows.iloc[0:0]
+    old["season"] = old["season"].astype(str)
+
+    drop = old["season"] == season
+    if keys is not None:
+        drop &= old["player_id"].isin(keys)
+    return pd.concat([old[~drop], new_rows], ignore_index=True)
+
+
+def refresh_talent_store(season: str, master: pd.DataFrame, affected) -> pd.DataFrame | None:
+    """
+    Rebuild the affected players' current-season rows of the as-of talent
+    store and swap them in. The store is causal, so no earlier row can
+    change. Returns the full store (None if it was never built).
+    """
+    if not os.path.exists(talent_store.TALENT_STORE):
+        logging.warning(f"⚠️ No talent store at {talent_store.TALENT_STORE}; "
+                        f"build it once with darkolite_talent_store.py.")
+        return None
+    old = pd.read_parquet(talent_store.TALENT_STORE)
+    new = talent_store.build_talent_store(master, affected, [season])
+    drop = (old["season"].astype(str) == season) & old["player_id"].isin(affected)
+    store = pd.concat([old[~drop], new], ignore_index=True)
+    store = store.sort_values(["player_id", "game_date"]).reset_index(drop=True)
+    talent_store.write_talent_store(store, talent_store.TALENT_STORE)
+    return store
+
+
+# ---------------------------------------------------
+# STAGES
+# ---------------------------------------------------
+def discover_new_games(season: str):
+    """
+    One team-log call; games whose both team rows are new relative to the
+    local team file are the newly completed ones.
+    """
+    team_log = fetch_season_log(season, "T")
+    if team_log.empty:
+        return team_log, []
+
+    team_log = normalize_game_keys(team_log)
+    path = os.path.join(TEAM_DIR, f"boxscores_{season}.csv")
+    known = set()
+    if os.path.exists(path):
+        known = set(pd.read_csv(path, dtype={"GAME_ID": str})["GAME_ID"].str.zfill(10))
+
+    complete = team_log.groupby("GAME_ID")["TEAM_ID"].transform("size") == 2
+    new_ids = sorted(set(team_log.loc[complete, "GAME_ID"]) - known)
+    return team_log, new_ids
+
+
+def scrape_new_games(season: str, team_log: pd.DataFrame, new_ids) -> pd.DataFrame:
+    """Player rows for the new games: season log first, box scores for gaps."""
+    player_log = fetch_season_log(season, "P")
+    players = normalize_player_log(player_log) if not player_log.empty else pd.DataFrame()
+    players = players[players["GAME_ID"].isin(new_ids)] if not players.empty else players
+
+    have = set(players["GAME_ID"]) if not players.empty else set()
+    missing = [gid for gid in new_ids if gid not in have]
+    if missing:
+        players = pd.concat([players, fetch_missing_games(missing, team_log)], ignore_index=True)
+    return players
+
+
+def persist_players(season: str, players: pd.DataFrame):
+    """Raw player rows for the new games (the merge step dedupes reruns)."""
+    season_dir = os.path.join(SCRAPER_DIR, season)
+    os.makedirs(season_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    players.to_csv(os.path.join(season_dir, f"player_boxscore_{season}_refresh{stamp}.csv"), index=False)
+
+
+def commit_team_log(season: str, team_log: pd.DataFrame, ingested):
+    """
+    The local team log is the "already ingested" set discover_new_games
+    checks against, so it is written last, once everything downstream has
+    been swapped in, and only with the games that actually got player rows.
+    A refresh that fails earlier leaves it untouched and the next run picks
+    the same games up again.
+    """
+    path = os.path.join(TEAM_DIR, f"boxscores_{season}.csv")
+    known = set()
+    if os.path.exists(path):
+        known = set(pd.read_csv(path, dtype={"GAME_ID": str})["GAME_ID"].str.zfill(10))
+    os.makedirs(TEAM_DIR, exist_ok=True)
+    atomic_write_csv(team_log[team_log["GAME_ID"].isin(known | set(ingested))], path)
+
+
+def build_new_features(season: str, team_log: pd.DataFrame, players: pd.DataFrame) -> pd.DataFrame:
+    """Merge + feature-engineer only the new player-game rows."""
+    df_team = prepare_team_frame(team_log)
+    merged = merge_player_team(players, df_team)
+
+    season_dir = os.path.join(SCRAPER_DIR, season)
+    append_csv(merged, os.path.join(season_dir, f"merged_player_team_{season}.csv"))
+
+    feats = build_features(merged)
+    feats["season"] = season
+
+    # Form windows reach back into earlier games of the same players;
+    # opponent context needs every earlier team-game of this season
+    inputs = {"player_id", "game_id", "game_date_team", "player_possessions", "minutes", *FORM_COUNTS, *CONTEXT_COLS}
+    history = (pd.read_csv(MASTER_CSV, usecols=lambda c: c in inputs, low_memory=False)
+               if os.path.exists(MASTER_CSV) else feats.iloc[0:0])
+
+    if OPPONENT_ADJUST:
+        same_season = history[history["season"].astype(str) == season] if "season" in history.columns else history
+        done = same_season["game_id"].astype(str).isin(feats["game_id"].astype(str))
+        feats = add_opponent_adjusted(feats, same_season[~done])
+    append_csv(feats, os.path.join(season_dir, f"darko_features_{season}.csv"))
+
+    feats = form_for_new_rows(history, feats)
+    append_csv(feats, MASTER_CSV)
+    return feats
+
+
+def refresh_models(season: str, new_feats: pd.DataFrame) -> tuple:
+    """
+    Talent only for players who just played (their full careers, since the
+    EWMA runs across seasons), RAPM only for the current season, then blend
+    the current season and keep every other season's final rows as they are.
+    The same players' rows of the as-of talent store are rebuilt last.
+    Returns the full final table, the rebuilt player dimension and the
+    talent store (None if there is none yet).
+    """
+    master = pd.read_csv(MASTER_CSV, low_memory=False)
+    master["season"] = master["season"].astype(str)
+    master["player_id"] = master["player_id"].astype(int)
+
+    # New games can bring new players or spellings
+    player_dim = build_player_dim(master)
+    write_player_dim(player_dim, PLAYER_DIM_CSV)
+
+    # League baselines from the full master (careers below are a subset)
+    baselines = build_league_baselines(master)
+    write_league_baselines(baselines, BASELINES_CSV)
+
+    # Kalman scales from the full master too, so the affected players are
+    # filtered exactly as a full rebuild would filter them
+    scales = None
+    if box_talent.TALENT_ENGINE == "kalman":
+        scales = box_talent.fit_kalman_scales(master, baselines)
+        box_talent.write_kalman_scales(scales)
+
+    # Box talent for affected players
+    affected = set(new_feats["player_id"].astype(int))
+    careers = master[master["player_id"].isin(affected)].copy()
+    box_new = box_talent.build_box_talent(careers, player_dim, baselines, scales)
+    box_new = box_new[box_new["season"] == season]
+
+    box_all = replace_season_rows(BOX_CSV, box_new, season, keys=affected)
+    cur = box_all["season"] == season
+    cur_z = box_talent.z_score(box_all[cur].copy(), "darkolite_box_total", "season", "darkolite_box_z")
+    box_all.loc[cur, "darkolite_box_z"] = cur_z["darkolite_box_z"]
+    atomic_write_csv(box_all, BOX_CSV)
+
+    # RAPM for the current season (prior mode also needs last season's fit)
+    seasons = sorted(master["season"].unique())
+    needed = seasons[max(0, seasons.index(season) - 1):] if rapm_stage.RAPM_MODE == "prior" else [season]
+    rapm_in = rapm_stage.prepare_master(master[master["season"].isin(needed)].copy())
+    rapm_new = rapm_stage.compute_rapm_by_season(rapm_in, box_seasons=box_all, emit_seasons={season},
+                                                 player_dim=player_dim)
+    rapm_all = replace_season_rows(RAPM_CSV, rapm_new, season)
+    atomic_write_csv(rapm_all, RAPM_CSV)
+
+    # Blend is within-season, so only the current season changes
+    final_new = final_stage.blend_darkolite(
+        box_all[box_all["season"] == season].copy(), rapm_new.copy()
+    )
+    final_all = replace_season_rows(FINAL_CSV, final_new, season)
+    final_all = final_all.sort_values(["season", "darkolite_dpm"], ascending=[True, False])
+    atomic_write_csv(final_all, FINAL_CSV)
+
+    store = refresh_talent_store(season, master, affected)
+    return final_all, player_dim, store
+
+
+def refresh_once(season: str | None = None) -> int:
+    season = season or current_season()
+    t0 = time.time()
+    logging.info(f"🔄 Refresh check for {season}")
+
+    team_log, new_ids = discover_new_games(season)
+    if not new_ids:
+        logging.info("✔ No newly completed games.")
+        return 0
+
+    logging.info(f"🆕 {len(new_ids)} new games: {', '.join(new_ids[:10])}{' ...' if len(new_ids) > 10 else ''}")
+    players = scrape_new_games(season, team_log, new_ids)
+    if players.empty:
+        logging.warning("⚠️ No player rows for the new games; will retry next run.")
+        return 0
+    persist_players(season, players)
+
+    new_feats = build_new_features(season, team_log, players)
+    final_all, player_dim, store = refresh_models(season, new_feats)
+
+    # The app reads these files; swap each in with one rename
+    write_player_dim(player_dim, APP_PLAYER_DIM)
+    atomic_write_csv(final_all, APP_SNAPSHOT)
+    if store is not None:
+        talent_store.write_talent_store(store, talent_store.APP_TALENT_STORE)
+
+    # Only now are the games marked as ingested
+    ingested = set(players["GAME_ID"]) & set(new_ids)
+    commit_team_log(season, team_log, ingested)
+
+    # The ratings are already live; a failed simulation must not fail the refresh
+    if SIMULATE_SEASON and not os.path.exists(season_sim.schedule_path(season)):
+        write_schedule(season, os.path.dirname(season_sim.schedule_path(season)))
+    if SIMULATE_SEASON and not os.path.exists(season_sim.schedule_path(season)):
+        logging.warning(f"⚠️ No schedule at {season_sim.schedule_path(season)}; skipping the season simulation.")
+    elif SIMULATE_SEASON:
+        t_sim = time.time()
+        try:
+            season_sim.run_simulation(season, final_all)
+            logging.info(f"🎲 {season_sim.N_SIMS:,} season sims in {time.time() - t_sim:.1f}s → {season_sim.OUTPUT_ODDS}")
+        except Exception as e:
+            logging.exception(f"❌ Season simulation failed: {e}")
+    logging.info(f"🏁 Refreshed {len(new_ids)} games in {time.time() - t0:.1f}s → {APP_SNAPSHOT}")
+    return len(new_ids)
+
+
+# ---------------------------------------------------
+# MAIN
+# ---------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental DARKO-Lite refresh")
+    parser.add_argument("--once", action="store_true", help="single check (for cron) instead of a daemon loop")
+    parser.add_argument("--season", default=None, help="override the current season, e.g. 2025-26")
+    args = parser.parse_args()
+
+    if args.once:
+        refresh_once(args.season)
+    else:
+        logging.info(f"🚀 Refresh daemon started (every {POLL_MINUTES} min)")
+        while True:
+            try:
+                refresh_once(args.season)
+            except Exception as e:
+                logging.exception(f"❌ Refresh failed: {e}")
+            time.sleep(POLL_MINUTES * 60)
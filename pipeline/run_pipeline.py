@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import glob
+import logging
+import argparse
+
+import pandas as pd
+
+# Stage scripts live in sibling folders; make them importable
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ["ingestion", "features", os.path.join("features", "darkolite")]:
+    sys.path.insert(0, os.path.join(REPO_DIR, sub))
+
+from feature_eng_all_seasons import build_features, add_form_features, add_opponent_adjusted, OPPONENT_ADJUST
+from build_player_dim import build_player_dim
+import darkolite_box_talent as box_talent
+import darkolite_rapm as rapm_stage
+import darkolite_final as final_stage
+from darkolite_baselines import build_league_baselines
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+SEASONS_DIR = r"C:\Users\gngim\Desktop\Darko\historical_scraper\all_seasons"
+MASTER_CSV = r"C:\Users\gngim\Desktop\Darko\features\features_all_seasons_combined\all_darkoish_features_master.csv"
+
+# Optional persistence: stage name → path (.csv or .parquet). Stages not
+# listed are never written; nothing downstream reads these files back.
+SINKS = {
+    "final": r"C:\Users\gngim\Desktop\Darko\features\darkolite\darkolite_player_season_final.csv",
+    "app": os.path.join(REPO_DIR, "app", "data", "darkolite_player_season_final.csv"),
+}
+
+STAGES = ["master", "player_dim", "baselines", "box", "rapm", "final"]
+
+
+# ---------------------------------------------------
+# SOURCES / SINKS
+# ---------------------------------------------------
+def load_merged_seasons(seasons_dir: str = SEASONS_DIR) -> dict:
+    """season → merged player-team frame, as written by the merge step."""
+    merged = {}
+    for path in sorted(glob.glob(os.path.join(seasons_dir, "*", "merged_player_team_*.csv"))):
+        season = os.path.basename(os.path.dirname(path))
+        merged[season] = pd.read_csv(path)
+    return merged
+
+
+def write_sink(df: pd.DataFrame, path: str):
+    """Persist a stage output (written next to the target, then swapped in)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    if path.endswith(".parquet"):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    logging.info(f"💾 {len(df):,} rows → {path}")
+
+
+# ---------------------------------------------------
+# STAGES
+# ---------------------------------------------------
+def build_master(merged: dict) -> pd.DataFrame:
+    """Merged season frames → one master feature frame (features stage)."""
+    frames = []
+    for season, raw in merged.items():
+        feats = build_features(raw)
+        if OPPONENT_ADJUST:
+            feats = add_opponent_adjusted(feats)
+        feats["season"] = season
+        frames.append(feats)
+    return add_form_features(pd.concat(frames, ignore_index=True))
+
+
+def run_pipeline(merged: dict | None = None,
+                 master: pd.DataFrame | None = None,
+                 sinks: dict | None = None) -> dict:
+    """
+    features → talent → RAPM → blend in one process. Pass merged season
+    frames to run the features stage, or an already-built master frame to
+    start from talent. Every stage hands its frame straight to the next;
+    only the stages named in sinks are written. Returns every stage output.
+    """
+    if (merged is None) == (master is None):
+        raise ValueError("Pass exactly one of merged or master.")
+    sinks = sinks or {}
+    unknown = sorted(set(sinks) - set(STAGES + ["app"]))
+    if unknown:
+        raise ValueError(f"Unknown sink stage(s): {', '.join(unknown)}")
+    timings = {}
+    out = {}
+
+    t0 = time.time()
+    if master is None:
+        master = build_master(merged)
+    master["season"] = master["season"].astype(str)
+    master["player_id"] = master["player_id"].astype(int)
+    out["master"] = master
+    timings["features"] = time.time() - t0
+
+    t0 = time.time()
+    out["player_dim"] = build_player_dim(master)
+    timings["player_dim"] = time.time() - t0
+
+    t0 = time.time()
+    out["baselines"] = build_league_baselines(master)
+    timings["baselines"] = time.time() - t0
+
+    # RAPM reads a narrow projection, taken before the talent stage
+    # rewrites the box-score columns in place
+    rapm_in = master[[c for c in rapm_stage.RAPM_COLUMNS if c in master.columns]].copy()
+
+    t0 = time.time()
+    out["box"] = box_talent.build_box_talent(master, out["player_dim"], out["baselines"])
+    timings["box"] = time.time() - t0
+
+    t0 = time.time()
+    out["rapm"] = rapm_stage.compute_rapm_by_season(
+        rapm_stage.prepare_master(rapm_in), box_seasons=out["box"], player_dim=out["player_dim"]
+    )
+    timings["rapm"] = time.time() - t0
+
+    t0 = time.time()
+    out["final"] = final_stage.blend_darkolite(out["box"].copy(), out["rapm"].copy())
+    timings["final"] = time.time() - t0
+
+    for stage, path in sinks.items():
+        write_sink(out["final" if stage == "app" else stage], path)
+
+    logging.info("⏱ " + "  ".join(f"{k} {v:.1f}s" for k, v in timings.items()))
+    return out
+
+
+# ---------------------------------------------------
+# MAIN
+# ---------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory DARKO-Lite pipeline")
+    parser.add_argument("--from-master", action="store_true",
+                        help="start from MASTER_CSV instead of the merged season files")
+    parser.add_argument("--sink", action="append", default=None, metavar="STAGE=PATH",
+                        help=f"persist a stage ({', '.join(STAGES + ['app'])}); replaces the configured SINKS")
+    args = parser.parse_args()
+
+    sinks = SINKS
+    if args.sink is not None:
+        bad = [s for s in args.sink if "=" not in s]
+        if bad:
+            parser.error(f"--sink expects STAGE=PATH, got: {', '.join(bad)}")
+        sinks = dict(s.split("=", 1) for s in args.sink)
+        unknown = sorted(set(sinks) - set(STAGES + ["app"]))
+        if unknown:
+            parser.error(f"unknown sink stage(s): {', '.join(unknown)} "
+                         f"(choose from {', '.join(STAGES + ['app'])})")
+
+    if args.from_master:
+        run_pipeline(master=pd.read_csv(MASTER_CSV, low_memory=False), sinks=sinks)
+    else:
+        run_pipeline(merged=load_merged_seasons(), sinks=sinks)
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("polars")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "features"))
+import feature_eng_all_seasons as fe  # noqa: E402
+
+
+def raw_frame(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    """Merged player-team rows with the messy values the scrapers produce."""
+    rng = np.random.default_rng(seed)
+    mins = np.array(["12:30", "5:00:00", "DNP", "", None, "7", "0:00", "31:05", "NaN", "44:59"], dtype=object)
+    df = pd.DataFrame({
+        "game_id": np.repeat(np.arange(n // 10), 10) + 22100001,
+        "player_id": rng.integers(1, 60, n),
+        "min": mins[rng.integers(0, len(mins), n)],
+        "min_team": rng.choice(["240:00", "265:00", "240"], n),
+        "pts": rng.integers(0, 35, n).astype(str).astype(object),
+        "fga_team": rng.integers(70, 95, n).astype(float),
+        "fta_team": rng.integers(10, 35, n).astype(float),
+        "oreb_team": rng.integers(5, 15, n).astype(float),
+        "tov_team": rng.integers(8, 20, n).astype(float),
+        "matchup_team": rng.choice(["AAA vs. BBB", "AAA @ BBB"], n),
+        "wl_team": rng.choice(["W", "L", None], n),
+    })
+    for c in ["reb", "ast", "stl", "blk", "to", "fg3a", "fg3m", "fta", "fgm", "fga", "plus_minus"]:
+        df[c] = rng.integers(0, 12, n).astype(float)
+    df.loc[rng.random(n) < 0.2, "fga"] = 0.0          # zero FGA → NaN shooting rates
+    df.loc[rng.random(n) < 0.3, "to"] = 0.0           # zero TO → NaN ast_tov
+    df.loc[rng.random(n) < 0.05, "pts"] = "—"         # non-numeric points
+    df.loc[rng.random(n) < 0.05, "plus_minus"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_lazy_engine_matches_pandas(seed):
+    raw = raw_frame(seed=seed)
+    ref = fe.build_darkish_features(raw).reset_index(drop=True)
+    lazy = fe.build_darkish_features_lazy(raw)
+
+    assert len(ref) > 0
+    assert list(lazy.columns) == list(ref.columns)
+    pd.testing.assert_frame_equal(lazy, ref, check_dtype=True)
@@ -0,0 +1,104 @@
+import os
+import io
+import gzip
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# moto reads the minimum part size at import; small parts keep the test fast
+os.environ.setdefault("S3_UPLOAD_PART_MIN_SIZE", "256")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "historical_scraper"))
+import s3_storage  # noqa: E402
+
+BUCKET = "darkolite-test"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setattr(s3_storage, "PART_SIZE", 1024)
+    monkeypatch.setattr(s3_storage, "CSV_CHUNK_ROWS", 50)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def frame(n: int = 2000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "GAME_ID": [f"00{2100000 + i}" for i in range(n)],
+        "PTS": rng.integers(0, 40, n),
+        "MIN": rng.random(n).round(4),
+    })
+
+
+def test_upload_dataframe_multipart_gzip_roundtrip(s3):
+    df = frame(20_000)
+    assert s3_storage.upload_dataframe(df, BUCKET, "logs/box.csv.gz", s3=s3)
+
+    obj = s3.get_object(Bucket=BUCKET, Key="logs/box.csv.gz")
+    assert obj["ContentEncoding"] == "gzip"
+    assert int(obj["ETag"].strip('"').rsplit("-", 1)[1]) > 1   # really went up in several parts
+    back = pd.read_csv(io.BytesIO(gzip.decompress(obj["Body"].read())), dtype={"GAME_ID": str})
+    pd.testing.assert_frame_equal(back, df)
+
+    # Same content again is skipped on the stored hash
+    assert not s3_storage.upload_dataframe(df, BUCKET, "logs/box.csv.gz", s3=s3)
+
+
+def test_upload_file_uncompressed_single_part(s3, tmp_path):
+    path = tmp_path / "small.csv"
+    path.write_text("a,b\n1,2\n")
+    assert s3_storage.upload_file(str(path), BUCKET, "small.csv", compress=False, s3=s3)
+    body = s3.get_object(Bucket=BUCKET, Key="small.csv")["Body"].read()
+    assert body == b"a,b\n1,2\n"
+    assert not s3_storage.upload_file(str(path), BUCKET, "small.csv", compress=False, s3=s3)
+
+
+def test_sync_prefix_redownloads_same_size_change(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key="team/a.csv", Body=b"x,1\n")
+    s3.put_object(Bucket=BUCKET, Key="team/sub/b.csv", Body=b"y,2\n")
+
+    paths = s3_storage.sync_prefix(BUCKET, "team/", str(tmp_path), s3=s3)
+    assert sorted(os.path.relpath(p, tmp_path) for p in paths) == ["a.csv", os.path.join("sub", "b.csv")]
+    assert (tmp_path / "a.csv").read_bytes() == b"x,1\n"
+
+    # Same size, different content
+    s3.put_object(Bucket=BUCKET, Key="team/a.csv", Body=b"x,9\n")
+    s3_storage.sync_prefix(BUCKET, "team/", str(tmp_path), s3=s3)
+    assert (tmp_path / "a.csv").read_bytes() == b"x,9\n"
+
+
+def test_sync_prefix_skips_unchanged(s3, tmp_path, monkeypatch):
+    s3.put_object(Bucket=BUCKET, Key="team/a.csv", Body=b"x,1\n")
+    s3_storage.sync_prefix(BUCKET, "team/", str(tmp_path), s3=s3)
+
+    calls = []
+    real = s3.download_file
+    monkeypatch.setattr(s3, "download_file", lambda *a, **k: calls.append(a) or real(*a, **k))
+    s3_storage.sync_prefix(BUCKET, "team/", str(tmp_path), s3=s3)
+    assert calls == []
+
+
+def test_sync_prefix_removes_deleted_objects(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key="team/boxscores_2021-22.csv", Body=b"x,1\n")
+    s3.put_object(Bucket=BUCKET, Key="team/boxscores_2021-22.csv.gz", Body=gzip.compress(b"x,1\n"))
+    s3_storage.sync_prefix(BUCKET, "team/", str(tmp_path), s3=s3)
+    (tmp_path / "untracked.csv").write_text("kept\n")
+
+    s3.delete_object(Bucket=BUCKET, Key="team/boxscores_2021-22.csv")
+    paths = s3_storage.sync_prefix(BUCKET, "team/", str(tmp_path), s3=s3)
+
+    assert [os.path.basename(p) for p in paths] == ["boxscores_2021-22.csv.gz"]
+    assert not (tmp_path / "boxscores_2021-22.csv").exists()
+    assert (tmp_path / "untracked.csv").exists()
+    assert set(s3_storage.load_sync_manifest(str(tmp_path))) == {"boxscores_2021-22.csv.gz"}
@@ -0,0 +1,126 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("polars")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "features"))
+import feature_eng_all_seasons as fe  # noqa: E402
+
+TEAMS = [1610612737 + i for i in range(6)]
+
+
+def schedule(seed: int = 0) -> pd.DataFrame:
+    """
+    Player rows for two short seasons: several games per date (so same-day
+    leakage would show), an opening date, and one game with a single team's
+    rows (its opponent never got scraped).
+    """
+    rng = np.random.default_rng(seed)
+    rows, gid = [], 0
+    for season, start in [("2020-21", "2020-12-22"), ("2021-22", "2021-10-19")]:
+        for day in range(8):
+            date = pd.Timestamp(start) + pd.Timedelta(days=2 * day)
+            teams = rng.permutation(TEAMS)
+            for home, away in zip(teams[0::2], teams[1::2]):
+                gid += 1
+                for team in (home, away):
+                    if gid == 7 and team == away:
+                        continue
+                    poss = float(rng.integers(90, 110))
+                    for player in range(3):
+                        row = {"season": season, "game_id": 22000000 + gid, "team_id": team,
+                               "game_date_team": date.strftime("%Y-%m-%d"), "team_possessions": poss}
+                        for c in fe.CONTEXT_SUMS:
+                            row[c] = float(rng.integers(0, 15))
+                        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def brute_force(df: pd.DataFrame) -> pd.DataFrame:
+    """The same context from plain groupbys and loops."""
+    sums = fe.CONTEXT_SUMS
+    tg = df.groupby(["game_id", "team_id"], as_index=False).agg(
+        {"season": "first", "game_date_team": "first", "team_possessions": "first", **{c: "sum" for c in sums}}
+    )
+    tg["date"] = pd.to_datetime(tg["game_date_team"])
+    tg = tg[tg.groupby("game_id")["team_id"].transform("size") == 2].reset_index(drop=True)
+    other = tg.set_index(["game_id", "team_id"])
+    pair = tg.groupby("game_id")["team_id"].agg(list)
+    tg["opp_id"] = [next(t for t in pair[g] if t != team) for g, team in zip(tg["game_id"], tg["team_id"])]
+    allowed_by = {(r.game_id, r.team_id): other.loc[(r.game_id, r.opp_id), sums].to_numpy(float) for r in tg.itertuples()}
+
+    k = fe.CONTEXT_PRIOR_GAMES
+    out = {}
+    for r in tg.itertuples():
+        same = tg[tg["season"] == r.season]
+        lg = same[same["date"] < r.date]
+        if lg.empty:
+            lg = same[same["date"] <= r.date]
+        lg_poss = lg["team_possessions"].mean()
+        lg_tot = lg[sums].mean().to_numpy()
+
+        prev = same[(same["team_id"] == r.opp_id) & (same["date"] < r.date)]
+        poss = prev["team_possessions"].sum() + k * lg_poss
+        allowed = sum((allowed_by[(p.game_id, p.team_id)] for p in prev.itertuples()), np.zeros(len(sums)))
+        allowed = allowed + k * lg_tot
+        scored = prev["pts"].sum() + k * lg_tot[sums.index("pts")]
+
+        a = dict(zip(sums, allowed))
+        l = dict(zip(sums, lg_tot))
+        row = {}
+        for c in fe.ADJUST_COUNTS:
+            row[f"opp_allowed_{c}_per100"] = a[c] / poss * 100.0
+            row[f"lg_{c}_per100"] = l[c] / lg_poss * 100.0
+        row["opp_allowed_ts"] = a["pts"] / (2 * (a["fga"] + 0.44 * a["fta"]))
+        row["opp_allowed_efg"] = (a["fgm"] + 0.5 * a["fg3m"]) / a["fga"]
+        row["lg_ts"] = l["pts"] / (2 * (l["fga"] + 0.44 * l["fta"]))
+        row["lg_efg"] = (l["fgm"] + 0.5 * l["fg3m"]) / l["fga"]
+        row["opp_net_rating"] = (scored - a["pts"]) / poss * 100.0
+        row["opp_games_before"] = len(prev)
+        out[int(fe.team_game_key([r.game_id], [r.team_id])[0])] = row
+    return pd.DataFrame.from_dict(out, orient="index").sort_index()
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_context_matches_brute_force(seed):
+    df = schedule(seed)
+    ctx = fe.build_team_game_context(df)
+    ref = brute_force(df)
+
+    assert list(ctx.index) == list(ref.index)
+    pd.testing.assert_frame_equal(ctx[ref.columns], ref, check_dtype=False, rtol=1e-10)
+
+
+def test_context_edges():
+    df = schedule()
+    ctx = fe.build_team_game_context(df)
+    days = pd.to_datetime(df.groupby(["game_id", "team_id"])["game_date_team"].first())
+    season = df.groupby(["game_id", "team_id"])["season"].first()
+    keys = fe.team_game_key(days.index.get_level_values(0), days.index.get_level_values(1))
+    at = pd.DataFrame({"day": days.to_numpy(), "season": season.to_numpy()}, index=keys).loc[ctx.index]
+
+    # Partial game (one team's rows only) is left out
+    partial = fe.team_game_key(df.loc[df["game_id"] == 22000007, "game_id"].iloc[:1],
+                               df.loc[df["game_id"] == 22000007, "team_id"].iloc[:1])
+    assert partial[0] not in ctx.index
+
+    # Opening dates (and the first date after the season boundary): no
+    # opponent history, and the adjustment is neutral
+    opening = at["day"] == at.groupby("season")["day"].transform("min")
+    assert opening.sum() == 2 * 6
+    first = ctx[opening.to_numpy()]
+    assert (first["opp_games_before"] == 0).all()
+    np.testing.assert_allclose(first["opp_allowed_pts_per100"], first["lg_pts_per100"])
+    np.testing.assert_allclose(first["opp_allowed_ts"], first["lg_ts"])
+    np.testing.assert_allclose(first["opp_net_rating"], 0.0, atol=1e-9)
+
+    # No same-day or later leakage: a rebuild from rows up to each date
+    # gives the same context for that date's games
+    for day in sorted(at["day"].unique())[1::3]:
+        cut = fe.build_team_game_context(df[pd.to_datetime(df["game_date_team"]) <= day])
+        rows = at.index[at["day"] == day]
+        pd.testing.assert_frame_equal(cut.loc[rows], ctx.loc[rows], rtol=1e-12)
@@ -0,0 +1,43 @@
+import os
+import gzip
+import sys
+
+import pytest
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+pytest.importorskip("polars")
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "ingestion"))
+import upload_team_boxscores  # noqa: E402
+
+BUCKET = "darkolite-test"
+PREFIX = "historical/boxscores/"
+
+
+def season_csv(season_id: str, n: int) -> bytes:
+    rows = [f"{season_id},00{2100000 + i},{i},PLAYER {i},2021-11-0{1 + i % 9}" for i in range(n)]
+    return ("SEASON_ID,GAME_ID,PLAYER_ID,PLAYER_NAME,GAME_DATE\n" + "\n".join(rows) + "\n").encode()
+
+
+def test_legacy_csv_and_gzip_season_loads_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_team_boxscores, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(upload_team_boxscores, "LOCAL_CACHE", str(tmp_path))
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        # 2021-22 exists both as the legacy plain key and as a gzipped re-upload
+        s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}boxscores_2021-22.csv", Body=season_csv("22021", 30))
+        s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}boxscores_2021-22.csv.gz",
+                      Body=gzip.compress(season_csv("22021", 30)))
+        s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}boxscores_2022-23.csv", Body=season_csv("22022", 20))
+
+        df = upload_team_boxscores.load_all_boxscores()
+
+    assert df.shape[0] == 50
+    assert df["SEASON_ID"].n_unique() == 2